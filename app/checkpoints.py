@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .conversion_cache import file_sha256
+
+CHECKPOINT_FORMAT = 1
+
+
+def stage_inputs(ifc_sha256: str, options: dict[str, Any], version: str) -> dict[str, str]:
+    """What a stage's output depends on; a checkpoint only counts while these are unchanged."""
+    options_json = json.dumps(options, sort_keys=True, default=str)
+    return {
+        "ifc_sha256": ifc_sha256,
+        "options_sha256": hashlib.sha256(options_json.encode("utf-8")).hexdigest(),
+        "version": version,
+    }
+
+
+def make_checkpoint(inputs: dict[str, str], output: Path, stats: dict | None = None) -> dict[str, Any]:
+    checkpoint = {
+        "format": CHECKPOINT_FORMAT,
+        "inputs": inputs,
+        "output": str(output),
+        "size": output.stat().st_size,
+        "sha256": file_sha256(output),
+        "completed_at": datetime.now(timezone.utc).isoformat(),
+    }
+    if stats is not None:
+        checkpoint["stats"] = stats
+    return checkpoint
+
+
+def verify_checkpoint(checkpoint: dict[str, Any] | None, inputs: dict[str, str], output: Path) -> bool:
+    """True if the stage finished with these inputs and its output is still intact on disk."""
+    if not checkpoint or checkpoint.get("format") != CHECKPOINT_FORMAT:
+        return False
+    if checkpoint.get("inputs") != inputs or checkpoint.get("output") != str(output):
+        return False
+    try:
+        # The size check is free and rules out most truncated files before hashing.
+        if output.stat().st_size != checkpoint.get("size"):
+            return False
+        return file_sha256(output) == checkpoint.get("sha256")
+    except OSError:
+        return False
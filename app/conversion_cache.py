@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterable
+
+# Bump when the cached USDZ layout or the key recipe changes so old entries stop matching.
+CACHE_FORMAT = 2
+_HASH_CHUNK = 1024 * 1024
+
+
+def _tmp_path(destination: Path) -> Path:
+    return destination.with_name(f".{destination.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _copy_with_sha256(source: Path, destination: Path) -> str:
+    """Copy `source` to `destination`, hashing the bytes on the way; returns the sha256."""
+    digest = hashlib.sha256()
+    with source.open("rb") as src, destination.open("wb") as dst:
+        for chunk in iter(lambda: src.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+            dst.write(chunk)
+    return digest.hexdigest()
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as src:
+        for chunk in iter(lambda: src.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    """Content-addressed store of finished conversions: <key>.usdz plus <key>.json with the
+    stats and the archive's sha256. Entries are evicted least-recently-used first once
+    `max_bytes` is exceeded.
+
+    Files are copied in both directions, never hardlinked, so editing a delivered USDZ in
+    place cannot corrupt the cache; a hit is still verified against the stored hash while it
+    is copied. Copies run outside the cache lock, so a large hit or store does not hold up
+    other jobs' lookups.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int, version: str = ""):
+        self.cache_dir = cache_dir.resolve()
+        self.max_bytes = max(0, int(max_bytes))
+        self.version = version
+        self._lock = threading.RLock()
+        self._entries: dict[str, tuple[int, float]] = {}
+        # Entries being copied out; eviction leaves them alone until the copy is done.
+        self._readers: Counter[str] = Counter()
+        # Dropped while being copied out; the last reader deletes the files.
+        self._dropped: set[str] = set()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        if self.enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._load_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _usdz_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.usdz"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _load_index(self) -> None:
+        for meta in self.cache_dir.glob("*.json"):
+            usdz = self._usdz_path(meta.stem)
+            if not usdz.exists():
+                meta.unlink(missing_ok=True)
+                continue
+            self._entries[meta.stem] = (usdz.stat().st_size, meta.stat().st_mtime)
+        for stale in self.cache_dir.glob(".*.tmp"):
+            stale.unlink(missing_ok=True)
+
+    def make_key(
+        self,
+        ifc_path: Path,
+        engine: str,
+        include_entities: Iterable[str] | None = None,
+        exclude_entities: Iterable[str] | None = None,
+        options: dict[str, Any] | None = None,
+        ifc_sha256: str | None = None,
+    ) -> str:
+        recipe = {
+            "format": CACHE_FORMAT,
+            "version": self.version,
+            "ifc": ifc_sha256 or file_sha256(ifc_path),
+            "engine": engine,
+            "include": sorted(include_entities or []),
+            "exclude": sorted(exclude_entities or []),
+            "options": options or {},
+        }
+        return hashlib.sha256(json.dumps(recipe, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def lookup(self, key: str, destination: Path) -> dict | None:
+        """Materialize a cached USDZ at `destination` and return its stats, or None on a miss."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if key not in self._entries:
+                self._counters["misses"] += 1
+                return None
+            self._readers[key] += 1
+
+        tmp_path = _tmp_path(destination)
+        try:
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            meta = json.loads(self._meta_path(key).read_text(encoding="utf-8"))
+            if _copy_with_sha256(self._usdz_path(key), tmp_path) != meta.get("sha256"):
+                raise ValueError("Cached USDZ does not match its hash")
+            os.replace(tmp_path, destination)
+        except (OSError, ValueError):
+            try:
+                tmp_path.unlink(missing_ok=True)
+            except OSError:
+                pass
+            with self._lock:
+                self._drop(key)
+                self._release(key)
+                self._counters["misses"] += 1
+            return None
+
+        with self._lock:
+            self._release(key)
+            if key in self._entries:
+                now = time.time()
+                try:
+                    os.utime(self._meta_path(key), (now, now))
+                except OSError:
+                    pass
+                self._entries[key] = (self._entries[key][0], now)
+            self._counters["hits"] += 1
+        return meta.get("stats") or {}
+
+    def store(self, key: str, usdz_path: Path, stats: dict) -> bool:
+        if not self.enabled:
+            return False
+        size = usdz_path.stat().st_size
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                # Same key, same content: another job already stored it.
+                return True
+
+        usdz_tmp, meta_tmp = _tmp_path(self._usdz_path(key)), _tmp_path(self._meta_path(key))
+        try:
+            sha256 = _copy_with_sha256(usdz_path, usdz_tmp)
+            meta = {"key": key, "stored_at": time.time(), "size_bytes": size, "sha256": sha256, "stats": stats}
+            meta_tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+            with self._lock:
+                if key in self._entries:
+                    return True
+                os.replace(usdz_tmp, self._usdz_path(key))
+                os.replace(meta_tmp, self._meta_path(key))
+                # Fresh files replaced any dropped ones still being read; those must not be deleted.
+                self._dropped.discard(key)
+                self._entries[key] = (size, time.time())
+                self._counters["stores"] += 1
+                self._evict()
+        except OSError:
+            # A full or read-only cache must never fail the conversion that fed it.
+            return False
+        finally:
+            usdz_tmp.unlink(missing_ok=True)
+            meta_tmp.unlink(missing_ok=True)
+        return True
+
+    def _release(self, key: str) -> None:
+        self._readers[key] -= 1
+        if self._readers[key] > 0:
+            return
+        del self._readers[key]
+        if key in self._dropped:
+            self._dropped.discard(key)
+            self._delete_files(key)
+
+    def _drop(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self._readers[key] > 0:
+            # Another lookup is still copying it; `_release` deletes the files after the last one.
+            self._dropped.add(key)
+            return
+        self._delete_files(key)
+
+    def _delete_files(self, key: str) -> None:
+        try:
+            self._meta_path(key).unlink(missing_ok=True)
+            self._usdz_path(key).unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        total = sum(size for size, _ in self._entries.values())
+        for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes:
+                break
+            if self._readers[key] > 0:
+                continue
+            self._drop(key)
+            total -= size
+            self._counters["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "path": str(self.cache_dir),
+                "entries": len(self._entries),
+                "size_bytes": sum(size for size, _ in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                **self._counters,
+                "hit_ratio": round(self._counters["hits"] / lookups, 3) if lookups else None,
+            }
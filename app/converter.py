@@ -1,14 +1,24 @@
 from __future__ import annotations
 
+import copy
+import importlib
 import os
 import shutil
 import subprocess
+import threading
 import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import Iterable
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
 
-from .glb_to_usdz_fast import glb_to_usdz_fast
 from .job_manager import CancelCheck, ProgressCallback
+from .preflight import choose_engine, scan_ifc
+from .process_supervisor import ProcessTimeout, run_supervised
+from .profiles import LOD_MIN_TRIANGLES, get_profile
+from .scheduler import StageGate, ThreadBudget
+
+if TYPE_CHECKING:
+    from .geometry_cache import GeometryCache
 
 APP_DIR = Path(__file__).resolve().parent
 PROJECT_DIR = APP_DIR.parent
@@ -17,6 +27,82 @@ WORKSPACE_DIR = CONFIG_DIR / "workspace"
 STORAGE_ROOT = Path(os.getenv("OFFLINE_STORAGE_ROOT", str(PROJECT_DIR.parent))).resolve()
 IFC_DIR = STORAGE_ROOT / "ifc"
 USDZ_DIR = STORAGE_ROOT / "usdz"
+# Meshes per streamed sublayer in GLB->USDZ; 0 keeps the whole stage in one layer.
+USDZ_STREAM_BATCH = int(os.getenv("OFFLINE_USDZ_STREAM_BATCH", "0"))
+# Threads preparing mesh payloads in GLB->USDZ; 0 means one per CPU core.
+USDZ_PREP_WORKERS = int(os.getenv("OFFLINE_USDZ_PREP_WORKERS", "0"))
+IFCCONVERT_TIMEOUT = 1800
+# "glb" runs IFC->GLB->USDZ; "direct" tessellates IFC straight into USD without the GLB.
+# "auto" lets the pre-flight scan pick between the two real engines.
+ENGINES = ("auto", "glb", "direct")
+# "auto" stays opt-in: the GLB path (bundled IfcConvert, instancing) is what existing output is made with.
+DEFAULT_ENGINE = os.getenv("OFFLINE_CONVERTER_ENGINE", "glb").strip().lower()
+if DEFAULT_ENGINE not in ENGINES:
+    DEFAULT_ENGINE = "glb"
+# Per-element tessellation cache used by the direct engine; 0 MB disables it.
+GEOMETRY_CACHE_MB = int(os.getenv("OFFLINE_GEOMETRY_CACHE_MB", "1024"))
+GEOMETRY_CACHE_PATH = WORKSPACE_DIR / "geometry_cache.sqlite"
+
+_geometry_cache: GeometryCache | None = None
+_geometry_cache_lock = threading.Lock()
+
+
+def get_geometry_cache() -> GeometryCache | None:
+    global _geometry_cache
+    if GEOMETRY_CACHE_MB <= 0:
+        return None
+    with _geometry_cache_lock:
+        if _geometry_cache is None:
+            from .geometry_cache import GeometryCache
+
+            _geometry_cache = GeometryCache(GEOMETRY_CACHE_PATH, max_bytes=GEOMETRY_CACHE_MB * 1024 * 1024)
+        return _geometry_cache
+
+
+# numpy, pxr and ifcopenshell take seconds to import from a USB drive, so they stay out of
+# server start-up: they are imported in the background once the server answers its first
+# request, and conversions wait for that import to finish.
+_STACK_MODULES = (
+    "numpy",
+    "pxr.Usd",
+    "pxr.UsdGeom",
+    "ifcopenshell.geom",
+    f"{__package__}.geometry_cache",
+    f"{__package__}.glb_to_usdz_fast",
+    f"{__package__}.ifc_to_usdz_direct",
+)
+_stack_lock = threading.Lock()
+_stack_thread: threading.Thread | None = None
+_stack_import_seconds: dict[str, float] = {}
+
+
+def _import_conversion_stack() -> None:
+    # Each module is timed on top of the ones before it, so the numbers add up to the total.
+    for name in _STACK_MODULES:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception:
+            # The conversion that needs the module reports the import error itself.
+            pass
+        _stack_import_seconds[name] = round(time.perf_counter() - started, 3)
+
+
+def prewarm_conversion_stack() -> threading.Thread:
+    """Start importing the conversion modules in the background; later calls return the same thread."""
+    global _stack_thread
+    with _stack_lock:
+        if _stack_thread is None:
+            _stack_thread = threading.Thread(target=_import_conversion_stack, name="conversion-prewarm", daemon=True)
+            _stack_thread.start()
+        return _stack_thread
+
+
+def conversion_stack_status() -> dict:
+    with _stack_lock:
+        thread = _stack_thread
+    state = "idle" if thread is None else "importing" if thread.is_alive() else "ready"
+    return {"state": state, "import_seconds": dict(_stack_import_seconds)}
 
 
 def _is_executable_file(path: Path) -> bool:
@@ -80,9 +166,9 @@ def _supports_ifcopenshell_glb() -> tuple[bool, str | None]:
         return False, str(exc)
 
 
-def get_diagnostics() -> dict:
-    ifc_candidates = _ifcconvert_candidate_paths()
-    diagnostics = {
+def _probe_toolchain() -> dict:
+    started = time.perf_counter()
+    toolchain = {
         "ifcconvert": {
             "ok": False,
             "path": None,
@@ -94,50 +180,123 @@ def get_diagnostics() -> dict:
                     "exists": path.exists(),
                     "executable": _is_executable_file(path),
                 }
-                for path in ifc_candidates
+                for path in _ifcconvert_candidate_paths()
             ],
         },
         "ifcopenshell_glb": {"ok": False, "error": None},
         "pxr": {"ok": False, "version": None, "error": None},
-        "paths": {
-            "project_dir": str(PROJECT_DIR),
-            "config_dir": str(CONFIG_DIR),
-            "workspace_dir": str(WORKSPACE_DIR),
-            "storage_root": str(STORAGE_ROOT),
-            "ifc_dir": str(IFC_DIR),
-            "ifc_dir_exists": IFC_DIR.exists(),
-            "usdz_dir": str(USDZ_DIR),
-            "usdz_dir_exists": USDZ_DIR.exists(),
-            "ifc_convert_path_env": os.getenv("IFC_CONVERT_PATH", "").strip() or None,
-        },
     }
 
     try:
         ifcconvert = resolve_ifcconvert_path()
         if ifcconvert:
-            diagnostics["ifcconvert"]["path"] = ifcconvert
+            toolchain["ifcconvert"]["path"] = ifcconvert
             result = subprocess.run([ifcconvert, "--version"], capture_output=True, text=True, timeout=8)
             output = (result.stdout or result.stderr or "").strip().splitlines()
-            diagnostics["ifcconvert"]["version"] = output[0] if output else "unknown"
-            diagnostics["ifcconvert"]["ok"] = result.returncode == 0
+            toolchain["ifcconvert"]["version"] = output[0] if output else "unknown"
+            toolchain["ifcconvert"]["ok"] = result.returncode == 0
             if result.returncode != 0:
-                diagnostics["ifcconvert"]["error"] = (result.stderr or result.stdout or "").strip()[:600] or "IfcConvert --version failed"
+                toolchain["ifcconvert"]["error"] = (result.stderr or result.stdout or "").strip()[:600] or "IfcConvert --version failed"
         else:
-            diagnostics["ifcconvert"]["error"] = "IfcConvert not found in bundle paths or PATH"
+            toolchain["ifcconvert"]["error"] = "IfcConvert not found in bundle paths or PATH"
     except Exception as exc:
-        diagnostics["ifcconvert"]["error"] = str(exc)
+        toolchain["ifcconvert"]["error"] = str(exc)
 
     ok, err = _supports_ifcopenshell_glb()
-    diagnostics["ifcopenshell_glb"]["ok"] = ok
-    diagnostics["ifcopenshell_glb"]["error"] = err
+    toolchain["ifcopenshell_glb"]["ok"] = ok
+    toolchain["ifcopenshell_glb"]["error"] = err
 
     try:
         from pxr import Usd
 
-        diagnostics["pxr"]["ok"] = True
-        diagnostics["pxr"]["version"] = getattr(Usd, "GetVersion", lambda: "unknown")()
+        toolchain["pxr"]["ok"] = True
+        toolchain["pxr"]["version"] = getattr(Usd, "GetVersion", lambda: "unknown")()
     except Exception as exc:
-        diagnostics["pxr"]["error"] = str(exc)
+        toolchain["pxr"]["error"] = str(exc)
+
+    toolchain["probe"] = {"probed_at": time.time(), "seconds": round(time.perf_counter() - started, 3)}
+    return toolchain
+
+
+# Probing spawns IfcConvert and imports ifcopenshell.geom and pxr, which is slow from a cold
+# USB drive, so the result is kept until IFC_CONVERT_PATH, PATH or the tool files change.
+_toolchain_lock = threading.Lock()
+_toolchain_cached: tuple[tuple, dict] | None = None
+_toolchain_probe: threading.Thread | None = None
+
+
+def _toolchain_fingerprint() -> tuple:
+    files = []
+    for path in _ifcconvert_candidate_paths():
+        try:
+            stat = path.stat()
+            files.append((str(path), stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            files.append((str(path), None, None))
+    return os.getenv("IFC_CONVERT_PATH", "").strip(), tuple(files)
+
+
+def _refresh_toolchain() -> dict:
+    global _toolchain_cached
+    # Fingerprint first: a tool replaced mid-probe makes the result stale rather than wrong.
+    fingerprint = _toolchain_fingerprint()
+    toolchain = _probe_toolchain()
+    with _toolchain_lock:
+        _toolchain_cached = (fingerprint, toolchain)
+    return toolchain
+
+
+def prewarm_diagnostics() -> threading.Thread:
+    """Probe the toolchain in the background unless a probe is already running."""
+    global _toolchain_probe
+    with _toolchain_lock:
+        if _toolchain_probe is None or not _toolchain_probe.is_alive():
+            _toolchain_probe = threading.Thread(target=_refresh_toolchain, name="diagnostics-probe", daemon=True)
+            _toolchain_probe.start()
+        return _toolchain_probe
+
+
+def get_diagnostics(refresh: bool = False) -> dict:
+    """Live paths and cache state plus the cached toolchain probe. A probe whose tool files
+    changed is returned marked stale while a new one runs; `refresh` probes synchronously."""
+    stale = False
+    if refresh:
+        toolchain = _refresh_toolchain()
+    else:
+        with _toolchain_lock:
+            cached = _toolchain_cached
+        if cached is None:
+            prewarm_diagnostics().join()
+            with _toolchain_lock:
+                cached = _toolchain_cached
+        if cached is None:
+            toolchain = _refresh_toolchain()
+        else:
+            toolchain = cached[1]
+            stale = cached[0] != _toolchain_fingerprint()
+            if stale:
+                prewarm_diagnostics()
+
+    diagnostics = copy.deepcopy(toolchain)
+    diagnostics["probe"]["stale"] = stale
+    diagnostics["engines"] = {"default": DEFAULT_ENGINE, "available": list(ENGINES)}
+    diagnostics["paths"] = {
+        "project_dir": str(PROJECT_DIR),
+        "config_dir": str(CONFIG_DIR),
+        "workspace_dir": str(WORKSPACE_DIR),
+        "storage_root": str(STORAGE_ROOT),
+        "ifc_dir": str(IFC_DIR),
+        "ifc_dir_exists": IFC_DIR.exists(),
+        "usdz_dir": str(USDZ_DIR),
+        "usdz_dir_exists": USDZ_DIR.exists(),
+        "ifc_convert_path_env": os.getenv("IFC_CONVERT_PATH", "").strip() or None,
+    }
+
+    try:
+        cache = get_geometry_cache()
+        diagnostics["geometry_cache"] = cache.stats() if cache else {"enabled": False}
+    except Exception as exc:
+        diagnostics["geometry_cache"] = {"enabled": False, "error": str(exc)}
 
     return diagnostics
 
@@ -154,6 +313,9 @@ def _convert_ifc_to_glb_with_ifcconvert(
     include_entities: Iterable[str] | None,
     exclude_entities: Iterable[str] | None,
     cancel_check: CancelCheck | None,
+    progress_cb: Callable[[int], None] | None = None,
+    threads: int | None = None,
+    mesher_settings: dict[str, float] | None = None,
 ) -> None:
     output_glb.parent.mkdir(parents=True, exist_ok=True)
 
@@ -163,7 +325,7 @@ def _convert_ifc_to_glb_with_ifcconvert(
         str(output_glb),
         "--use-element-guids",
         "--threads",
-        str(os.cpu_count() or 4),
+        str(threads or os.cpu_count() or 4),
     ]
 
     include = list(include_entities or [])
@@ -172,33 +334,15 @@ def _convert_ifc_to_glb_with_ifcconvert(
         cmd.extend(["--include", "entities"] + include)
     elif exclude:
         cmd.extend(["--exclude", "entities"] + exclude)
+    for name, value in (mesher_settings or {}).items():
+        cmd.extend([f"--{name}", str(value)])
 
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    deadline = time.time() + 1800
-
-    while True:
-        if cancel_check and cancel_check():
-            process.terminate()
-            try:
-                process.wait(timeout=5)
-            except Exception:
-                process.kill()
-            raise RuntimeError("Cancelled by user")
-        if process.poll() is not None:
-            break
-        if time.time() > deadline:
-            process.terminate()
-            raise RuntimeError("IfcConvert timeout after 1800s")
-        time.sleep(0.4)
-
-    if cancel_check and cancel_check():
-        process.terminate()
-        raise RuntimeError("Cancelled by user")
-
-    stdout, stderr = process.communicate(timeout=5)
-    if process.returncode != 0:
-        detail = (stderr or stdout or "Unknown IfcConvert error").strip()
-        raise RuntimeError(f"IfcConvert failed: {detail[:1200]}")
+    try:
+        result = run_supervised(cmd, progress_cb=progress_cb, cancel_check=cancel_check, timeout=IFCCONVERT_TIMEOUT)
+    except ProcessTimeout:
+        raise RuntimeError(f"IfcConvert timeout after {IFCCONVERT_TIMEOUT}s") from None
+    if result.returncode != 0:
+        raise RuntimeError(f"IfcConvert failed: {result.error_detail() or 'Unknown IfcConvert error'}")
 
     if not output_glb.exists() or output_glb.stat().st_size == 0:
         raise RuntimeError("IfcConvert completed but GLB output is missing/empty")
@@ -210,6 +354,9 @@ def _convert_ifc_to_glb_with_ifcopenshell(
     include_entities: Iterable[str] | None,
     exclude_entities: Iterable[str] | None,
     cancel_check: CancelCheck | None,
+    progress_cb: Callable[[int], None] | None = None,
+    threads: int | None = None,
+    mesher_settings: dict[str, float] | None = None,
 ) -> None:
     import ifcopenshell
     import ifcopenshell.geom as geom
@@ -220,6 +367,8 @@ def _convert_ifc_to_glb_with_ifcopenshell(
     geometry_settings.set("use-world-coords", True)
     geometry_settings.set("weld-vertices", True)
     geometry_settings.set("apply-default-materials", True)
+    for name, value in (mesher_settings or {}).items():
+        geometry_settings.set(name, value)
 
     serializer_settings = geom.serializer_settings()
     serializer_settings.set("use-element-guids", True)
@@ -233,7 +382,7 @@ def _convert_ifc_to_glb_with_ifcopenshell(
     iterator = geom.iterator(
         geometry_settings,
         ifc_file,
-        num_threads=max(1, os.cpu_count() or 1),
+        num_threads=max(1, threads or os.cpu_count() or 1),
         include=include or None,
         exclude=exclude or None,
     )
@@ -245,10 +394,14 @@ def _convert_ifc_to_glb_with_ifcopenshell(
     serializer.setFile(ifc_file)
     serializer.writeHeader()
 
+    reported = -1
     while True:
         _check_cancel(cancel_check)
         shape = iterator.get()
         serializer.write(shape)
+        if progress_cb and iterator.progress() != reported:
+            reported = iterator.progress()
+            progress_cb(reported)
         if not iterator.next():
             break
 
@@ -265,12 +418,19 @@ def convert_ifc_to_glb(
     include_entities: Iterable[str] | None = None,
     exclude_entities: Iterable[str] | None = None,
     cancel_check: CancelCheck | None = None,
+    threads: int | None = None,
+    mesher_settings: dict[str, float] | None = None,
 ) -> None:
     _check_cancel(cancel_check)
 
     if progress_cb:
         progress_cb("ifc_to_glb", 15)
 
+    def tessellation_progress(percent: int) -> None:
+        # IfcConvert's (or the iterator's) own percentage covers the 15..55 slice of the job.
+        if progress_cb:
+            progress_cb("ifc_to_glb", 15 + percent * 40 // 100)
+
     ifcconvert = resolve_ifcconvert_path()
     if ifcconvert:
         _convert_ifc_to_glb_with_ifcconvert(
@@ -280,6 +440,9 @@ def convert_ifc_to_glb(
             include_entities=include_entities,
             exclude_entities=exclude_entities,
             cancel_check=cancel_check,
+            progress_cb=tessellation_progress,
+            threads=threads,
+            mesher_settings=mesher_settings,
         )
     else:
         ok, err = _supports_ifcopenshell_glb()
@@ -294,6 +457,9 @@ def convert_ifc_to_glb(
             include_entities=include_entities,
             exclude_entities=exclude_entities,
             cancel_check=cancel_check,
+            progress_cb=tessellation_progress,
+            threads=threads,
+            mesher_settings=mesher_settings,
         )
 
     if progress_cb:
@@ -305,12 +471,28 @@ def convert_glb_to_usdz(
     output_usdz: Path,
     progress_cb: ProgressCallback | None = None,
     cancel_check: CancelCheck | None = None,
+    merge_by_material: bool = False,
+    lod_ratios: list[float] | None = None,
+    lod_min_triangles: int = LOD_MIN_TRIANGLES,
+    faceted: bool = False,
+    threads: int | None = None,
 ) -> dict:
+    from .glb_to_usdz_fast import glb_to_usdz_fast
+
     _check_cancel(cancel_check)
     if progress_cb:
         progress_cb("glb_to_usdz", 70)
 
-    result = glb_to_usdz_fast(str(input_glb), str(output_usdz))
+    result = glb_to_usdz_fast(
+        str(input_glb),
+        str(output_usdz),
+        stream_batch_size=USDZ_STREAM_BATCH,
+        workers=USDZ_PREP_WORKERS or threads or (os.cpu_count() or 1),
+        merge_by_material=merge_by_material,
+        lod_ratios=lod_ratios or (),
+        lod_min_triangles=lod_min_triangles,
+        faceted=faceted,
+    )
     if not result.get("success"):
         raise RuntimeError(f"GLB->USDZ failed: {result.get('error', 'Unknown error')}")
 
@@ -325,15 +507,150 @@ def convert_glb_to_usdz(
     return result.get("stats", {})
 
 
+def convert_ifc_to_usdz_direct(
+    input_ifc: Path,
+    output_usdz: Path,
+    progress_cb: ProgressCallback | None = None,
+    include_entities: Iterable[str] | None = None,
+    exclude_entities: Iterable[str] | None = None,
+    cancel_check: CancelCheck | None = None,
+    merge_by_material: bool = False,
+    lod_ratios: list[float] | None = None,
+    lod_min_triangles: int = LOD_MIN_TRIANGLES,
+    faceted: bool = False,
+    threads: int | None = None,
+    mesher_settings: dict[str, float] | None = None,
+) -> dict:
+    from .ifc_to_usdz_direct import ifc_to_usdz_direct
+
+    _check_cancel(cancel_check)
+    if progress_cb:
+        progress_cb("ifc_to_usdz", 15)
+
+    def iterator_progress(percent: int) -> None:
+        if progress_cb:
+            progress_cb("ifc_to_usdz", 15 + min(max(percent, 0), 100) * 75 // 100)
+
+    result = ifc_to_usdz_direct(
+        str(input_ifc),
+        str(output_usdz),
+        include_entities=include_entities,
+        exclude_entities=exclude_entities,
+        threads=threads,
+        stream_batch_size=USDZ_STREAM_BATCH,
+        merge_by_material=merge_by_material,
+        lod_ratios=lod_ratios or (),
+        lod_min_triangles=lod_min_triangles,
+        faceted=faceted,
+        mesher_settings=mesher_settings,
+        geometry_cache=get_geometry_cache(),
+        progress_cb=iterator_progress,
+        cancel_check=cancel_check,
+    )
+    _check_cancel(cancel_check)
+    if not result.get("success"):
+        raise RuntimeError(f"IFC->USDZ failed: {result.get('error', 'Unknown error')}")
+
+    if not output_usdz.exists() or output_usdz.stat().st_size == 0:
+        raise RuntimeError("IFC->USDZ completed but USDZ output is missing/empty")
+
+    if progress_cb:
+        progress_cb("ifc_to_usdz", 95)
+
+    return result.get("stats", {})
+
+
 def run_fast_pipeline(
     input_ifc: Path,
     output_glb: Path,
     output_usdz: Path,
     progress_cb: ProgressCallback | None = None,
     cancel_check: CancelCheck | None = None,
+    options: dict | None = None,
+    threads: ThreadBudget | None = None,
+    stage_gate: StageGate | None = None,
+    completed_stages: Iterable[str] = (),
 ) -> dict:
-    convert_ifc_to_glb(input_ifc, output_glb, progress_cb=progress_cb, cancel_check=cancel_check)
-    stats = convert_glb_to_usdz(input_glb=output_glb, output_usdz=output_usdz, progress_cb=progress_cb, cancel_check=cancel_check)
+    """Convert one IFC to USDZ with the engine chosen in `options`. Each stage runs inside
+    `stage_gate(stage)`, and `threads` is asked for the job's core share once it is in.
+    `completed_stages` names intermediate stages whose verified output can be reused."""
+    options = options or {}
+    profile = get_profile(options.get("profile"))
+    prewarm_conversion_stack().join()
+    stage_threads: dict[str, int] = {}
+    stage_waits: dict[str, float] = {}
+    resumed: list[str] = []
+
+    def threads_for(stage: str) -> int:
+        stage_threads[stage] = max(1, threads() if threads else os.cpu_count() or 1)
+        return stage_threads[stage]
+
+    @contextmanager
+    def in_stage(stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        with stage_gate(stage) if stage_gate else nullcontext():
+            stage_waits[stage] = round(time.perf_counter() - started, 3)
+            yield
+
+    usd_options = {
+        "merge_by_material": bool(options.get("merge_by_material", False)),
+        "lod_ratios": options.get("lod_ratios") or [],
+        "lod_min_triangles": int(options.get("lod_min_triangles", LOD_MIN_TRIANGLES)),
+        "faceted": bool(options.get("faceted", False)),
+    }
+    tessellation = {
+        "include_entities": profile.include_entities,
+        "exclude_entities": profile.exclude_entities,
+        "mesher_settings": profile.mesher_settings(),
+    }
+    engine = options.get("engine", DEFAULT_ENGINE)
+    if engine == "auto":
+        engine = choose_engine(scan_ifc(input_ifc))
+    if engine == "direct":
+        with in_stage("ifc_to_usdz"):
+            stats = convert_ifc_to_usdz_direct(
+                input_ifc,
+                output_usdz,
+                progress_cb=progress_cb,
+                cancel_check=cancel_check,
+                threads=threads_for("ifc_to_usdz"),
+                **tessellation,
+                **usd_options,
+            )
+    else:
+        ifc_to_glb_seconds = 0.0
+        if "ifc_to_glb" in completed_stages and output_glb.is_file():
+            resumed.append("ifc_to_glb")
+            if progress_cb:
+                progress_cb("ifc_to_glb", 55)
+        else:
+            with in_stage("ifc_to_glb"):
+                started = time.perf_counter()
+                convert_ifc_to_glb(
+                    input_ifc,
+                    output_glb,
+                    progress_cb=progress_cb,
+                    cancel_check=cancel_check,
+                    threads=threads_for("ifc_to_glb"),
+                    **tessellation,
+                )
+                ifc_to_glb_seconds = time.perf_counter() - started
+        with in_stage("glb_to_usdz"):
+            stats = convert_glb_to_usdz(
+                input_glb=output_glb,
+                output_usdz=output_usdz,
+                progress_cb=progress_cb,
+                cancel_check=cancel_check,
+                threads=threads_for("glb_to_usdz"),
+                **usd_options,
+            )
+        stats["engine"] = "glb"
+        stats.setdefault("stage_seconds", {})["ifc_to_glb"] = round(ifc_to_glb_seconds, 3)
+    stats["stage_threads"] = stage_threads
+    stats["stage_wait_seconds"] = stage_waits
+    if resumed:
+        stats["resumed_stages"] = resumed
+    stats["profile"] = profile.name
     if progress_cb:
         progress_cb("completed", 100)
     return stats
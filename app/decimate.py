@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import numpy as np
+
+_MAX_PASSES = 8
+
+
+def _face_quadrics(vertices: np.ndarray, faces: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Area-weighted plane quadrics: A = w * n n^T, b = w * d * n for the plane n.x + d = 0.
+    tris = vertices[faces]
+    cross = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+    double_area = np.linalg.norm(cross, axis=1)
+    normals = np.zeros_like(cross)
+    np.divide(cross, double_area[:, None], out=normals, where=double_area[:, None] > 0)
+    offsets = -np.einsum("ij,ij->i", normals, tris[:, 0])
+    weights = 0.5 * double_area
+    quad_a = weights[:, None, None] * normals[:, :, None] * normals[:, None, :]
+    quad_b = (weights * offsets)[:, None] * normals
+    return quad_a, quad_b
+
+
+def _cluster(vertices: np.ndarray, origin: np.ndarray, cell: float) -> tuple[np.ndarray, int]:
+    cells = np.floor((vertices - origin) / cell).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    _, labels = np.unique(keys, return_inverse=True)
+    labels = labels.reshape(-1)
+    return labels, int(labels.max()) + 1
+
+
+def _collapse_faces(faces: np.ndarray) -> np.ndarray:
+    # Faces whose corners fell into fewer than three clusters vanish; duplicates are kept once.
+    keep = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])
+    faces = faces[keep]
+    if len(faces) == 0:
+        return faces
+    _, first = np.unique(np.sort(faces, axis=1), axis=0, return_index=True)
+    return faces[np.sort(first)]
+
+
+def _cluster_positions(
+    vertices: np.ndarray,
+    faces: np.ndarray,
+    labels: np.ndarray,
+    count: int,
+    quad_a: np.ndarray,
+    quad_b: np.ndarray,
+) -> np.ndarray:
+    sizes = np.bincount(labels, minlength=count).astype(np.float64)
+    means = np.stack([np.bincount(labels, weights=vertices[:, axis], minlength=count) for axis in range(3)], axis=1)
+    means /= sizes[:, None]
+
+    corner_labels = labels[faces].reshape(-1)
+    sum_a = np.empty((count, 3, 3), dtype=np.float64)
+    sum_b = np.empty((count, 3), dtype=np.float64)
+    for row in range(3):
+        for col in range(row, 3):
+            weights = np.repeat(quad_a[:, row, col], 3)
+            sum_a[:, row, col] = sum_a[:, col, row] = np.bincount(corner_labels, weights=weights, minlength=count)
+        sum_b[:, row] = np.bincount(corner_labels, weights=np.repeat(quad_b[:, row], 3), minlength=count)
+
+    # Minimise the quadric error with a small pull towards the cluster centroid, which keeps
+    # flat or edge-only clusters (singular quadrics) well posed.
+    reg = 1e-3 * np.trace(sum_a, axis1=1, axis2=2) / 3.0 + 1e-12
+    system = sum_a + reg[:, None, None] * np.eye(3)
+    rhs = reg[:, None] * means - sum_b
+    positions = np.linalg.solve(system, rhs[:, :, None])[:, :, 0]
+
+    lower = np.full((count, 3), np.inf)
+    upper = np.full((count, 3), -np.inf)
+    np.minimum.at(lower, labels, vertices)
+    np.maximum.at(upper, labels, vertices)
+    return np.clip(positions, lower, upper)
+
+
+def _closer_to_target(candidate: int, current: int, target: int) -> bool:
+    # Results within the target beat those above it; within the target, more faces is better.
+    if (candidate <= target) != (current <= target):
+        return candidate <= target
+    return candidate > current if candidate <= target else candidate < current
+
+
+def simplify_mesh(vertices: np.ndarray, faces: np.ndarray, target_faces: int) -> tuple[np.ndarray, np.ndarray]:
+    """Reduce a triangle mesh to roughly `target_faces` triangles.
+
+    Uses quadric-error vertex clustering: vertices are snapped to a uniform grid and each
+    occupied cell is replaced by the point minimising the summed plane quadrics of its faces.
+    The grid is refined over a few passes until the face count fits the target. Returns the
+    input unchanged when it is already small enough or cannot be reduced.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    if len(faces) <= target_faces or len(faces) == 0:
+        return vertices, faces
+
+    origin = vertices.min(axis=0)
+    extent = float((vertices.max(axis=0) - origin).max())
+    if extent <= 0:
+        return vertices, faces
+
+    # A closed surface has about half as many vertices as faces; start from a grid with
+    # about that many occupied cells per face of the bounding box and adjust from there.
+    resolution = max(np.sqrt(target_faces / 2.0), 1.0)
+    best: tuple[np.ndarray, np.ndarray, int] | None = None
+    for _ in range(_MAX_PASSES):
+        labels, count = _cluster(vertices, origin, extent / resolution)
+        collapsed = _collapse_faces(labels[faces])
+        if best is None or _closer_to_target(len(collapsed), len(best[1]), target_faces):
+            best = (labels, collapsed, count)
+        if 0.8 * target_faces <= len(collapsed) <= target_faces:
+            break
+        resolution *= 0.95 * np.sqrt(target_faces / max(len(collapsed), 1))
+
+    labels, collapsed, count = best
+    if len(collapsed) == 0 or len(collapsed) >= len(faces):
+        return vertices, faces
+
+    quad_a, quad_b = _face_quadrics(vertices, faces)
+    positions = _cluster_positions(vertices, faces, labels, count, quad_a, quad_b)
+
+    used, remapped = np.unique(collapsed, return_inverse=True)
+    return positions[used], remapped.reshape(-1, 3)
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+# Bump when the stored buffers or the hash recipe change so old rows stop matching.
+GEOMETRY_CACHE_FORMAT = 1
+_SQL_CHUNK = 500
+# Marks the end of an aggregate while flattening attribute values.
+_CLOSE = object()
+
+
+@dataclass
+class TessellatedShape:
+    """Raw IfcOpenShell output for one product, in IFC world coordinates (Z-up)."""
+
+    guid: str
+    vertices: np.ndarray
+    faces: np.ndarray
+    normals: np.ndarray
+    material_ids: np.ndarray
+    colors: list[tuple[float, float, float] | None] = field(default_factory=list)
+
+    @property
+    def size_bytes(self) -> int:
+        return self.vertices.nbytes + self.faces.nbytes + self.normals.nbytes + self.material_ids.nbytes
+
+    @classmethod
+    def empty(cls, guid: str) -> "TessellatedShape":
+        return cls(
+            guid=guid,
+            vertices=np.empty((0, 3), dtype=np.float64),
+            faces=np.empty((0, 3), dtype=np.int32),
+            normals=np.empty((0, 3), dtype=np.float64),
+            material_ids=np.empty(0, dtype=np.int32),
+        )
+
+
+class _MerkleHasher:
+    """Content hashes of IFC entity subtrees that ignore step ids, so an element keeps its
+    hash across exports as long as its geometry-defining entities are unchanged."""
+
+    def __init__(self, ifc_file):
+        self._memo: dict[int, bytes] = {}
+        # Entities that shape an element's tessellation but only point at it (inverse links).
+        self._attached: dict[int, list] = defaultdict(list)
+        for styled in ifc_file.by_type("IfcStyledItem"):
+            if styled.Item is not None:
+                self._attached[styled.Item.id()].extend(styled.Styles or ())
+        for definition in ifc_file.by_type("IfcMaterialDefinitionRepresentation"):
+            self._attached[definition.RepresentedMaterial.id()].extend(definition.Representations or ())
+        self._openings: dict[int, list] = defaultdict(list)
+        for rel in ifc_file.by_type("IfcRelVoidsElement"):
+            self._openings[rel.RelatingBuildingElement.id()].append(rel.RelatedOpeningElement)
+        self._materials: dict[int, list] = defaultdict(list)
+        for rel in ifc_file.by_type("IfcRelAssociatesMaterial"):
+            for related in rel.RelatedObjects or ():
+                self._materials[related.id()].append(rel.RelatingMaterial)
+
+    @staticmethod
+    def _value_tokens(value) -> Iterator[bytes | object]:
+        """Flatten an attribute value into bytes to hash and entities whose hash goes in between."""
+        stack = [value]
+        while stack:
+            item = stack.pop()
+            if item is _CLOSE:
+                yield b")"
+            elif isinstance(item, tuple):
+                yield b"("
+                stack.append(_CLOSE)
+                stack.extend(reversed(item))
+            elif hasattr(item, "is_a"):
+                yield item
+            elif isinstance(item, float):
+                # STEP writers round reals differently; 12 digits is well below model precision.
+                yield f"float:{item:.12g};".encode("utf-8")
+            else:
+                yield f"{type(item).__name__}:{item!r};".encode("utf-8")
+
+    def _entity_tokens(self, entity) -> Iterator[bytes | object]:
+        for index in range(len(entity)):
+            yield from self._value_tokens(entity[index])
+        yield from self._attached.get(entity.id(), ())
+
+    def _value(self, digest, value) -> None:
+        for token in self._value_tokens(value):
+            digest.update(token if isinstance(token, bytes) else self.entity(token))
+
+    def entity(self, entity) -> bytes:
+        # Walks the reference graph with an explicit stack: placement and profile chains in
+        # valid models can be far deeper than Python's recursion limit.
+        entity_id = entity.id()
+        if entity_id and entity_id in self._memo:
+            return self._memo[entity_id]
+        frames: list[tuple[int, Any, Iterator]] = []
+
+        def push(child) -> None:
+            child_id = child.id()
+            if child_id:
+                # Placeholder so a reference cycle terminates instead of looping forever.
+                self._memo[child_id] = b"cycle"
+            frames.append((child_id, hashlib.blake2b(child.is_a().encode("utf-8"), digest_size=16), self._entity_tokens(child)))
+
+        push(entity)
+        result = b""
+        while frames:
+            child_id, digest, tokens = frames[-1]
+            for token in tokens:
+                if isinstance(token, bytes):
+                    digest.update(token)
+                    continue
+                token_id = token.id()
+                if token_id and token_id in self._memo:
+                    digest.update(self._memo[token_id])
+                    continue
+                push(token)
+                break
+            else:
+                frames.pop()
+                result = digest.digest()
+                if child_id:
+                    self._memo[child_id] = result
+                if frames:
+                    frames[-1][1].update(result)
+        return result
+
+    def _placed_shape(self, digest, product) -> None:
+        # Only representation and placement: the product itself carries OwnerHistory and
+        # names that change on every export without affecting geometry.
+        for value in (product.Representation, product.ObjectPlacement):
+            self._value(digest, value)
+
+    def product(self, product) -> str:
+        digest = hashlib.blake2b(product.is_a().encode("utf-8"), digest_size=16)
+        self._placed_shape(digest, product)
+        for opening in self._openings.get(product.id(), ()):
+            self._placed_shape(digest, opening)
+        for material in self._materials.get(product.id(), ()):
+            self._value(digest, material)
+        return digest.hexdigest()
+
+
+def hash_elements(ifc_file, products: Iterable, *settings: object) -> tuple[str, dict[str, str]]:
+    """Return the settings key shared by every row of this file and the content hash per GlobalId."""
+    import ifcopenshell
+
+    hasher = _MerkleHasher(ifc_file)
+    # Project units scale every coordinate, so they are part of the settings key.
+    units = hashlib.blake2b(digest_size=16)
+    for assignment in ifc_file.by_type("IfcUnitAssignment"):
+        units.update(hasher.entity(assignment))
+    settings_key = ":".join(map(str, [GEOMETRY_CACHE_FORMAT, ifcopenshell.version, units.hexdigest(), *settings]))
+    return settings_key, {product.GlobalId: hasher.product(product) for product in products}
+
+
+class GeometryCache:
+    """Persistent per-element tessellation cache in SQLite, keyed by GlobalId, element
+    content hash and tessellation settings. Least-recently-used rows are pruned once the
+    stored buffers exceed `max_bytes`."""
+
+    def __init__(self, db_path: Path, max_bytes: int):
+        self.db_path = db_path
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.RLock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS shapes (
+                guid TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                settings TEXT NOT NULL,
+                vertices BLOB NOT NULL,
+                faces BLOB NOT NULL,
+                normals BLOB NOT NULL,
+                material_ids BLOB NOT NULL,
+                colors TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (guid, content_hash, settings)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS shapes_last_used ON shapes (last_used)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get_many(self, settings: str, hashes: dict[str, str]) -> dict[str, TessellatedShape]:
+        found: dict[str, TessellatedShape] = {}
+        guids = list(hashes)
+        with self._lock:
+            for start in range(0, len(guids), _SQL_CHUNK):
+                chunk = guids[start : start + _SQL_CHUNK]
+                rows = self._conn.execute(
+                    "SELECT guid, content_hash, vertices, faces, normals, material_ids, colors FROM shapes "
+                    f"WHERE settings = ? AND guid IN ({','.join('?' * len(chunk))})",
+                    (settings, *chunk),
+                )
+                for guid, content_hash, vertices, faces, normals, material_ids, colors in rows:
+                    if hashes.get(guid) != content_hash:
+                        continue
+                    found[guid] = TessellatedShape(
+                        guid=guid,
+                        vertices=np.frombuffer(vertices, dtype=np.float64).reshape(-1, 3),
+                        faces=np.frombuffer(faces, dtype=np.int32).reshape(-1, 3),
+                        normals=np.frombuffer(normals, dtype=np.float64).reshape(-1, 3),
+                        material_ids=np.frombuffer(material_ids, dtype=np.int32),
+                        colors=[tuple(color) if color else None for color in json.loads(colors)],
+                    )
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE shapes SET last_used = ? WHERE guid = ? AND content_hash = ? AND settings = ?",
+                [(now, guid, hashes[guid], settings) for guid in found],
+            )
+            self._conn.commit()
+            self._counters["hits"] += len(found)
+            self._counters["misses"] += len(hashes) - len(found)
+        return found
+
+    def put_many(self, settings: str, hashes: dict[str, str], shapes: list[TessellatedShape]) -> None:
+        if not shapes:
+            return
+        now = time.time()
+        rows = [
+            (
+                shape.guid,
+                hashes[shape.guid],
+                settings,
+                np.ascontiguousarray(shape.vertices, dtype=np.float64).tobytes(),
+                np.ascontiguousarray(shape.faces, dtype=np.int32).tobytes(),
+                np.ascontiguousarray(shape.normals, dtype=np.float64).tobytes(),
+                np.ascontiguousarray(shape.material_ids, dtype=np.int32).tobytes(),
+                json.dumps(shape.colors),
+                shape.size_bytes,
+                now,
+            )
+            for shape in shapes
+            if shape.guid in hashes
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO shapes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._counters["stores"] += len(rows)
+            self._evict()
+            self._conn.commit()
+
+    def _total_bytes(self) -> int:
+        return int(self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM shapes").fetchone()[0])
+
+    def _evict(self) -> None:
+        excess = self._total_bytes() - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for rowid, size in self._conn.execute("SELECT rowid, size_bytes FROM shapes ORDER BY last_used"):
+            if excess <= 0:
+                break
+            victims.append((rowid,))
+            excess -= size
+        self._conn.executemany("DELETE FROM shapes WHERE rowid = ?", victims)
+        self._counters["evictions"] += len(victims)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = int(self._conn.execute("SELECT COUNT(*) FROM shapes").fetchone()[0])
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": True,
+                "path": str(self.db_path),
+                "entries": entries,
+                "size_bytes": self._total_bytes(),
+                "max_bytes": self.max_bytes,
+                **self._counters,
+                "hit_ratio": round(self._counters["hits"] / lookups, 3) if lookups else None,
+            }
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+
+GLB_MAGIC = b"glTF"
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+MODE_TRIANGLES = 4
+
+_COMPONENT_DTYPES = {
+    5120: np.dtype(np.int8),
+    5121: np.dtype(np.uint8),
+    5122: np.dtype(np.int16),
+    5123: np.dtype(np.uint16),
+    5125: np.dtype(np.uint32),
+    5126: np.dtype(np.float32),
+}
+_TYPE_WIDTHS = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+
+
+@dataclass
+class GlbNode:
+    index: int
+    name: str | None
+    mesh: int
+    # World transform in column-vector convention (translation in the last column).
+    matrix: np.ndarray
+
+
+@dataclass
+class GlbPrimitive:
+    mesh: int
+    index: int
+    positions: np.ndarray
+    indices: np.ndarray | None
+    normals: np.ndarray | None
+    colors: np.ndarray | None
+    material: int | None
+    mode: int
+
+
+def _quaternion_matrix(x: float, y: float, z: float, w: float) -> np.ndarray:
+    return np.array(
+        [
+            [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+            [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+            [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+        ],
+        dtype=np.float64,
+    )
+
+
+def _local_matrix(node: dict[str, Any]) -> np.ndarray:
+    if "matrix" in node:
+        # glTF stores matrices column-major.
+        return np.asarray(node["matrix"], dtype=np.float64).reshape(4, 4).T
+
+    matrix = np.eye(4, dtype=np.float64)
+    if "rotation" in node:
+        matrix[:3, :3] = _quaternion_matrix(*node["rotation"])
+    if "scale" in node:
+        matrix[:3, :3] = matrix[:3, :3] * np.asarray(node["scale"], dtype=np.float64)
+    if "translation" in node:
+        matrix[:3, 3] = node["translation"]
+    return matrix
+
+
+class GlbReader:
+    """Memory-mapped GLB reader.
+
+    The JSON chunk is parsed once; accessors are returned as read-only NumPy views into
+    the mapped BIN chunk, so geometry is only paged in when it is actually touched.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._file = self.path.open("rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.json, self._bin_offset, self._bin_length = self._parse_chunks()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self) -> GlbReader:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        mapped = getattr(self, "_mmap", None)
+        if mapped is not None:
+            try:
+                mapped.close()
+            except BufferError:
+                # Views are still referenced somewhere; the mapping is released with them.
+                pass
+            self._mmap = None
+        if not self._file.closed:
+            self._file.close()
+
+    def release_pages(self) -> None:
+        # Drop already-read pages from this process's resident set; they stay in the OS
+        # page cache and are faulted back in if touched again.
+        if self._mmap is not None and hasattr(mmap, "MADV_DONTNEED"):
+            try:
+                self._mmap.madvise(mmap.MADV_DONTNEED)
+            except (OSError, ValueError):
+                pass
+
+    def _parse_chunks(self) -> tuple[dict[str, Any], int, int]:
+        data = self._mmap
+        if len(data) < 20:
+            raise ValueError("GLB file is too small")
+
+        magic, version, total_length = struct.unpack_from("<4sII", data, 0)
+        if magic != GLB_MAGIC:
+            raise ValueError("Not a binary glTF file")
+        if version != 2:
+            raise ValueError(f"Unsupported GLB version: {version}")
+
+        offset = 12
+        end = min(total_length, len(data))
+        gltf_json: dict[str, Any] | None = None
+        bin_offset = 0
+        bin_length = 0
+        while offset + 8 <= end:
+            chunk_length, chunk_type = struct.unpack_from("<II", data, offset)
+            chunk_start = offset + 8
+            if chunk_type == CHUNK_JSON and gltf_json is None:
+                gltf_json = json.loads(data[chunk_start : chunk_start + chunk_length])
+            elif chunk_type == CHUNK_BIN and not bin_length:
+                bin_offset = chunk_start
+                bin_length = chunk_length
+            offset = chunk_start + chunk_length
+
+        if gltf_json is None:
+            raise ValueError("GLB JSON chunk is missing")
+        return gltf_json, bin_offset, bin_length
+
+    def accessor(self, index: int) -> np.ndarray:
+        accessor = self.json["accessors"][index]
+        if accessor.get("sparse"):
+            raise ValueError(f"Sparse accessor {index} is not supported")
+
+        dtype = _COMPONENT_DTYPES[accessor["componentType"]]
+        width = _TYPE_WIDTHS[accessor["type"]]
+        count = int(accessor["count"])
+        shape = (count,) if width == 1 else (count, width)
+
+        if "bufferView" not in accessor:
+            return np.zeros(shape, dtype=dtype)
+
+        view = self.json["bufferViews"][accessor["bufferView"]]
+        if view.get("buffer", 0) != 0 or "uri" in self.json["buffers"][view.get("buffer", 0)]:
+            raise ValueError(f"Accessor {index} references an external buffer")
+
+        offset = self._bin_offset + int(view.get("byteOffset", 0)) + int(accessor.get("byteOffset", 0))
+        element_size = dtype.itemsize * width
+        stride = int(view.get("byteStride") or element_size)
+        if count and offset + stride * (count - 1) + element_size > self._bin_offset + self._bin_length:
+            raise ValueError(f"Accessor {index} is out of BIN chunk bounds")
+
+        strides = (stride,) if width == 1 else (stride, dtype.itemsize)
+        array = np.ndarray(shape=shape, dtype=dtype, buffer=self._mmap, offset=offset, strides=strides)
+        array.flags.writeable = False
+        return array
+
+    def mesh_nodes(self) -> Iterator[GlbNode]:
+        nodes = self.json.get("nodes", [])
+        scenes = self.json.get("scenes", [])
+        if scenes:
+            roots = scenes[self.json.get("scene", 0)].get("nodes", [])
+        else:
+            children = {child for node in nodes for child in node.get("children", [])}
+            roots = [idx for idx in range(len(nodes)) if idx not in children]
+
+        stack = [(idx, np.eye(4, dtype=np.float64)) for idx in reversed(roots)]
+        while stack:
+            idx, parent = stack.pop()
+            node = nodes[idx]
+            world = parent @ _local_matrix(node)
+            if node.get("mesh") is not None:
+                yield GlbNode(index=idx, name=node.get("name"), mesh=int(node["mesh"]), matrix=world)
+            for child in reversed(node.get("children", [])):
+                stack.append((child, world))
+
+    def primitives(self, mesh_index: int) -> list[GlbPrimitive]:
+        mesh = self.json["meshes"][mesh_index]
+        result = []
+        for prim_index, primitive in enumerate(mesh.get("primitives", [])):
+            attributes = primitive.get("attributes", {})
+            if "POSITION" not in attributes:
+                continue
+            result.append(
+                GlbPrimitive(
+                    mesh=mesh_index,
+                    index=prim_index,
+                    positions=self.accessor(attributes["POSITION"]),
+                    indices=self.accessor(primitive["indices"]) if primitive.get("indices") is not None else None,
+                    normals=self.accessor(attributes["NORMAL"]) if "NORMAL" in attributes else None,
+                    colors=self.accessor(attributes["COLOR_0"]) if "COLOR_0" in attributes else None,
+                    material=primitive.get("material"),
+                    mode=int(primitive.get("mode", MODE_TRIANGLES)),
+                )
+            )
+        return result
+
+    def material_color(self, material_index: int | None) -> tuple[float, float, float] | None:
+        if material_index is None:
+            return None
+        materials = self.json.get("materials", [])
+        if material_index >= len(materials):
+            return None
+        factor = materials[material_index].get("pbrMetallicRoughness", {}).get("baseColorFactor")
+        if not factor or len(factor) < 3:
+            return None
+        return (float(factor[0]), float(factor[1]), float(factor[2]))
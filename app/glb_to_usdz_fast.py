@@ -1,169 +1,307 @@
 from __future__ import annotations
 
+import hashlib
 import logging
-import re
 import tempfile
 import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, Sequence, TypeVar
 
 import numpy as np
-import trimesh
-from pygltflib import GLTF2
-from pxr import Gf, Sdf, Usd, UsdGeom, UsdShade, UsdUtils, Vt
+from pxr import UsdGeom
+
+from .glb_reader import MODE_TRIANGLES, GlbPrimitive, GlbReader
+from .profiles import LOD_MIN_TRIANGLES
+from .sysinfo import peak_rss_bytes
+from .usd_scene import (
+    MeshGeometry,
+    MeshPayload,
+    UsdzSceneBuilder,
+    decimated_level,
+    face_normals,
+    material_color_key,
+    normalized,
+)
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+R = TypeVar("R")
 
-def _sanitize_name(name: str) -> str:
-    sanitized = re.sub(r"[^a-zA-Z0-9_]", "_", name)
-    if sanitized and sanitized[0].isdigit():
-        sanitized = "_" + sanitized
-    return sanitized or "_unnamed"
 
+def _get_material_color(reader: GlbReader, primitive: GlbPrimitive):
+    color = reader.material_color(primitive.material)
+    if color is not None:
+        if max(color) > 1:
+            return (color[0] / 255.0, color[1] / 255.0, color[2] / 255.0)
+        return color
+
+    if primitive.colors is not None and len(primitive.colors) > 0:
+        avg = primitive.colors[:, :3].mean(axis=0)
+        if primitive.colors.dtype == np.uint8:
+            avg = avg / 255.0
+        elif primitive.colors.dtype == np.uint16:
+            avg = avg / 65535.0
+        return (float(avg[0]), float(avg[1]), float(avg[2]))
+
+    return None
 
-def _get_material_color(geom):
-    if not hasattr(geom, "visual") or geom.visual is None:
-        return None
 
-    vis = geom.visual
-
-    if hasattr(vis, "material") and vis.material is not None:
-        mat = vis.material
-        if hasattr(mat, "baseColorFactor") and mat.baseColorFactor is not None:
-            c = mat.baseColorFactor
-            if len(c) >= 3:
-                r, g, b = c[0], c[1], c[2]
-                if max(r, g, b) > 1:
-                    return (r / 255.0, g / 255.0, b / 255.0)
-                return (float(r), float(g), float(b))
-
-    if hasattr(vis, "vertex_colors") and vis.vertex_colors is not None:
-        colors = vis.vertex_colors
-        if len(colors) > 0:
-            avg = colors.mean(axis=0)[:3]
-            if avg.max() > 1:
-                return (avg[0] / 255.0, avg[1] / 255.0, avg[2] / 255.0)
-            return tuple(avg)
+def _primitive_faces(primitive: GlbPrimitive) -> np.ndarray:
+    if primitive.indices is None:
+        return np.arange(len(primitive.positions), dtype=np.int32).reshape(-1, 3)
+    return primitive.indices.reshape(-1, 3)
 
+
+def _transform_normals(normals: np.ndarray, transform: np.ndarray) -> np.ndarray | None:
+    linear = transform[:3, :3]
+    if abs(np.linalg.det(linear)) < 1e-12:
+        return None
+    # Normals follow the inverse transpose of the node matrix; for row vectors that is n @ M^-1.
+    return normalized(np.asarray(normals, dtype=np.float64) @ np.linalg.inv(linear))
+
+
+def _mesh_normals(
+    primitive: GlbPrimitive,
+    vertices: np.ndarray,
+    faces: np.ndarray,
+    transform: np.ndarray | None,
+) -> tuple[np.ndarray, str]:
+    # Exported normals keep the hard edges of BIM geometry; quantized (integer) normals
+    # only differ by a constant scale, which normalization removes.
+    if primitive.normals is not None and len(primitive.normals) == len(primitive.positions):
+        if transform is None:
+            normals = normalized(np.asarray(primitive.normals, dtype=np.float64))
+        else:
+            normals = _transform_normals(primitive.normals, transform)
+        if normals is not None:
+            return normals.astype(np.float32), UsdGeom.Tokens.vertex
+    return face_normals(vertices, faces).astype(np.float32), UsdGeom.Tokens.uniform
+
+
+def _apply_transform(vertices: np.ndarray, transform: np.ndarray) -> np.ndarray:
+    return vertices @ transform[:3, :3].T + transform[:3, 3]
+
+
+def _geometry_hash(vertices: np.ndarray, faces: np.ndarray, color_key: tuple[float, float, float]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+    faces = np.ascontiguousarray(faces, dtype=np.int32)
+    digest.update(np.asarray(vertices.shape + faces.shape, dtype=np.int64).tobytes())
+    digest.update(vertices.tobytes())
+    digest.update(faces.tobytes())
+    digest.update(repr(color_key).encode("ascii"))
+    return digest.hexdigest()
+
+
+def _primitive_problem(primitive: GlbPrimitive) -> str | None:
+    """Why `primitive` cannot be read as a triangle list, or None if it can."""
+    if primitive.mode != MODE_TRIANGLES:
+        return "not_triangles"
+    if primitive.indices is None:
+        return "vertex_count" if len(primitive.positions) % 3 else None
+    if len(primitive.indices) % 3:
+        return "index_count"
+    if int(primitive.indices.max()) >= len(primitive.positions):
+        return "index_range"
     return None
 
 
-def glb_to_usdz_fast(glb_path: str, usdz_path: str) -> dict:
+def _iter_mesh_items(
+    reader: GlbReader, skipped: Counter | None = None
+) -> Iterator[tuple[str, np.ndarray, GlbPrimitive]]:
+    """Triangle primitives of every mesh node; malformed ones are left out and counted in `skipped`."""
+    for node in reader.mesh_nodes():
+        guid = node.name or f"node_{node.index}"
+        for primitive in reader.primitives(node.mesh):
+            if len(primitive.positions) == 0 or (primitive.indices is not None and len(primitive.indices) == 0):
+                continue
+            problem = _primitive_problem(primitive)
+            if problem:
+                if skipped is not None:
+                    skipped[problem] += 1
+                continue
+            yield guid, node.matrix, primitive
+
+
+@dataclass
+class _MeshTask:
+    guid: str
+    transform: np.ndarray
+    primitive: GlbPrimitive
+    geometry_key: str
+    instanced: bool
+    needs_geometry: bool
+
+
+def _hash_primitive(reader: GlbReader, primitive: GlbPrimitive) -> str:
+    color = _get_material_color(reader, primitive) or (0.8, 0.8, 0.8)
+    return _geometry_hash(primitive.positions, _primitive_faces(primitive), material_color_key(color))
+
+
+def _prepare_mesh(
+    reader: GlbReader,
+    task: _MeshTask,
+    lod_ratios: Sequence[float] = (),
+    lod_min_triangles: int = LOD_MIN_TRIANGLES,
+    faceted: bool = False,
+) -> MeshPayload:
+    # Pure NumPy work, safe to run on worker threads; nothing here touches the stage.
+    started = time.perf_counter()
+    primitive = task.primitive
+    faces = _primitive_faces(primitive)
+    payload = MeshPayload(
+        guid=task.guid,
+        transform=task.transform,
+        geometry_key=task.geometry_key,
+        instanced=task.instanced,
+        vertex_count=len(primitive.positions),
+        face_count=len(faces),
+        color=_get_material_color(reader, primitive) or (0.8, 0.8, 0.8),
+    )
+    if task.needs_geometry:
+        vertices = primitive.positions if task.instanced else _apply_transform(primitive.positions, task.transform)
+        geometry = MeshGeometry(
+            vertices=np.ascontiguousarray(vertices, dtype=np.float32),
+            faces=np.ascontiguousarray(faces, dtype=np.int32),
+        )
+        if not faceted:
+            normals_started = time.perf_counter()
+            transform = None if task.instanced else task.transform
+            geometry.normals, geometry.normals_interpolation = _mesh_normals(primitive, vertices, faces, transform)
+            payload.normals_seconds = time.perf_counter() - normals_started
+        payload.geometry = geometry
+        if lod_ratios and len(faces) >= lod_min_triangles:
+            payload.lods = [decimated_level(vertices, faces, ratio, faceted) for ratio in lod_ratios]
+    payload.prep_seconds = time.perf_counter() - started
+    return payload
+
+
+def _ordered_map(fn: Callable[[T], R], items: Iterable[T], workers: int) -> Iterator[R]:
+    """Like Executor.map, but keeps at most a small window of items in flight so
+    memory stays bounded while results are still yielded in input order."""
+    if workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="usdz-prep") as pool:
+        pending: deque[Future] = deque()
+        try:
+            for item in items:
+                pending.append(pool.submit(fn, item))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def glb_to_usdz_fast(
+    glb_path: str,
+    usdz_path: str,
+    instancing: bool = True,
+    min_instances: int = 2,
+    stream_batch_size: int = 0,
+    workers: int = 1,
+    merge_by_material: bool = False,
+    lod_ratios: Sequence[float] = (),
+    lod_min_triangles: int = LOD_MIN_TRIANGLES,
+    faceted: bool = False,
+) -> dict:
     start_time = time.time()
+    lod_ratios = sorted((float(ratio) for ratio in lod_ratios), reverse=True)
     stats = {
-        "vertex_count": 0,
-        "face_count": 0,
-        "mesh_count": 0,
-        "material_count": 0,
+        "prep_workers": max(1, int(workers)),
+        "normals_from_glb": 0,
+        "normals_flat": 0,
     }
+    # Wall-clock seconds per stage; prepare/normals are summed over worker threads.
+    stage_seconds = {"parse": 0.0, "hash": 0.0, "prepare": 0.0, "normals": 0.0, "author": 0.0, "package": 0.0}
 
     try:
-        gltf = GLTF2().load(str(glb_path))
-        scene = trimesh.load(str(glb_path), process=False)
-
-        node_to_guid = {}
-        for node in gltf.nodes:
-            if node.mesh is not None and node.name:
-                node_to_guid[node.mesh] = node.name
+        if any(not 0.0 < ratio < 1.0 for ratio in lod_ratios):
+            raise ValueError(f"LOD ratios must be between 0 and 1: {lod_ratios}")
 
+        parse_started = time.perf_counter()
+        reader = GlbReader(glb_path)
+        stage_seconds["parse"] = time.perf_counter() - parse_started
+        stats["parse_seconds"] = round(stage_seconds["parse"], 3)
         stats["file_size_bytes"] = Path(glb_path).stat().st_size
 
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            tmp_dir = Path(tmp_dir)
-            usdc_path = tmp_dir / "model.usdc"
-
-            stage = Usd.Stage.CreateNew(str(usdc_path))
-            stage.SetMetadata("metersPerUnit", 1.0)
-            stage.SetMetadata("upAxis", "Y")
-
-            root = UsdGeom.Xform.Define(stage, "/Root")
-            materials_cache = {}
-
-            if isinstance(scene, trimesh.Scene):
-                mesh_items = []
-                for node_name in scene.graph.nodes_geometry:
-                    transform, geom_name = scene.graph[node_name]
-                    geom = scene.geometry.get(geom_name)
-                    if geom is None or not isinstance(geom, trimesh.Trimesh) or len(geom.faces) == 0:
-                        continue
-                    transformed = geom.copy()
-                    transformed.apply_transform(transform)
-                    mesh_items.append((node_name, transformed, geom))
-            else:
-                mesh_items = [("mesh_0", scene, scene)]
-
-            mesh_idx = 0
-            for node_name, transformed_geom, original_geom in mesh_items:
-                guid = node_to_guid.get(mesh_idx, node_name)
-                prim_name = _sanitize_name(str(guid))
-                mesh_path = f"/Root/{prim_name}"
-
-                counter = 1
-                base_path = mesh_path
-                while stage.GetPrimAtPath(mesh_path).IsValid():
-                    mesh_path = f"{base_path}_{counter}"
-                    counter += 1
-
-                mesh_prim = UsdGeom.Mesh.Define(stage, mesh_path)
-
-                vertices = transformed_geom.vertices.astype(np.float64)
-                faces = transformed_geom.faces.astype(np.int32)
-
-                stats["vertex_count"] += len(vertices)
-                stats["face_count"] += len(faces)
-                stats["mesh_count"] += 1
-
-                points = Vt.Vec3fArray([Gf.Vec3f(float(v[0]), float(v[1]), float(v[2])) for v in vertices])
-                mesh_prim.GetPointsAttr().Set(points)
-                mesh_prim.GetFaceVertexCountsAttr().Set(Vt.IntArray([3] * len(faces)))
-                mesh_prim.GetFaceVertexIndicesAttr().Set(Vt.IntArray(faces.flatten().tolist()))
-                mesh_prim.GetSubdivisionSchemeAttr().Set(UsdGeom.Tokens.none)
-                mesh_prim.GetOrientationAttr().Set(UsdGeom.Tokens.rightHanded)
-
-                if hasattr(transformed_geom, "vertex_normals") and len(transformed_geom.vertex_normals) > 0:
-                    normals = transformed_geom.vertex_normals.astype(np.float64)
-                    normals_vec = Vt.Vec3fArray([Gf.Vec3f(float(n[0]), float(n[1]), float(n[2])) for n in normals])
-                    mesh_prim.GetNormalsAttr().Set(normals_vec)
-                    mesh_prim.SetNormalsInterpolation(UsdGeom.Tokens.vertex)
-
-                mesh_prim.GetDoubleSidedAttr().Set(True)
-
-                color = _get_material_color(original_geom) or (0.8, 0.8, 0.8)
-                color_key = (round(color[0], 3), round(color[1], 3), round(color[2], 3))
-
-                if color_key not in materials_cache:
-                    mat_idx = len(materials_cache)
-                    mat_path = f"/Root/Materials/Mat_{mat_idx}"
-
-                    material = UsdShade.Material.Define(stage, mat_path)
-                    shader = UsdShade.Shader.Define(stage, f"{mat_path}/PBRShader")
-                    shader.CreateIdAttr("UsdPreviewSurface")
-                    shader.CreateInput("diffuseColor", Sdf.ValueTypeNames.Color3f).Set(Gf.Vec3f(*color))
-                    shader.CreateInput("metallic", Sdf.ValueTypeNames.Float).Set(0.0)
-                    shader.CreateInput("roughness", Sdf.ValueTypeNames.Float).Set(0.5)
-                    material.CreateSurfaceOutput().ConnectToSource(shader.ConnectableAPI(), "surface")
-
-                    materials_cache[color_key] = material
-                    stats["material_count"] += 1
-
-                UsdShade.MaterialBindingAPI(mesh_prim).Bind(materials_cache[color_key])
-                mesh_prim.GetPrim().SetCustomDataByKey("ifcGuid", str(guid))
-                mesh_idx += 1
-
-            stage.SetDefaultPrim(root.GetPrim())
-            stage.Save()
-
-            usdz_out = Path(usdz_path)
-            usdz_out.parent.mkdir(parents=True, exist_ok=True)
-            if usdz_out.exists():
-                usdz_out.unlink()
-
-            if not UsdUtils.CreateNewUsdzPackage(str(usdc_path), str(usdz_out)):
-                return {"success": False, "error": "Failed to package USDZ"}
+        with reader, tempfile.TemporaryDirectory() as tmp_dir:
+            builder = UsdzSceneBuilder(
+                Path(tmp_dir),
+                stats,
+                stage_seconds,
+                stream_batch_size=stream_batch_size,
+                merge_by_material=merge_by_material,
+                level_count=len(lod_ratios) + 1,
+                on_flush=reader.release_pages,
+            )
+
+            # Identical local-space geometry (doors, windows, bolts...) is authored once as a
+            # prototype and placed through instanceable references.
+            hash_started = time.perf_counter()
+            geometry_keys = {}
+            unique_sources = {}
+            skipped = Counter()
+            for _, _, primitive in _iter_mesh_items(reader, skipped):
+                unique_sources.setdefault((primitive.mesh, primitive.index), primitive)
+            # One odd primitive (lines, points, a truncated accessor) must not fail the whole model.
+            stats["skipped_primitives"] = sum(skipped.values())
+            if skipped:
+                logger.warning("[glb_to_usdz_fast] Skipped primitives that are not triangle lists: %s", dict(skipped))
+            hashes = _ordered_map(lambda primitive: _hash_primitive(reader, primitive), unique_sources.values(), workers)
+            for source, geometry_key in zip(unique_sources, hashes):
+                geometry_keys[source] = geometry_key
+            del unique_sources
+
+            key_counts = Counter()
+            for _, _, primitive in _iter_mesh_items(reader):
+                key_counts[geometry_keys[(primitive.mesh, primitive.index)]] += 1
+            reader.release_pages()
+            stage_seconds["hash"] = time.perf_counter() - hash_started
+
+            # Merged batches bake every element into world space, so instancing does not apply.
+            instancing = instancing and not merge_by_material
+
+            def plan() -> Iterator[_MeshTask]:
+                seen_prototypes = set()
+                for guid, transform, primitive in _iter_mesh_items(reader):
+                    geometry_key = geometry_keys[(primitive.mesh, primitive.index)]
+                    instanced = instancing and key_counts[geometry_key] >= min_instances
+                    needs_geometry = not instanced or geometry_key not in seen_prototypes
+                    if instanced:
+                        seen_prototypes.add(geometry_key)
+                    yield _MeshTask(guid, transform, primitive, geometry_key, instanced, needs_geometry)
+
+            # Worker threads prepare payloads; this thread is the only one writing to USD,
+            # and it consumes payloads in plan order so the output does not depend on `workers`.
+            payloads = _ordered_map(
+                lambda task: _prepare_mesh(reader, task, lod_ratios, lod_min_triangles, faceted), plan(), workers
+            )
+            for payload in payloads:
+                stage_seconds["prepare"] += payload.prep_seconds
+                stage_seconds["normals"] += payload.normals_seconds
+                if payload.geometry is not None and payload.geometry.normals is not None:
+                    if payload.geometry.normals_interpolation == UsdGeom.Tokens.vertex:
+                        stats["normals_from_glb"] += 1
+                    else:
+                        stats["normals_flat"] += 1
+                builder.add(payload)
+
+            builder.finish(usdz_path)
 
         processing_time = time.time() - start_time
         stats["processing_time"] = round(processing_time, 3)
-        stats["usdz_size_bytes"] = Path(usdz_path).stat().st_size
+        stats["peak_rss_bytes"] = peak_rss_bytes()
+        stats["stage_seconds"] = {name: round(seconds, 3) for name, seconds in stage_seconds.items()}
         return {"success": True, "stats": stats}
 
     except Exception as exc:
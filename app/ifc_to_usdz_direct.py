@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Sequence
+
+import numpy as np
+from pxr import UsdGeom
+
+from .geometry_cache import GeometryCache, TessellatedShape, hash_elements
+from .profiles import LOD_MIN_TRIANGLES
+from .sysinfo import peak_rss_bytes
+from .usd_scene import (
+    MeshGeometry,
+    MeshPayload,
+    UsdzSceneBuilder,
+    decimated_level,
+    face_normals,
+    normalized,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLOR = (0.8, 0.8, 0.8)
+# Freshly tessellated elements written to the geometry cache per transaction.
+_CACHE_WRITE_BATCH = 256
+# IFC is Z-up; (x, y, z) -> (x, z, -y) matches the Y-up scene the GLB pipeline produces.
+_Z_UP_TO_Y_UP = np.array([[1.0, 0.0, 0.0], [0.0, 0.0, 1.0], [0.0, -1.0, 0.0]])
+
+
+def _geometry_settings(faceted: bool, mesher_settings: dict[str, float]):
+    import ifcopenshell.geom as geom
+
+    settings = geom.settings()
+    settings.set("use-world-coords", True)
+    settings.set("apply-default-materials", True)
+    # Welding drops the per-vertex normals, so only weld when normals are not wanted.
+    settings.set("weld-vertices", faceted)
+    for name, value in mesher_settings.items():
+        settings.set(name, value)
+    return settings
+
+
+def _material_color(material) -> tuple[float, float, float] | None:
+    try:
+        r, g, b = material.diffuse.components
+        return (float(r), float(g), float(b))
+    except Exception:
+        return None
+
+
+def _tessellated(shape) -> TessellatedShape:
+    geometry = shape.geometry
+    return TessellatedShape(
+        guid=shape.guid,
+        vertices=np.frombuffer(geometry.verts_buffer, dtype=np.float64).reshape(-1, 3),
+        faces=np.frombuffer(geometry.faces_buffer, dtype=np.int32).reshape(-1, 3),
+        normals=np.frombuffer(geometry.normals_buffer, dtype=np.float64).reshape(-1, 3),
+        material_ids=np.frombuffer(geometry.material_ids_buffer, dtype=np.int32),
+        colors=[_material_color(material) for material in geometry.materials],
+    )
+
+
+def _iterated_products(
+    ifc_file,
+    include_entities: Iterable[str] | None,
+    exclude_entities: Iterable[str] | None,
+) -> list:
+    # Mirrors the iterator's own filtering, which skips spaces and openings by default.
+    include = list(include_entities or [])
+    exclude = list(exclude_entities or []) if include else list(exclude_entities or []) + ["IfcSpace", "IfcOpeningElement"]
+    products = []
+    for product in ifc_file.by_type("IfcProduct"):
+        if product.Representation is None:
+            continue
+        if include and not any(product.is_a(name) for name in include):
+            continue
+        if any(product.is_a(name) for name in exclude):
+            continue
+        products.append(product)
+    return products
+
+
+def _shape_payloads(
+    shape: TessellatedShape,
+    lod_ratios: Sequence[float],
+    lod_min_triangles: int,
+    faceted: bool,
+) -> Iterator[MeshPayload]:
+    vertices = shape.vertices @ _Z_UP_TO_Y_UP.T
+    faces = shape.faces
+    if len(vertices) == 0 or len(faces) == 0:
+        return
+
+    normals = None
+    if not faceted and len(shape.normals) == len(vertices):
+        normals = normalized(shape.normals @ _Z_UP_TO_Y_UP.T)
+
+    colors = shape.colors
+    material_ids = shape.material_ids
+    if len(material_ids) != len(faces):
+        material_ids = np.zeros(len(faces), dtype=np.int32)
+
+    # One payload per IFC surface style, like one glTF primitive per material.
+    for material_id in np.unique(material_ids):
+        started = time.perf_counter()
+        part_faces = faces if len(colors) <= 1 else faces[material_ids == material_id]
+        used, remapped = np.unique(part_faces, return_inverse=True)
+        part_vertices = vertices[used]
+        part_faces = remapped.reshape(-1, 3)
+
+        mesh = MeshGeometry(
+            vertices=np.ascontiguousarray(part_vertices, dtype=np.float32),
+            faces=np.ascontiguousarray(part_faces, dtype=np.int32),
+        )
+        if not faceted:
+            if normals is not None:
+                mesh.normals = normals[used].astype(np.float32)
+            else:
+                mesh.normals = face_normals(part_vertices, part_faces).astype(np.float32)
+                mesh.normals_interpolation = UsdGeom.Tokens.uniform
+
+        color = colors[material_id] if 0 <= material_id < len(colors) else None
+        payload = MeshPayload(
+            guid=shape.guid,
+            transform=np.eye(4),
+            geometry_key="",
+            instanced=False,
+            vertex_count=len(part_vertices),
+            face_count=len(part_faces),
+            color=color or DEFAULT_COLOR,
+            geometry=mesh,
+        )
+        if lod_ratios and len(part_faces) >= lod_min_triangles:
+            payload.lods = [decimated_level(part_vertices, part_faces, ratio, faceted) for ratio in lod_ratios]
+        payload.prep_seconds = time.perf_counter() - started
+        yield payload
+
+
+def _check_cancel(cancel_check: Callable[[], bool] | None) -> None:
+    if cancel_check and cancel_check():
+        raise RuntimeError("Cancelled by user")
+
+
+def ifc_to_usdz_direct(
+    ifc_path: str,
+    usdz_path: str,
+    include_entities: Iterable[str] | None = None,
+    exclude_entities: Iterable[str] | None = None,
+    threads: int | None = None,
+    stream_batch_size: int = 0,
+    merge_by_material: bool = False,
+    lod_ratios: Sequence[float] = (),
+    lod_min_triangles: int = LOD_MIN_TRIANGLES,
+    faceted: bool = False,
+    mesher_settings: dict[str, float] | None = None,
+    geometry_cache: GeometryCache | None = None,
+    progress_cb: Callable[[int], None] | None = None,
+    cancel_check: Callable[[], bool] | None = None,
+) -> dict:
+    """Tessellate IFC products with the IfcOpenShell geometry iterator and author them as
+    USD meshes directly, without writing and re-parsing an intermediate GLB.
+
+    With a `geometry_cache`, elements whose content hash is already cached are authored
+    from the stored buffers and only the remaining ones go through the iterator.
+    """
+    start_time = time.time()
+    lod_ratios = sorted((float(ratio) for ratio in lod_ratios), reverse=True)
+    threads = max(1, int(threads or os.cpu_count() or 1))
+    include = list(include_entities or [])
+    exclude = list(exclude_entities or [])
+    mesher_settings = dict(mesher_settings or {})
+    stats = {"engine": "direct", "tessellation_threads": threads}
+    stage_seconds = {"parse": 0.0, "hash": 0.0, "tessellate": 0.0, "prepare": 0.0, "author": 0.0, "package": 0.0}
+
+    try:
+        import ifcopenshell
+        import ifcopenshell.geom as geom
+
+        if any(not 0.0 < ratio < 1.0 for ratio in lod_ratios):
+            raise ValueError(f"LOD ratios must be between 0 and 1: {lod_ratios}")
+
+        parse_started = time.perf_counter()
+        ifc_file = ifcopenshell.open(str(ifc_path))
+        stage_seconds["parse"] = time.perf_counter() - parse_started
+        stats["file_size_bytes"] = Path(ifc_path).stat().st_size
+
+        hashes: dict[str, str] = {}
+        settings_key = ""
+        cached: dict[str, TessellatedShape] = {}
+        pending = None
+        if geometry_cache is not None:
+            hash_started = time.perf_counter()
+            products = _iterated_products(ifc_file, include, exclude)
+            settings_key, hashes = hash_elements(ifc_file, products, f"weld={faceted}", sorted(mesher_settings.items()))
+            cached = geometry_cache.get_many(settings_key, hashes)
+            pending = [product for product in products if product.GlobalId not in cached]
+            stage_seconds["hash"] = time.perf_counter() - hash_started
+            lookups = len(cached) + len(pending)
+            stats["geometry_cache"] = {
+                "hits": len(cached),
+                "misses": len(pending),
+                "hit_ratio": round(len(cached) / lookups, 3) if lookups else None,
+            }
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            builder = UsdzSceneBuilder(
+                Path(tmp_dir),
+                stats,
+                stage_seconds,
+                stream_batch_size=stream_batch_size,
+                merge_by_material=merge_by_material,
+                level_count=len(lod_ratios) + 1,
+            )
+
+            def author(shape: TessellatedShape) -> None:
+                for payload in _shape_payloads(shape, lod_ratios, lod_min_triangles, faceted):
+                    stage_seconds["prepare"] += payload.prep_seconds
+                    builder.add(payload)
+
+            for shape in cached.values():
+                _check_cancel(cancel_check)
+                author(shape)
+
+            emitted = set(cached)
+            fresh: list[TessellatedShape] = []
+            if pending is None or pending:
+                iterator = geom.iterator(
+                    _geometry_settings(faceted, mesher_settings),
+                    ifc_file,
+                    num_threads=threads,
+                    # Cached runs name the exact elements; the type filters were applied above.
+                    include=pending if pending is not None else include or None,
+                    exclude=None if pending is not None else exclude or None,
+                )
+                tessellate_started = time.perf_counter()
+                has_shapes = iterator.initialize()
+                stage_seconds["tessellate"] += time.perf_counter() - tessellate_started
+                reported = -1
+                while has_shapes:
+                    _check_cancel(cancel_check)
+                    shape = _tessellated(iterator.get())
+                    if shape.guid not in emitted:
+                        emitted.add(shape.guid)
+                        author(shape)
+                        if geometry_cache is not None and shape.guid in hashes:
+                            fresh.append(shape)
+                            if len(fresh) >= _CACHE_WRITE_BATCH:
+                                geometry_cache.put_many(settings_key, hashes, fresh)
+                                fresh = []
+
+                    if progress_cb and iterator.progress() != reported:
+                        reported = iterator.progress()
+                        progress_cb(reported)
+                    tessellate_started = time.perf_counter()
+                    has_shapes = iterator.next()
+                    stage_seconds["tessellate"] += time.perf_counter() - tessellate_started
+                del iterator
+
+            if geometry_cache is not None:
+                # Elements that yield no geometry are cached as empty so they are not retried.
+                fresh.extend(TessellatedShape.empty(product.GlobalId) for product in pending if product.GlobalId not in emitted)
+                geometry_cache.put_many(settings_key, hashes, fresh)
+
+            del ifc_file
+            builder.finish(usdz_path)
+
+        stats["processing_time"] = round(time.time() - start_time, 3)
+        stats["peak_rss_bytes"] = peak_rss_bytes()
+        stats["stage_seconds"] = {name: round(seconds, 3) for name, seconds in stage_seconds.items()}
+        return {"success": True, "stats": stats}
+
+    except Exception as exc:
+        logger.exception("[ifc_to_usdz_direct] Failed")
+        return {"success": False, "error": str(exc)}
@@ -1,15 +1,28 @@
 from __future__ import annotations
 
+import heapq
 import json
 import os
 import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Callable
+from typing import Any, Callable, Collection, Hashable
 from uuid import uuid4
 
+from .job_persistence import MetaPersister
+from .job_store import Cursor, SqliteJobStore
 from .models import JobRecord
 
+KNOWN_STATUSES = ("queued", "running", "cancelling", "done", "failed", "cancelled")
+# States a job never leaves on its own; reaching one is always written to disk right away.
+TERMINAL_STATUSES = ("done", "failed", "cancelled")
+ACTIVE_STATUSES = ("queued", "running", "cancelling")
+# "json" keeps a job.json in every job folder; "sqlite" keeps all records in jobs.sqlite3.
+JOB_STORES = ("json", "sqlite")
+# Jobs remembered by the change feed; clients whose cursor is older get a full listing.
+CHANGE_FEED_SIZE = 1000
+
 
 def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
@@ -22,8 +35,68 @@ def _parse_datetime(raw: str) -> datetime:
     return dt
 
 
+def job_cursor(record: JobRecord) -> Cursor:
+    """Position of `record` in a `list_jobs` listing, usable as the next page's `before`."""
+    return record.updated_at, record.id
+
+
+class CancelToken:
+    """Per-job cancellation flag. Calling it works like any CancelCheck; callbacks let
+    blocking work (child processes, waits) be interrupted the moment the job is cancelled."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+
+    def __call__(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run `callback` on cancellation (right away if already cancelled); returns an unregister function."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._discard(callback)
+        callback()
+        return lambda: None
+
+    def _discard(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._event.wait(timeout)
+
+
 class JobManager:
-    def __init__(self, base_dir: Path, input_dir: Path | None = None, output_dir: Path | None = None):
+    def __init__(
+        self,
+        base_dir: Path,
+        input_dir: Path | None = None,
+        output_dir: Path | None = None,
+        store: str = "json",
+    ):
+        store = (store or "json").strip().lower()
+        if store not in JOB_STORES:
+            raise ValueError(f"Unknown job store: {store}")
         self.base_dir = base_dir.resolve()
         self.jobs_dir = self.base_dir / "jobs"
         self.jobs_dir.mkdir(parents=True, exist_ok=True)
@@ -34,52 +107,150 @@ class JobManager:
 
         self._lock = threading.RLock()
         self._jobs: dict[str, JobRecord] = {}
+        self._cancel_tokens: dict[str, CancelToken] = {}
+        # Change feed for incremental listings: job id -> sequence number of its latest change,
+        # oldest first. Sequences restart with the process, so cursors carry a per-run epoch.
+        self._epoch = uuid4().hex[:8]
+        self._change_seq = 0
+        self._changes: OrderedDict[str, int] = OrderedDict()
+        self._removed: set[str] = set()
+        self.change_feed_size = CHANGE_FEED_SIZE
+        # Sequence of the newest change pushed out of the feed; older cursors may have missed it.
+        self._feed_floor = 0
 
         retention_days = int(os.getenv("OFFLINE_CONVERTER_RETENTION_DAYS", "7"))
         self.retention = timedelta(days=max(retention_days, 1))
+        # Progress ticks only reach job.json once per interval; 0 writes every update.
+        flush_ms = int(os.getenv("OFFLINE_JOB_META_FLUSH_MS", "500"))
+        self.store = SqliteJobStore(self.base_dir / "jobs.sqlite3") if store == "sqlite" else None
+        if self.store:
+            self.persister = MetaPersister(flush_interval=max(flush_ms, 0) / 1000, write=self.store.save)
+        else:
+            self.persister = MetaPersister(flush_interval=max(flush_ms, 0) / 1000)
+
+    def _record_from_payload(self, payload: dict[str, Any], work_dir: Path | None = None) -> JobRecord:
+        raw_status = str(payload.get("status", "queued")).strip().lower()
+        if raw_status not in KNOWN_STATUSES:
+            output_name = payload.get("output_name")
+            output_exists = bool(output_name and (self.output_dir / str(output_name)).exists())
+            raw_status = "done" if output_exists else "queued"
+
+        return JobRecord(
+            id=payload["id"],
+            created_at=_parse_datetime(payload["created_at"]),
+            updated_at=_parse_datetime(payload["updated_at"]),
+            status=raw_status,
+            progress=int(payload.get("progress", 0)),
+            stage=payload.get("stage", "queued"),
+            error=payload.get("error"),
+            input_name=payload.get("input_name"),
+            output_name=payload.get("output_name"),
+            work_dir=work_dir or self.jobs_dir / payload["id"],
+            metadata=payload.get("metadata") or {},
+            options=payload.get("options") or {},
+            preflight=payload.get("preflight") or {},
+            checkpoints=payload.get("checkpoints") or {},
+            cancel_requested=bool(payload.get("cancel_requested", False)),
+        )
+
+    def _read_job_folders(self) -> list[JobRecord]:
+        records = []
+        for folder in sorted(self.jobs_dir.iterdir()):
+            meta = folder / "job.json"
+            if not folder.is_dir() or not meta.exists():
+                continue
+            try:
+                payload = json.loads(meta.read_text(encoding="utf-8"))
+                records.append(self._record_from_payload(payload, folder))
+            except Exception:
+                continue
+        return records
 
     def load_existing(self) -> int:
-        restored = 0
-        with self._lock:
-            for folder in sorted(self.jobs_dir.iterdir()):
-                if not folder.is_dir():
-                    continue
-                meta = folder / "job.json"
-                if not meta.exists():
-                    continue
-                try:
-                    payload = json.loads(meta.read_text(encoding="utf-8"))
-                    raw_status = str(payload.get("status", "queued")).strip().lower()
-                    known_statuses = {"queued", "running", "cancelling", "done", "failed", "cancelled"}
-                    if raw_status not in known_statuses:
-                        output_name = payload.get("output_name")
-                        output_exists = bool(output_name and (self.output_dir / str(output_name)).exists())
-                        raw_status = "done" if output_exists else "queued"
-
-                    record = JobRecord(
-                        id=payload["id"],
-                        created_at=_parse_datetime(payload["created_at"]),
-                        updated_at=_parse_datetime(payload["updated_at"]),
-                        status=raw_status,
-                        progress=int(payload.get("progress", 0)),
-                        stage=payload.get("stage", "queued"),
-                        error=payload.get("error"),
-                        input_name=payload.get("input_name"),
-                        output_name=payload.get("output_name"),
-                        work_dir=folder,
-                        metadata=payload.get("metadata") or {},
-                        cancel_requested=bool(payload.get("cancel_requested", False)),
-                    )
+        with self._lock:
+            if not self.store:
+                records = self._read_job_folders()
+                for record in records:
                     self._jobs[record.id] = record
-                    restored += 1
-                except Exception:
-                    continue
-        return restored
-
-    def list_jobs(self, limit: int = 50) -> list[JobRecord]:
+                return len(records)
+
+            if not self.store.migrated:
+                # One-off import of the job.json folders written before the store was enabled.
+                self.store.save_many([record.to_dict() for record in self._read_job_folders()])
+                self.store.mark_migrated()
+            # Finished jobs stay in the database until they are opened or listed.
+            for payload in self.store.load(ACTIVE_STATUSES):
+                record = self._record_from_payload(payload)
+                self._jobs[record.id] = record
+            return self.store.count()
+
+    def list_jobs(
+        self,
+        limit: int = 50,
+        statuses: Collection[str] | None = None,
+        before: Cursor | None = None,
+    ) -> list[JobRecord]:
+        """Most recently updated jobs first, optionally only those in `statuses`.
+
+        `before` is the cursor of the last job on the previous page (see `job_cursor`).
+        """
+        limit = max(1, limit)
+        with self._lock:
+            if self.store:
+                # Rows lag the records while their writes are pending, which would filter and order
+                # the page by stale values. Updates need the lock, so nothing changes after the flush.
+                self.persister.flush()
+                return [self._record_from_payload(payload) for payload in self.store.list(limit, statuses, before)]
+            jobs = [
+                record
+                for record in self._jobs.values()
+                if (statuses is None or record.status in statuses)
+                and (before is None or job_cursor(record) < before)
+            ]
+            return heapq.nlargest(limit, jobs, key=job_cursor)
+
+    def change_cursor(self) -> str:
+        """Opaque position in the change feed; it changes whenever any job does."""
         with self._lock:
-            jobs = sorted(self._jobs.values(), key=lambda x: x.updated_at, reverse=True)
-            return jobs[: max(1, limit)]
+            return f"{self._epoch}.{self._change_seq}"
+
+    def changes_since(
+        self, cursor: str, statuses: Collection[str] | None = None
+    ) -> tuple[list[JobRecord], list[str]] | None:
+        """Jobs changed after `cursor`, most recently changed first, and the ids of jobs that were
+        removed or no longer match `statuses` since then.
+
+        Returns None when the cursor comes from another run of the service or is older than
+        the changes the feed still holds; the caller then needs a full listing.
+        """
+        epoch, _, raw_seq = cursor.partition(".")
+        with self._lock:
+            if epoch != self._epoch or not raw_seq.isdigit():
+                return None
+            if not self._feed_floor <= int(raw_seq) <= self._change_seq:
+                return None
+            since = int(raw_seq)
+            changed, gone = [], []
+            for job_id in reversed(self._changes):
+                if self._changes[job_id] <= since:
+                    break
+                record = None if job_id in self._removed else self.get(job_id)
+                if record is not None and (statuses is None or record.status in statuses):
+                    changed.append(record)
+                else:
+                    gone.append(job_id)
+            return changed, gone
+
+    def _mark_changed(self, job_id: str, removed: bool = False) -> None:
+        with self._lock:
+            self._change_seq += 1
+            self._changes[job_id] = self._change_seq
+            self._changes.move_to_end(job_id)
+            if removed:
+                self._removed.add(job_id)
+            while len(self._changes) > self.change_feed_size:
+                oldest, self._feed_floor = self._changes.popitem(last=False)
+                self._removed.discard(oldest)
 
     def list_pending_for_resume(self) -> list[JobRecord]:
         """Jobs that should be resumed after service restart."""
@@ -99,7 +270,7 @@ class JobManager:
             items.sort(key=lambda x: x.updated_at, reverse=False)
             return items
 
-    def create_job(self) -> JobRecord:
+    def create_job(self, input_name: str | None = None, options: dict[str, Any] | None = None) -> JobRecord:
         with self._lock:
             job_id = str(uuid4())
             now = _utcnow()
@@ -110,28 +281,46 @@ class JobManager:
                 created_at=now,
                 updated_at=now,
                 work_dir=work_dir,
+                input_name=input_name,
+                options=dict(options or {}),
             )
             self._jobs[job_id] = record
+            # Written at once with its options: a job restored without them would run with the defaults.
             self._write_meta(record)
             return record
 
     def get(self, job_id: str) -> JobRecord | None:
         with self._lock:
-            return self._jobs.get(job_id)
+            record = self._jobs.get(job_id)
+            if record is None and self.store:
+                payload = self.store.get(job_id)
+                if payload:
+                    record = self._record_from_payload(payload)
+                    # Only unfinished jobs are kept in memory; finished ones are read again when needed.
+                    if record.status in ACTIVE_STATUSES:
+                        self._jobs[job_id] = record
+            return record
+
+    def _require(self, job_id: str) -> JobRecord:
+        record = self.get(job_id)
+        if record is None:
+            raise KeyError(job_id)
+        return record
 
     def update(self, job_id: str, **kwargs) -> JobRecord:
         with self._lock:
-            record = self._jobs[job_id]
+            record = self._require(job_id)
             for k, v in kwargs.items():
                 setattr(record, k, v)
             record.updated_at = _utcnow()
-            self._write_meta(record)
+            self._write_meta(record, immediate=record.status in TERMINAL_STATUSES)
             return record
 
     def request_cancel(self, job_id: str) -> JobRecord:
         with self._lock:
-            record = self._jobs[job_id]
+            record = self._require(job_id)
             record.cancel_requested = True
+            token = self.cancel_token(job_id)
             if record.status == "queued":
                 record.status = "cancelled"
                 record.stage = "cancelled"
@@ -143,11 +332,23 @@ class JobManager:
                 record.error = "Cancellation requested"
             record.updated_at = _utcnow()
             self._write_meta(record)
-            return record
+        # Callbacks may stop child processes; run them without holding the manager lock.
+        token.cancel()
+        return record
+
+    def cancel_token(self, job_id: str) -> CancelToken:
+        with self._lock:
+            token = self._cancel_tokens.get(job_id)
+            if token is None:
+                token = self._cancel_tokens[job_id] = CancelToken()
+                record = self.get(job_id)
+                if record and record.cancel_requested:
+                    token.cancel()
+            return token
 
     def is_cancel_requested(self, job_id: str) -> bool:
         with self._lock:
-            record = self._jobs.get(job_id)
+            record = self.get(job_id)
             return bool(record and record.cancel_requested)
 
     def set_cancelled(self, job_id: str, reason: str = "Cancelled by user") -> JobRecord:
@@ -159,6 +360,15 @@ class JobManager:
     def set_running(self, job_id: str, stage: str, progress: int) -> JobRecord:
         return self.update(job_id, status="running", stage=stage, progress=max(0, min(progress, 100)))
 
+    def set_checkpoint(self, job_id: str, stage: str, checkpoint: dict) -> JobRecord:
+        with self._lock:
+            record = self._require(job_id)
+            # Written right away: a checkpoint is only useful if it survives a crash.
+            record.checkpoints = {**record.checkpoints, stage: checkpoint}
+            record.updated_at = _utcnow()
+            self._write_meta(record)
+            return record
+
     def set_done(self, job_id: str, output_name: str, metadata: dict) -> JobRecord:
         return self.update(
             job_id,
@@ -193,10 +403,6 @@ class JobManager:
         assert record.work_dir is not None
         return record.work_dir / "model.glb"
 
-    def output_path(self, record: JobRecord) -> Path:
-        assert record.work_dir is not None
-        return record.work_dir / "model.usdz"
-
     def final_output_path(self, record: JobRecord, output_name: str | None = None) -> Path:
         name = output_name or record.output_name or self.output_file_name(record)
         return self.output_dir / name
@@ -215,10 +421,21 @@ class JobManager:
         removed = 0
         cutoff = _utcnow() - self.retention
         with self._lock:
-            for job_id, record in list(self._jobs.items()):
-                if record.updated_at < cutoff and record.status in ("done", "failed", "cancelled"):
+            candidates = set(self._jobs)
+            if self.store:
+                candidates.update(self.store.updated_before(cutoff, TERMINAL_STATUSES))
+            for job_id in sorted(candidates):
+                record = self.get(job_id)
+                if record and record.updated_at < cutoff and record.status in TERMINAL_STATUSES:
+                    key = self._meta_key(record)
+                    if key is not None:
+                        self.persister.discard(key)
+                    if self.store:
+                        self.store.delete(job_id)
                     self._remove_job_files(record)
                     self._jobs.pop(job_id, None)
+                    self._cancel_tokens.pop(job_id, None)
+                    self._mark_changed(job_id, removed=True)
                     removed += 1
         return removed
 
@@ -240,11 +457,26 @@ class JobManager:
                 p.rmdir()
         work_dir.rmdir()
 
-    def _write_meta(self, record: JobRecord) -> None:
-        if not record.work_dir:
+    def close(self) -> None:
+        """Write pending job.json updates; later updates are written immediately."""
+        self.persister.close()
+
+    def _meta_key(self, record: JobRecord) -> Hashable | None:
+        if self.store:
+            return record.id
+        return record.work_dir / "job.json" if record.work_dir else None
+
+    def _write_meta(self, record: JobRecord, immediate: bool = True) -> None:
+        # Every change to a record is persisted through here, so it also feeds the change feed.
+        self._mark_changed(record.id)
+        key = self._meta_key(record)
+        if key is None:
             return
-        meta_path = record.work_dir / "job.json"
-        meta_path.write_text(json.dumps(record.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+        # The snapshot is taken under the manager lock; deferred writes happen on the writer thread.
+        self.persister.submit(key, record.to_dict(), immediate=immediate)
+        if self.store and immediate and record.status in TERMINAL_STATUSES:
+            # Its row is written, so a finished job leaves memory like those loaded at start-up.
+            self._jobs.pop(record.id, None)
 
 
 ProgressCallback = Callable[[str, int], None]
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Hashable
+
+
+def write_json_atomic(path: Path, payload: dict[str, Any]) -> None:
+    # A torn job.json would lose the job and its checkpoints on restart, so replace it whole.
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class MetaPersister:
+    """Write-behind persistence for job records.
+
+    `write(key, payload)` stores one record; by default the key is the path of a job.json file.
+    Deferred payloads are coalesced per key and written by a background thread at most once
+    every `flush_interval` seconds, so a job reporting progress many times a second costs one
+    write per interval. Immediate payloads (terminal states, checkpoints) are written before
+    `submit` returns and supersede anything still pending for that key; a payload is never
+    written over a newer one. `flush_interval=0` writes everything immediately.
+    """
+
+    def __init__(self, flush_interval: float, write: Callable[[Any, dict[str, Any]], None] = write_json_atomic):
+        self.flush_interval = max(0.0, flush_interval)
+        self._write_record = write
+        self._lock = threading.Lock()
+        # Serialises writes so the sequence check and the write happen together. A flush holds it
+        # for its whole drain, so a flush also waits for the writes another flush has taken.
+        self._write_lock = threading.RLock()
+        self._pending: dict[Hashable, tuple[int, dict[str, Any]]] = {}
+        self._written_seq: dict[Hashable, int] = {}
+        self._seq = 0
+        self._submitted = 0
+        self._writes = 0
+        self._failures = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, key: Hashable, payload: dict[str, Any], immediate: bool = False) -> None:
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            self._submitted += 1
+            if immediate or not self.flush_interval or self._stop.is_set():
+                self._pending.pop(key, None)
+            else:
+                self._pending[key] = (seq, payload)
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="job-meta-writer", daemon=True)
+                    self._thread.start()
+                self._wake.set()
+                return
+        self._write(key, seq, payload)
+
+    def discard(self, key: Hashable) -> None:
+        """Forget a job that is being removed."""
+        with self._lock:
+            self._pending.pop(key, None)
+        with self._write_lock:
+            self._written_seq.pop(key, None)
+
+    def _write(self, key: Hashable, seq: int, payload: dict[str, Any]) -> None:
+        with self._write_lock:
+            if self._written_seq.get(key, 0) > seq:
+                return
+            try:
+                self._write_record(key, payload)
+            except Exception:
+                # E.g. the job folder was removed meanwhile; later writes still get through.
+                with self._lock:
+                    self._failures += 1
+                return
+            self._written_seq[key] = seq
+        with self._lock:
+            self._writes += 1
+
+    def flush(self) -> None:
+        """Write everything submitted so far; returns once it is all written."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._wake.clear()
+            for key, (seq, payload) in pending.items():
+                self._write(key, seq, payload)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait()
+            # Let updates arriving during the interval pile up, then write each job once.
+            if self._stop.wait(self.flush_interval):
+                break
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the background writer and write whatever is still pending."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "flush_interval_ms": int(self.flush_interval * 1000),
+                "submitted": self._submitted,
+                "written": self._writes,
+                "writes_saved": max(0, self._submitted - self._writes - self._failures - len(self._pending)),
+                "pending": len(self._pending),
+                "failed": self._failures,
+            }
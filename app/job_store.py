@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Collection, Iterator
+
+# Bump when a schema change needs the job.json folders to be imported again.
+JOB_STORE_FORMAT = 1
+
+# (updated_at, id) of the last job on the previous page; the next page starts just below it.
+Cursor = tuple[datetime, str]
+
+
+class SqliteJobStore:
+    """Job records in one SQLite database in WAL mode, for stations that keep thousands of jobs.
+
+    Each row keeps the full record as JSON next to indexed `status` and `updated_at` columns,
+    so listings are keyset-paginated index scans instead of a sort over every record.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps the database consistent after a crash with NORMAL; only the last commits may be lost.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                record TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (updated_at, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_updated ON jobs (status, updated_at, id)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @property
+    def migrated(self) -> bool:
+        with self._lock:
+            return int(self._conn.execute("PRAGMA user_version").fetchone()[0]) >= JOB_STORE_FORMAT
+
+    def mark_migrated(self) -> None:
+        with self._lock:
+            self._conn.execute(f"PRAGMA user_version = {JOB_STORE_FORMAT}")
+            self._conn.commit()
+
+    def save(self, job_id: str, payload: dict[str, Any]) -> None:
+        self.save_many([payload])
+
+    def save_many(self, payloads: Collection[dict[str, Any]]) -> None:
+        rows = [
+            (
+                payload["id"],
+                payload["status"],
+                datetime.fromisoformat(payload["updated_at"]).timestamp(),
+                json.dumps(payload, ensure_ascii=False),
+            )
+            for payload in payloads
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._conn.commit()
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0])
+
+    def _select(
+        self, columns: str, statuses: Collection[str] | None, where: str = "", params: tuple = ()
+    ) -> tuple[str, list]:
+        clauses, values = [], []
+        if statuses is not None:
+            clauses.append(f"status IN ({','.join('?' * len(statuses))})")
+            values.extend(statuses)
+        if where:
+            clauses.append(where)
+            values.extend(params)
+        sql = f"SELECT {columns} FROM jobs"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return sql, values
+
+    def load(self, statuses: Collection[str] | None = None) -> Iterator[dict[str, Any]]:
+        sql, values = self._select("record", statuses)
+        with self._lock:
+            rows = self._conn.execute(sql, values).fetchall()
+        for (record,) in rows:
+            yield json.loads(record)
+
+    def list(
+        self, limit: int, statuses: Collection[str] | None = None, before: Cursor | None = None
+    ) -> list[dict[str, Any]]:
+        """The most recently updated jobs, newest first, starting after `before`."""
+        where, params = "", ()
+        if before is not None:
+            where, params = "(updated_at, id) < (?, ?)", (before[0].timestamp(), before[1])
+        sql, values = self._select("record", statuses, where, params)
+        sql += " ORDER BY updated_at DESC, id DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, (*values, max(1, limit))).fetchall()
+        return [json.loads(record) for (record,) in rows]
+
+    def updated_before(self, cutoff: datetime, statuses: Collection[str]) -> list[str]:
+        sql, values = self._select("id", statuses, "updated_at < ?", (cutoff.timestamp(),))
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, values)]
@@ -1,18 +1,39 @@
 from __future__ import annotations
 
+import hashlib
 import os
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
 from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
+from typing import Iterator
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 
-from .converter import get_diagnostics, run_fast_pipeline
-from .job_manager import JobManager
+from .checkpoints import make_checkpoint, stage_inputs, verify_checkpoint
+from .conversion_cache import ConversionCache, file_sha256
+from .converter import (
+    DEFAULT_ENGINE,
+    ENGINES,
+    conversion_stack_status,
+    get_diagnostics,
+    prewarm_conversion_stack,
+    prewarm_diagnostics,
+    run_fast_pipeline,
+)
+from .job_manager import KNOWN_STATUSES, JobManager, job_cursor
+from .job_store import Cursor
+from .models import JobRecord
+from .preflight import preflight_ifc
+from .process_executor import ConversionWorkerPool
+from .profiles import DEFAULT_PROFILE, LOD_MIN_TRIANGLES, PROFILES, get_profile
+from .scheduler import CoreBudget, MemoryBudget, RssWatchdog, StageScheduler
+from .sysinfo import process_rss_bytes
 
 APP_DIR = Path(__file__).resolve().parent
 PROJECT_DIR = APP_DIR.parent
@@ -24,12 +45,48 @@ USDZ_DIR = STORAGE_ROOT / "usdz"
 VERSION_FILE = CONFIG_DIR / "version.yaml"
 RELEASES_URL = "https://github.com/fesworkscience/gip-vision-offline-usb/releases"
 
+# offline_runner stamps the process start; when imported any other way, timing starts here.
+_started_at = float(os.getenv("OFFLINE_STARTED_AT", "0") or 0) or time.time()
+_startup: dict[str, object] = {"app_ready_seconds": None, "first_response_seconds": None, "first_response_path": None}
+
 app = FastAPI(title="Offline IFC Converter", version="1.0.8")
 app.mount("/static", StaticFiles(directory=str(APP_DIR / "static")), name="static")
 
-job_manager = JobManager(base_dir=WORKSPACE_DIR, input_dir=IFC_DIR, output_dir=USDZ_DIR)
-max_workers = int(os.getenv("OFFLINE_CONVERTER_MAX_WORKERS", "1"))
-executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+job_manager = JobManager(
+    base_dir=WORKSPACE_DIR,
+    input_dir=IFC_DIR,
+    output_dir=USDZ_DIR,
+    store=os.getenv("OFFLINE_JOB_STORE", "json"),
+)
+max_workers = max(1, int(os.getenv("OFFLINE_CONVERTER_MAX_WORKERS", "1")))
+# Jobs per stage pool; a job holds a slot only while it runs that stage, so the next job
+# can tessellate while the previous one is packaged.
+stage_scheduler = StageScheduler(
+    {
+        "tessellation": int(os.getenv("OFFLINE_TESSELLATION_WORKERS", "0")) or max_workers,
+        "packaging": int(os.getenv("OFFLINE_PACKAGING_WORKERS", "0")) or max_workers,
+    }
+)
+job_slots = sum(stage_scheduler.slots.values())
+executor = ThreadPoolExecutor(max_workers=job_slots)
+# Cores shared by all running jobs; each stage asks for the job's current share.
+core_budget = CoreBudget(int(os.getenv("OFFLINE_CONVERTER_CORES", "0")) or None)
+# "process" runs conversions in recycled worker processes instead of the server process.
+executor_mode = os.getenv("OFFLINE_CONVERTER_EXECUTOR", "thread").strip().lower()
+worker_pool = (
+    ConversionWorkerPool(
+        workers=job_slots,
+        max_jobs=int(os.getenv("OFFLINE_WORKER_MAX_JOBS", "20")),
+        max_rss_bytes=int(os.getenv("OFFLINE_WORKER_MAX_RSS_MB", "4096")) * 1024 * 1024,
+    )
+    if executor_mode == "process"
+    else None
+)
+run_pipeline = worker_pool.run_pipeline if worker_pool else run_fast_pipeline
+# Jobs start only when their pre-flight memory estimate fits; 0 MB budgets from free RAM.
+memory_budget = MemoryBudget(int(os.getenv("OFFLINE_CONVERTER_MEMORY_MB", "0")) * 1024 * 1024 or None)
+# Resident memory at which a job's worker process is stopped; 0 MB disables it. Not enforced in thread mode.
+job_rss_limit_bytes = int(os.getenv("OFFLINE_JOB_MAX_RSS_MB", "0")) * 1024 * 1024
 _futures_lock = threading.RLock()
 _job_futures: dict[str, Future] = {}
 
@@ -45,6 +102,22 @@ def _sanitize_filename(name: str) -> str:
     return clean or "model.ifc"
 
 
+def _parse_lod_ratios(raw: str) -> list[float]:
+    ratios = []
+    for part in (raw or "").replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            ratio = float(part)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid LOD ratio: {part}") from None
+        if not 0.0 < ratio < 1.0:
+            raise HTTPException(status_code=400, detail="LOD ratios must be between 0 and 1")
+        ratios.append(ratio)
+    return ratios
+
+
 def _read_version_yaml() -> dict[str, str]:
     if not VERSION_FILE.exists():
         return {}
@@ -66,6 +139,20 @@ def _read_version_yaml() -> dict[str, str]:
     return result
 
 
+def _converter_version() -> str:
+    payload = _read_version_yaml()
+    return f"{payload.get('version', app.version)}+{payload.get('commit', '')}"
+
+
+# Finished conversions keyed by IFC content and settings; 0 MB disables the cache.
+cache_limit_mb = int(os.getenv("OFFLINE_CONVERTER_CACHE_MB", "2048"))
+conversion_cache = ConversionCache(
+    WORKSPACE_DIR / "cache",
+    max_bytes=max(0, cache_limit_mb) * 1024 * 1024,
+    version=_converter_version(),
+)
+
+
 def _cleanup_loop() -> None:
     while not _cleanup_stop.is_set():
         try:
@@ -75,6 +162,21 @@ def _cleanup_loop() -> None:
         _cleanup_stop.wait(3600)
 
 
+def _preflight(job_id: str, record: JobRecord, input_ifc: Path, options: dict) -> dict:
+    """Scan the IFC, store the report on the job and resolve engine "auto" in `options`."""
+    job_manager.set_running(job_id, stage="preflight", progress=8)
+    report = preflight_ifc(input_ifc, core_budget.total_cores)
+    job_manager.update(job_id, preflight=report)
+    job_manager.with_log(
+        record,
+        f"Preflight: products={report['products']}, booleans={report['boolean_operations']}, "
+        f"estimated_seconds={report['estimated_seconds']}, engine={report['suggested_engine']}",
+    )
+    if options["engine"] == "auto":
+        options["engine"] = report["suggested_engine"]
+    return report
+
+
 def _run_job(job_id: str) -> None:
     record = job_manager.get(job_id)
     if not record:
@@ -83,6 +185,11 @@ def _run_job(job_id: str) -> None:
     if record.status == "cancelled":
         return
 
+    out_name = job_manager.output_file_name(record)
+    # The USDZ is packaged straight into its final location (temp name + atomic rename).
+    final = job_manager.final_output_path(record, out_name)
+    watchdog: RssWatchdog | None = None
+
     try:
         job_manager.set_running(job_id, stage="starting", progress=5)
         job_manager.with_log(record, "Starting fast conversion pipeline")
@@ -97,29 +204,116 @@ def _run_job(job_id: str) -> None:
 
         input_ifc = job_manager.input_path(record)
         output_glb = job_manager.glb_path(record)
-        output_usdz = job_manager.output_path(record)
 
         started = time.time()
-        stats = run_fast_pipeline(
-            input_ifc=input_ifc,
-            output_glb=output_glb,
-            output_usdz=output_usdz,
-            progress_cb=progress_cb,
-            cancel_check=lambda: job_manager.is_cancel_requested(job_id),
-        )
+        options = dict(record.options or {})
+
+        options.setdefault("engine", DEFAULT_ENGINE)
+        ifc_sha256 = file_sha256(input_ifc)
+        intermediate_outputs = {"ifc_to_glb": output_glb}
+
+        cache_key = None
+        if conversion_cache.enabled:
+            # The resolved profile goes into the key, so editing a profile's filters or
+            # tolerances invalidates conversions made with its old definition. "auto" is keyed
+            # as is: the engine it resolves to depends only on the IFC bytes, already in the key.
+            profile = get_profile(options.get("profile"))
+            cache_key = conversion_cache.make_key(
+                input_ifc,
+                engine=options["engine"],
+                include_entities=profile.include_entities,
+                exclude_entities=profile.exclude_entities,
+                options={**options, "profile": profile.to_dict()},
+                ifc_sha256=ifc_sha256,
+            )
+        # Looked up before preflight, so a hit does not pay for scanning the IFC.
+        cached = conversion_cache.lookup(cache_key, final) if cache_key else None
+        if cached is None:
+            report = _preflight(job_id, record, input_ifc, options)
+            # Checkpoints are only trusted for the same IFC bytes, options and converter build.
+            inputs = stage_inputs(ifc_sha256, options, _converter_version())
+            final_stage = "ifc_to_usdz" if options["engine"] == "direct" else "glb_to_usdz"
+
+        if cached is not None:
+            job_manager.with_log(record, f"Cache hit {cache_key[:12]}, reusing previous conversion")
+            stats = dict(cached)
+        elif verify_checkpoint(record.checkpoints.get(final_stage), inputs, final):
+            job_manager.with_log(record, f"Resuming: {final_stage} already completed and verified")
+            stats = dict(record.checkpoints[final_stage].get("stats") or {})
+        else:
+            completed_stages = [
+                stage
+                for stage, output in intermediate_outputs.items()
+                if verify_checkpoint(record.checkpoints.get(stage), inputs, output)
+            ]
+            if completed_stages:
+                job_manager.with_log(record, f"Resuming after verified stages: {', '.join(completed_stages)}")
+            cancel_token = job_manager.cancel_token(job_id)
+            estimate = report["estimated_peak_rss_bytes"]
+
+            def on_memory_wait() -> None:
+                job_manager.set_running(job_id, stage="waiting_memory", progress=9)
+                job_manager.with_log(record, f"Waiting for memory: estimated peak {estimate // (1024 * 1024)} MB")
+
+            submitter = threading.get_ident()
+
+            # A worker process holds one job, so its RSS can be enforced. In thread mode the server's
+            # RSS covers every running job; its growth since this job started is recorded, never enforced.
+            rss_baseline = 0 if worker_pool else process_rss_bytes() or 0
+            rss_limit = job_rss_limit_bytes if worker_pool else None
+
+            def job_rss() -> int | None:
+                if not worker_pool:
+                    current = process_rss_bytes()
+                    return max(0, current - rss_baseline) if current else None
+                pid = worker_pool.worker_pid(submitter)
+                return process_rss_bytes(pid) if pid else None
+
+            def on_stage_wait(pool: str) -> None:
+                rec = job_manager.get(job_id)
+                job_manager.set_running(job_id, stage=f"waiting_{pool}", progress=rec.progress if rec else 10)
+
+            @contextmanager
+            def stage_gate(stage: str) -> Iterator[None]:
+                # Only jobs inside a stage share the cores, not those queued for one.
+                with stage_scheduler.stage(job_id, stage, cancel_check=cancel_token, on_wait=on_stage_wait):
+                    with core_budget.job(job_id, max_threads=report["suggested_max_threads"]):
+                        yield
+                # Reached only when the stage succeeded; hashing runs after its slot is freed.
+                if stage in intermediate_outputs:
+                    job_manager.set_checkpoint(job_id, stage, make_checkpoint(inputs, intermediate_outputs[stage]))
+
+            with memory_budget.admit(job_id, estimate, cancel_check=cancel_token, on_wait=on_memory_wait):
+                watchdog = RssWatchdog(rss_limit, job_rss, cancel_token.cancel)
+                with watchdog:
+                    stats = run_pipeline(
+                        input_ifc=input_ifc,
+                        output_glb=output_glb,
+                        output_usdz=final,
+                        progress_cb=progress_cb,
+                        cancel_check=cancel_token,
+                        options=options,
+                        threads=lambda: core_budget.share(job_id),
+                        stage_gate=stage_gate,
+                        completed_stages=completed_stages,
+                    )
+            stats["memory"] = {
+                "estimated_peak_bytes": estimate,
+                # Jobs shorter than one watchdog poll may finish unobserved.
+                "observed_peak_bytes": watchdog.peak_bytes or None,
+                "limit_bytes": watchdog.limit_bytes,
+            }
+            job_manager.set_checkpoint(job_id, final_stage, make_checkpoint(inputs, final, stats))
+            if cache_key and not job_manager.is_cancel_requested(job_id):
+                conversion_cache.store(cache_key, final, stats)
 
         if job_manager.is_cancel_requested(job_id):
             raise RuntimeError("Cancelled by user")
 
-        out_name = job_manager.output_file_name(record)
-        final = job_manager.final_output_path(record, out_name)
-        if final.exists():
-            final.unlink()
-        output_usdz.replace(final)
-
         total_seconds = round(time.time() - started, 3)
         stats = dict(stats or {})
         stats["total_seconds"] = total_seconds
+        stats["cache"] = {"hit": cached is not None, "key": cache_key}
 
         job_manager.with_log(record, f"Completed successfully: {final.name}; total_seconds={total_seconds}")
         job_manager.set_done(job_id, output_name=out_name, metadata=stats)
@@ -127,8 +321,11 @@ def _run_job(job_id: str) -> None:
     except Exception as exc:
         rec = job_manager.get(job_id)
         message = str(exc)
+        if watchdog and watchdog.error:
+            message = watchdog.error
         if rec:
             job_manager.with_log(rec, f"Failed: {message}")
+        final.unlink(missing_ok=True)
         if "Cancelled by user" in message:
             job_manager.set_cancelled(job_id, reason=message)
         else:
@@ -148,6 +345,7 @@ def _submit_job(job_id: str) -> None:
 
 @app.on_event("startup")
 def on_startup() -> None:
+    _startup["app_ready_seconds"] = round(time.time() - _started_at, 3)
     restored = job_manager.load_existing()
     removed = job_manager.cleanup_expired()
     resumed = 0
@@ -173,6 +371,29 @@ def on_shutdown() -> None:
     if _cleanup_thread and _cleanup_thread.is_alive():
         _cleanup_thread.join(timeout=2)
     executor.shutdown(wait=False, cancel_futures=True)
+    if worker_pool:
+        worker_pool.shutdown()
+    job_manager.close()
+
+
+@app.middleware("http")
+async def _prewarm_after_first_response(request: Request, call_next):
+    response = await call_next(request)
+    # Start-up hooks run before uvicorn binds the port, so heavy imports wait for the first
+    # answered request instead of delaying it.
+    if _startup["first_response_seconds"] is None:
+        _startup["first_response_seconds"] = round(time.time() - _started_at, 3)
+        _startup["first_response_path"] = request.url.path
+        print(
+            f"[offline-converter] first response ({request.url.path}) "
+            f"{_startup['first_response_seconds']} s after start"
+        )
+        if worker_pool:
+            threading.Thread(target=worker_pool.prewarm, name="worker-prewarm", daemon=True).start()
+        else:
+            prewarm_conversion_stack()
+        prewarm_diagnostics()
+    return response
 
 
 @app.get("/")
@@ -186,8 +407,18 @@ def health() -> dict:
 
 
 @app.get("/api/diagnostics")
-def diagnostics() -> JSONResponse:
-    return JSONResponse(get_diagnostics())
+def diagnostics(refresh: bool = False) -> JSONResponse:
+    payload = get_diagnostics(refresh=refresh)
+    payload["cache"] = conversion_cache.stats()
+    payload["cores"] = core_budget.snapshot()
+    payload["stages"] = stage_scheduler.snapshot()
+    payload["startup"] = {**_startup, "conversion_stack": conversion_stack_status()}
+    payload["memory"] = {**memory_budget.snapshot(), "job_rss_limit_bytes": (job_rss_limit_bytes if worker_pool else 0) or None}
+    payload["job_store"] = {"backend": "sqlite" if job_manager.store else "json", **job_manager.persister.snapshot()}
+    payload["executor"] = {"mode": "process" if worker_pool else "thread"}
+    if worker_pool:
+        payload["executor"]["pool"] = worker_pool.snapshot()
+    return JSONResponse(payload)
 
 
 @app.get("/api/version")
@@ -207,14 +438,80 @@ def version() -> JSONResponse:
     )
 
 
+def _parse_cursor(raw: str) -> Cursor:
+    updated_at, _, job_id = raw.rpartition("|")
+    try:
+        moment = datetime.fromisoformat(updated_at)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {raw}") from None
+    if not job_id or moment.tzinfo is None:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {raw}")
+    return moment, job_id
+
+
+def _parse_statuses(raw: str | None) -> tuple[str, ...] | None:
+    if not raw:
+        return None
+    statuses = tuple(part.strip().lower() for part in raw.split(",") if part.strip())
+    unknown = [status for status in statuses if status not in KNOWN_STATUSES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown job status: {', '.join(unknown)}")
+    return statuses or None
+
+
 @app.get("/api/jobs")
-def list_jobs(limit: int = 20) -> JSONResponse:
-    jobs = [item.to_dict() for item in job_manager.list_jobs(limit=limit)]
-    return JSONResponse({"items": jobs})
+def list_jobs(
+    request: Request,
+    limit: int = 20,
+    before: str | None = None,
+    status: str | None = None,
+    since: str | None = None,
+    summary: bool = False,
+) -> Response:
+    """Jobs, most recently updated first.
+
+    `status` is a comma-separated filter. `since` takes the `cursor` of an earlier response
+    and returns only the jobs changed after it (`delta`), plus the ids that were removed or
+    left the filter; a cursor from before a restart, or older than the change feed reaches
+    back, gets a full listing instead. The ETag is the cursor plus a digest of the query, so
+    an unchanged job list costs a 304 and no lookup at all, and a different filter or page
+    never matches another one's ETag.
+    """
+    statuses = _parse_statuses(status)
+    limit = max(1, limit)
+    query = repr((limit, before or "", sorted(set(statuses or ())), since or "", summary))
+    # Taken before reading any job: a change racing with this request shows up again next time.
+    cursor = job_manager.change_cursor()
+    etag = f'"{cursor}-{hashlib.sha256(query.encode("utf-8")).hexdigest()[:12]}"'
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    payload: dict = {"cursor": cursor, "delta": False, "removed": [], "next_before": None}
+    changes = job_manager.changes_since(since, statuses) if since else None
+    if changes is not None:
+        records, payload["removed"] = changes
+        payload["delta"] = True
+    else:
+        records = job_manager.list_jobs(
+            limit=limit, statuses=statuses, before=_parse_cursor(before) if before else None
+        )
+        if len(records) == limit:
+            updated_at, job_id = job_cursor(records[-1])
+            payload["next_before"] = f"{updated_at.isoformat()}|{job_id}"
+    payload["items"] = [item.to_summary() if summary else item.to_dict() for item in records]
+    return JSONResponse(payload, headers={"ETag": etag})
 
 
 @app.post("/api/jobs")
-async def create_job(file: UploadFile = File(...)) -> JSONResponse:
+async def create_job(
+    file: UploadFile = File(...),
+    merge_by_material: bool = Form(False),
+    lod_ratios: str = Form(""),
+    lod_min_triangles: int = Form(LOD_MIN_TRIANGLES),
+    faceted: bool = Form(False),
+    engine: str = Form(DEFAULT_ENGINE),
+    profile: str = Form(DEFAULT_PROFILE),
+) -> JSONResponse:
     if not file.filename:
         raise HTTPException(status_code=400, detail="Filename is missing")
 
@@ -223,8 +520,24 @@ async def create_job(file: UploadFile = File(...)) -> JSONResponse:
     if ext != ".ifc":
         raise HTTPException(status_code=400, detail="Only .ifc files are supported")
 
-    record = job_manager.create_job()
-    record = job_manager.update(record.id, input_name=filename)
+    engine = engine.strip().lower() or DEFAULT_ENGINE
+    if engine not in ENGINES:
+        raise HTTPException(status_code=400, detail=f"Unknown engine: {engine}")
+
+    profile = profile.strip().lower() or DEFAULT_PROFILE
+    if profile not in PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown profile: {profile}")
+
+    options = {
+        "engine": engine,
+        "profile": profile,
+        "merge_by_material": merge_by_material,
+        "lod_ratios": _parse_lod_ratios(lod_ratios),
+        "lod_min_triangles": max(0, lod_min_triangles),
+        "faceted": faceted,
+    }
+
+    record = job_manager.create_job(input_name=filename, options=options)
     input_path = job_manager.input_path(record)
 
     data = await file.read()
@@ -19,6 +19,10 @@ class JobRecord:
     output_name: str | None = None
     work_dir: Path | None = None
     metadata: dict[str, Any] = field(default_factory=dict)
+    options: dict[str, Any] = field(default_factory=dict)
+    preflight: dict[str, Any] = field(default_factory=dict)
+    # Completed pipeline stages by name, verified before a resumed job skips them.
+    checkpoints: dict[str, Any] = field(default_factory=dict)
     cancel_requested: bool = False
 
     def to_dict(self) -> dict[str, Any]:
@@ -33,5 +37,19 @@ class JobRecord:
             "input_name": self.input_name,
             "output_name": self.output_name,
             "metadata": self.metadata,
+            "options": self.options,
+            "preflight": self.preflight,
+            "checkpoints": self.checkpoints,
             "cancel_requested": self.cancel_requested,
         }
+
+    def to_summary(self) -> dict[str, Any]:
+        """The fields a job list shows, without the per-job metadata."""
+        return {
+            "id": self.id,
+            "updated_at": self.updated_at.isoformat(),
+            "status": self.status,
+            "progress": self.progress,
+            "stage": self.stage,
+            "input_name": self.input_name,
+        }
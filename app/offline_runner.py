@@ -4,6 +4,7 @@ import argparse
 import ipaddress
 import os
 import socket
+import time
 
 
 def _is_loopback_target(address: object) -> bool:
@@ -79,6 +80,7 @@ def _parse_args() -> argparse.Namespace:
 
 
 def main() -> int:
+    os.environ.setdefault("OFFLINE_STARTED_AT", str(time.time()))
     _enforce_offline_env()
     args = _parse_args()
 
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import mmap
+import re
+import time
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+# "#123= IFCWALL(" - instance name, entity type; whitespace is allowed around "=" and "(".
+_INSTANCE_RE = re.compile(rb"#\d+\s*=\s*([A-Za-z][A-Za-z0-9_]*)\s*\(")
+_SCHEMA_RE = re.compile(rb"FILE_SCHEMA\s*\(\s*\(\s*'([^']+)'", re.IGNORECASE)
+_HEADER_BYTES = 64 * 1024
+
+_BOOLEANS = {"IFCBOOLEANRESULT", "IFCBOOLEANCLIPPINGRESULT"}
+_FACES = {"IFCFACE", "IFCFACESURFACE", "IFCADVANCEDFACE"}
+_FACE_SETS = {"IFCTRIANGULATEDFACESET", "IFCPOLYGONALFACESET", "IFCTRIANGULATEDIRREGULARNETWORK"}
+_NOT_TESSELLATED = {"IFCSPACE", "IFCOPENINGELEMENT", "IFCSITE", "IFCBUILDING", "IFCBUILDINGSTOREY"}
+
+# Coarse per-item costs (seconds on one core, bytes of RSS). Absolute numbers are only
+# indicative; what matters is that they rank models consistently for engine and thread choice.
+_SECONDS_PER_PRODUCT = 2.5e-3
+_SECONDS_PER_BOOLEAN = 1.5e-2
+_SECONDS_PER_FACE = 5e-5
+_SECONDS_PER_FACE_SET = 1e-3
+_PARSE_SECONDS_PER_MB = 0.05
+_BASE_RSS_BYTES = 200 * 1024 * 1024
+_RSS_PER_FILE_BYTE = 8
+_RSS_PER_PRODUCT = 24 * 1024
+
+# Instancing only pays off on the GLB path, so models whose mapped items cover at least half
+# of the products and reuse each representation map this many times on average keep it.
+_INSTANCING_SHARE_FOR_GLB = 0.5
+_INSTANCING_REUSE_FOR_GLB = 2.0
+# The direct engine saves IfcConvert's start-up and the GLB round trip, which only clearly
+# outweighs losing the proven path on large models.
+_DIRECT_MIN_PRODUCTS = 2000
+# Below this many products thread start-up costs more than it saves.
+_SINGLE_THREAD_PRODUCTS = 200
+
+
+@lru_cache(maxsize=None)
+def _entity_supertypes(schema_name: str, type_name: str) -> frozenset[str]:
+    try:
+        import ifcopenshell.ifcopenshell_wrapper as wrapper
+
+        declaration = wrapper.schema_by_name(schema_name).declaration_by_name(type_name)
+    except Exception:
+        return frozenset()
+    names = set()
+    while declaration is not None:
+        names.add(declaration.name().upper())
+        declaration = declaration.supertype() if hasattr(declaration, "supertype") else None
+    return frozenset(names)
+
+
+def _schema_name(raw: str) -> str:
+    upper = raw.upper()
+    for known in ("IFC4X3", "IFC4", "IFC2X3"):
+        if upper.startswith(known):
+            return "IFC4X3_ADD2" if known == "IFC4X3" else known
+    return "IFC4"
+
+
+def scan_ifc(path: Path) -> dict:
+    """Count STEP instances by type in one memory-mapped pass, without building a model."""
+    started = time.perf_counter()
+    counts: Counter[str] = Counter()
+    schema = ""
+    size = path.stat().st_size
+    if size:
+        with path.open("rb") as src, mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            match = _SCHEMA_RE.search(data, 0, min(size, _HEADER_BYTES))
+            schema = match.group(1).decode("ascii", errors="replace") if match else ""
+            counts.update(instance.group(1).upper() for instance in _INSTANCE_RE.finditer(data))
+    counts = Counter({name.decode("ascii"): count for name, count in counts.items()})
+    schema_name = _schema_name(schema)
+
+    products = representation_items = 0
+    for type_name, count in counts.items():
+        supertypes = _entity_supertypes(schema_name, type_name)
+        if "IFCPRODUCT" in supertypes and type_name not in _NOT_TESSELLATED:
+            products += count
+        if "IFCREPRESENTATIONITEM" in supertypes:
+            representation_items += count
+
+    return {
+        "schema": schema or None,
+        "file_size_bytes": size,
+        "entity_count": sum(counts.values()),
+        "products": products,
+        "representation_items": representation_items,
+        "mapped_items": counts.get("IFCMAPPEDITEM", 0),
+        "representation_maps": counts.get("IFCREPRESENTATIONMAP", 0),
+        "boolean_operations": sum(counts.get(name, 0) for name in _BOOLEANS),
+        "openings": counts.get("IFCOPENINGELEMENT", 0),
+        "faces": sum(counts.get(name, 0) for name in _FACES),
+        "face_sets": sum(counts.get(name, 0) for name in _FACE_SETS),
+        "top_types": dict(counts.most_common(15)),
+        "scan_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def estimate_cost(scan: dict, threads: int) -> dict:
+    threads = max(1, threads)
+    # Openings are subtracted from their hosts, so they cost like explicit booleans.
+    tessellation = (
+        scan["products"] * _SECONDS_PER_PRODUCT
+        + (scan["boolean_operations"] + scan["openings"]) * _SECONDS_PER_BOOLEAN
+        + scan["faces"] * _SECONDS_PER_FACE
+        + scan["face_sets"] * _SECONDS_PER_FACE_SET
+    )
+    parse = scan["file_size_bytes"] / (1024 * 1024) * _PARSE_SECONDS_PER_MB
+    return {
+        "estimated_seconds": round(parse + tessellation / threads, 2),
+        "estimated_peak_rss_bytes": int(
+            _BASE_RSS_BYTES + scan["file_size_bytes"] * _RSS_PER_FILE_BYTE + scan["products"] * _RSS_PER_PRODUCT
+        ),
+    }
+
+
+def choose_engine(scan: dict) -> str:
+    """GLB unless the direct engine is clearly better: a large model without real instancing."""
+    # Exporters such as Revit wrap every product in a mapped item, so only actual reuse
+    # of representation maps counts as instancing.
+    mapped, maps = scan["mapped_items"], scan["representation_maps"]
+    if mapped >= _INSTANCING_SHARE_FOR_GLB * scan["products"] and maps and mapped >= _INSTANCING_REUSE_FOR_GLB * maps:
+        return "glb"
+    return "direct" if scan["products"] >= _DIRECT_MIN_PRODUCTS else "glb"
+
+
+def suggest_max_threads(scan: dict) -> int | None:
+    return 1 if scan["products"] < _SINGLE_THREAD_PRODUCTS else None
+
+
+def preflight_ifc(path: Path, threads: int) -> dict:
+    scan = scan_ifc(path)
+    max_threads = suggest_max_threads(scan)
+    return {
+        **scan,
+        **estimate_cost(scan, min(threads, max_threads or threads)),
+        "suggested_engine": choose_engine(scan),
+        "suggested_max_threads": max_threads,
+    }
@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+import threading
+from contextlib import ExitStack, contextmanager
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from .job_manager import CancelCheck, ProgressCallback
+from .scheduler import StageGate, ThreadBudget
+
+# Workers are always spawned: forking a server that has threads running and pxr loaded is unsafe.
+_CONTEXT = multiprocessing.get_context("spawn")
+_POLL_SECONDS = 0.25
+_STOP_TIMEOUT = 10
+
+
+def _worker_main(conn: Connection, cancel_event) -> None:
+    if os.getenv("OFFLINE_BLOCK_NET") == "1":
+        from .offline_runner import _install_network_guard
+
+        _install_network_guard()
+
+    from . import converter
+    from .sysinfo import peak_rss_bytes
+
+    # Warm the worker before its first job, so the job does not pay for the imports.
+    converter.prewarm_conversion_stack().join()
+    send_lock = threading.Lock()
+
+    def send(message: tuple) -> None:
+        with send_lock:
+            conn.send(message)
+
+    def progress_cb(stage: str, progress: int) -> None:
+        send(("progress", stage, progress))
+
+    def threads() -> int:
+        # Asked per stage, so the worker follows the parent's core budget as jobs come and go.
+        with send_lock:
+            conn.send(("threads",))
+            return conn.recv()
+
+    @contextmanager
+    def stage_gate(stage: str) -> Iterator[None]:
+        # The parent enters its gate before answering; an answer other than None is the error.
+        with send_lock:
+            conn.send(("stage_enter", stage))
+            error = conn.recv()
+        if error is not None:
+            raise RuntimeError(error)
+        try:
+            yield
+        except BaseException:
+            send(("stage_exit", stage, False))
+            raise
+        send(("stage_exit", stage, True))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message[0] == "stop":
+            return
+        _, input_ifc, output_glb, output_usdz, options, completed_stages = message
+        try:
+            stats = converter.run_fast_pipeline(
+                input_ifc=Path(input_ifc),
+                output_glb=Path(output_glb),
+                output_usdz=Path(output_usdz),
+                progress_cb=progress_cb,
+                cancel_check=cancel_event.is_set,
+                options=options,
+                threads=threads,
+                stage_gate=stage_gate,
+                completed_stages=completed_stages,
+            )
+            send(("done", stats, peak_rss_bytes()))
+        except Exception as exc:
+            send(("error", str(exc) or type(exc).__name__, peak_rss_bytes()))
+
+
+def _close_stage(gate: ExitStack, succeeded: bool) -> None:
+    # Gates may act on success only (e.g. record a checkpoint), so a failure is passed in.
+    if succeeded:
+        gate.close()
+    else:
+        error = RuntimeError("Stage failed in conversion worker")
+        gate.__exit__(RuntimeError, error, None)
+
+
+class _Worker:
+    def __init__(self) -> None:
+        self.conn, child_conn = _CONTEXT.Pipe()
+        self.cancel_event = _CONTEXT.Event()
+        self.process = _CONTEXT.Process(
+            target=_worker_main,
+            args=(child_conn, self.cancel_event),
+            name="conversion-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+        self.peak_rss_bytes: int | None = None
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(("stop",))
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=_STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ConversionWorkerPool:
+    """Runs `run_fast_pipeline` in warm worker processes.
+
+    A crash in pxr or ifcopenshell fails the job instead of the server. Memory is returned
+    when a worker is recycled, which happens after `max_jobs` jobs or once its peak RSS
+    passes `max_rss_bytes`. `run_pipeline` takes the same arguments as `run_fast_pipeline`.
+    Progress, thread-budget requests and stage-gate entry and exit come back over a pipe.
+    Cancellation goes through an event that the worker polls.
+    """
+
+    def __init__(self, workers: int, max_jobs: int = 0, max_rss_bytes: int = 0):
+        self.workers = max(1, workers)
+        self.max_jobs = max(0, max_jobs)
+        self.max_rss_bytes = max(0, max_rss_bytes)
+        self._lock = threading.Lock()
+        self._idle: queue.SimpleQueue[_Worker] = queue.SimpleQueue()
+        self._busy: dict[int, _Worker] = {}
+        self._spawned = 0
+        self._recycled = 0
+        self._crashed = 0
+        self._closed = False
+
+    def prewarm(self) -> None:
+        """Start every worker now, so their imports run before the first job arrives."""
+        with self._lock:
+            missing = self.workers - self._spawned if not self._closed else 0
+            self._spawned += missing
+        for _ in range(missing):
+            self._idle.put(_Worker())
+
+    def _acquire(self) -> _Worker:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Conversion worker pool is shut down")
+            spawn = self._idle.empty() and self._spawned < self.workers
+            if spawn:
+                self._spawned += 1
+        return _Worker() if spawn else self._idle.get()
+
+    def _release(self, worker: _Worker, retire: bool) -> None:
+        with self._lock:
+            closed = self._closed
+            if retire or closed:
+                self._spawned -= 1
+        if retire or closed:
+            worker.stop()
+            if not closed:
+                # Replace the retired worker right away so the next job finds it warm.
+                with self._lock:
+                    self._spawned += 1
+                self._idle.put(_Worker())
+        else:
+            self._idle.put(worker)
+
+    def run_pipeline(
+        self,
+        input_ifc: Path,
+        output_glb: Path,
+        output_usdz: Path,
+        progress_cb: ProgressCallback | None = None,
+        cancel_check: CancelCheck | None = None,
+        options: dict | None = None,
+        threads: ThreadBudget | None = None,
+        stage_gate: StageGate | None = None,
+        completed_stages: Iterable[str] = (),
+    ) -> dict:
+        worker = self._acquire()
+        worker.cancel_event.clear()
+        with self._lock:
+            self._busy[threading.get_ident()] = worker
+        retire = True
+        callback_error: Exception | None = None
+        stages: dict[str, ExitStack] = {}
+        try:
+            worker.conn.send(
+                ("run", str(input_ifc), str(output_glb), str(output_usdz), options or {}, list(completed_stages))
+            )
+            while True:
+                if cancel_check and cancel_check():
+                    worker.cancel_event.set()
+                if not worker.conn.poll(_POLL_SECONDS):
+                    continue
+                try:
+                    message = worker.conn.recv()
+                except EOFError:
+                    worker.process.join(timeout=_STOP_TIMEOUT)
+                    with self._lock:
+                        self._crashed += 1
+                    raise RuntimeError(
+                        f"Conversion worker exited unexpectedly (exit code {worker.process.exitcode})"
+                    ) from None
+
+                kind = message[0]
+                if kind == "progress":
+                    if progress_cb and callback_error is None:
+                        try:
+                            progress_cb(message[1], message[2])
+                        except Exception as exc:
+                            # Let the worker stop at its next cancel check, then report this error.
+                            callback_error = exc
+                            worker.cancel_event.set()
+                elif kind == "threads":
+                    worker.conn.send(max(1, threads()) if threads else os.cpu_count() or 1)
+                elif kind == "stage_enter":
+                    gate = ExitStack()
+                    try:
+                        if stage_gate:
+                            gate.enter_context(stage_gate(message[1]))
+                    except Exception as exc:
+                        worker.conn.send(str(exc) or type(exc).__name__)
+                    else:
+                        stages[message[1]] = gate
+                        worker.conn.send(None)
+                elif kind == "stage_exit":
+                    _close_stage(stages.pop(message[1]), succeeded=message[2])
+                else:
+                    worker.jobs += 1
+                    worker.peak_rss_bytes = message[2]
+                    retire = bool(self.max_jobs and worker.jobs >= self.max_jobs) or bool(
+                        self.max_rss_bytes and (worker.peak_rss_bytes or 0) >= self.max_rss_bytes
+                    )
+                    if retire:
+                        with self._lock:
+                            self._recycled += 1
+                    if callback_error is not None:
+                        raise callback_error
+                    if kind == "error":
+                        raise RuntimeError(message[1])
+                    stats = dict(message[1])
+                    stats["worker"] = {
+                        "pid": worker.process.pid,
+                        "jobs": worker.jobs,
+                        "peak_rss_bytes": worker.peak_rss_bytes,
+                        "recycled": retire,
+                    }
+                    return stats
+        finally:
+            # A worker that died inside a stage never sent stage_exit.
+            for gate in stages.values():
+                _close_stage(gate, succeeded=False)
+            with self._lock:
+                self._busy.pop(threading.get_ident(), None)
+            self._release(worker, retire)
+
+    def worker_pid(self, thread_ident: int) -> int | None:
+        """PID of the worker running the job submitted from `thread_ident`, if any."""
+        with self._lock:
+            worker = self._busy.get(thread_ident)
+        return worker.process.pid if worker else None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "spawned": self._spawned,
+                "idle": self._idle.qsize(),
+                "max_jobs": self.max_jobs,
+                "max_rss_bytes": self.max_rss_bytes,
+                "recycled": self._recycled,
+                "crashed": self._crashed,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            worker.stop()
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import queue
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import IO, Callable, Sequence
+
+from .job_manager import CancelCheck, CancelToken
+
+# IfcConvert redraws a "[#####     ] 42%" bar with carriage returns on stdout.
+_PERCENT_RE = re.compile(r"(\d{1,3})\s*%")
+_LINE_SPLIT_RE = re.compile(r"[\r\n]+")
+# Plain cancel_check callables cannot wake us, so they are polled at this interval.
+_CANCEL_POLL_SECONDS = 0.25
+_READ_CHUNK = 64 * 1024
+
+
+class ProcessCancelled(RuntimeError):
+    def __init__(self) -> None:
+        super().__init__("Cancelled by user")
+
+
+class ProcessTimeout(RuntimeError):
+    pass
+
+
+@dataclass
+class SupervisedResult:
+    returncode: int
+    stdout_tail: list[str] = field(default_factory=list)
+    stderr_tail: list[str] = field(default_factory=list)
+
+    def error_detail(self, limit: int = 1200) -> str:
+        text = "\n".join(self.stderr_tail or self.stdout_tail).strip()
+        return text[-limit:]
+
+
+def parse_progress(text: str) -> int | None:
+    matches = _PERCENT_RE.findall(text)
+    if not matches:
+        return None
+    return max(0, min(int(matches[-1]), 100))
+
+
+def _pump(stream: IO[bytes], name: str, events: queue.Queue, tail: deque, parse: bool) -> None:
+    pending = ""
+    try:
+        for chunk in iter(lambda: stream.read1(_READ_CHUNK), b""):
+            pending += chunk.decode("utf-8", errors="replace")
+            *lines, pending = _LINE_SPLIT_RE.split(pending)
+            for line in lines:
+                percent = parse_progress(line) if parse else None
+                if percent is not None:
+                    events.put(("progress", percent))
+                elif line.strip():
+                    tail.append(line.rstrip())
+        if pending.strip():
+            percent = parse_progress(pending) if parse else None
+            if percent is not None:
+                events.put(("progress", percent))
+            else:
+                tail.append(pending.rstrip())
+    finally:
+        stream.close()
+        events.put(("eof", name))
+
+
+def _stop(process: subprocess.Popen) -> None:
+    if process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_supervised(
+    cmd: Sequence[str],
+    progress_cb: Callable[[int], None] | None = None,
+    cancel_check: CancelCheck | None = None,
+    timeout: float | None = None,
+    tail_lines: int = 200,
+) -> SupervisedResult:
+    """Run `cmd`, draining stdout and stderr on reader threads so a chatty child can never
+    block on a full pipe. Percentages printed on stdout are forwarded to `progress_cb`
+    (on the calling thread, only when they change); only the last `tail_lines` other lines
+    of each stream are kept. A CancelToken terminates the child the moment it is set."""
+    process = subprocess.Popen(list(cmd), stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    events: queue.Queue = queue.Queue()
+    stdout_tail: deque[str] = deque(maxlen=tail_lines)
+    stderr_tail: deque[str] = deque(maxlen=tail_lines)
+    readers = [
+        threading.Thread(target=_pump, args=(process.stdout, "stdout", events, stdout_tail, True), daemon=True),
+        threading.Thread(target=_pump, args=(process.stderr, "stderr", events, stderr_tail, False), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    unregister = None
+    poll_interval = None
+    if isinstance(cancel_check, CancelToken):
+        # Terminating the child closes its pipes, which wakes the loop below via "eof".
+        unregister = cancel_check.add_callback(process.terminate)
+    elif cancel_check is not None:
+        poll_interval = _CANCEL_POLL_SECONDS
+
+    deadline = time.monotonic() + timeout if timeout else None
+
+    def wait_time() -> float | None:
+        if deadline is None:
+            return poll_interval
+        remaining = max(deadline - time.monotonic(), 0.0)
+        return remaining if poll_interval is None else min(poll_interval, remaining)
+
+    def check() -> None:
+        if cancel_check and cancel_check():
+            raise ProcessCancelled()
+        # Checked on every pass: a child printing progress all the time never leaves the queue empty.
+        if deadline is not None and time.monotonic() >= deadline:
+            raise ProcessTimeout(f"Process timeout after {timeout:.0f}s")
+
+    open_streams = len(readers)
+    reported = -1
+    try:
+        while open_streams:
+            try:
+                kind, value = events.get(timeout=wait_time())
+            except queue.Empty:
+                kind, value = "idle", None
+
+            check()
+            if kind == "eof":
+                open_streams -= 1
+            elif kind == "progress" and progress_cb and value != reported:
+                reported = value
+                progress_cb(value)
+
+        # A child may close its pipes and keep running, so the deadline and cancel still apply.
+        while True:
+            try:
+                process.wait(timeout=wait_time())
+                break
+            except subprocess.TimeoutExpired:
+                check()
+        if cancel_check and cancel_check():
+            raise ProcessCancelled()
+    finally:
+        if unregister:
+            unregister()
+        _stop(process)
+        for reader in readers:
+            reader.join(timeout=5)
+
+    return SupervisedResult(process.returncode, list(stdout_tail), list(stderr_tail))
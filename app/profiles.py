@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+
+# LOD variants are only authored for meshes with at least this many triangles.
+LOD_MIN_TRIANGLES = 256
+# Passing any exclude list replaces the tessellator's defaults, so every profile keeps these.
+_ALWAYS_EXCLUDED = ("IfcSpace", "IfcOpeningElement")
+
+
+@dataclass(frozen=True)
+class ConversionProfile:
+    name: str
+    title: str
+    include_entities: tuple[str, ...] = ()
+    exclude_entities: tuple[str, ...] = _ALWAYS_EXCLUDED
+    # Mesher tolerances (linear in metres, angular in radians); None keeps IfcOpenShell's defaults.
+    linear_deflection: float | None = None
+    angular_deflection: float | None = None
+
+    def mesher_settings(self) -> dict[str, float]:
+        # Named after IfcOpenShell settings, which IfcConvert also accepts as --flags.
+        settings = {
+            "mesher-linear-deflection": self.linear_deflection,
+            "mesher-angular-deflection": self.angular_deflection,
+        }
+        return {name: value for name, value in settings.items() if value is not None}
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["include_entities"] = list(self.include_entities)
+        data["exclude_entities"] = list(self.exclude_entities)
+        return data
+
+
+PROFILES: dict[str, ConversionProfile] = {
+    profile.name: profile
+    for profile in (
+        ConversionProfile(
+            name="preview",
+            title="Быстрый просмотр",
+            exclude_entities=_ALWAYS_EXCLUDED
+            + (
+                "IfcAnnotation",
+                "IfcGrid",
+                "IfcVirtualElement",
+                "IfcFurnishingElement",
+                "IfcDistributionPort",
+                "IfcFastener",
+                "IfcMechanicalFastener",
+                "IfcDiscreteAccessory",
+            ),
+            linear_deflection=0.02,
+            angular_deflection=1.0,
+        ),
+        ConversionProfile(
+            name="architectural",
+            title="Архитектурный",
+            exclude_entities=_ALWAYS_EXCLUDED + ("IfcAnnotation", "IfcGrid", "IfcVirtualElement", "IfcDistributionPort"),
+            linear_deflection=0.005,
+            angular_deflection=0.5,
+        ),
+        ConversionProfile(name="full", title="Полный"),
+    )
+}
+DEFAULT_PROFILE = "full"
+
+
+def get_profile(name: str | None) -> ConversionProfile:
+    key = (name or DEFAULT_PROFILE).strip().lower()
+    if key not in PROFILES:
+        raise ValueError(f"Unknown conversion profile: {name}")
+    return PROFILES[key]
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, ContextManager, Iterator
+
+from .sysinfo import available_memory_bytes
+
+ThreadBudget = Callable[[], int]
+# Entered around each pipeline stage, e.g. to wait for a free slot in that stage's pool.
+StageGate = Callable[[str], ContextManager[None]]
+# Share of the RAM available while idle that jobs may reserve; the rest is left to the OS.
+_MEMORY_HEADROOM = 0.85
+_POLL_SECONDS = 0.5
+
+
+class CoreBudget:
+    """Divides a fixed number of cores evenly among running jobs.
+
+    A job asks for its share at the start of every stage, so cores freed by jobs that
+    finished are picked up by the others at their next stage. Jobs registered with
+    `max_threads` never get more than that and leave the rest to uncapped jobs. Earlier
+    jobs receive the remainder of an uneven split; every job gets at least one thread.
+    """
+
+    def __init__(self, total_cores: int | None = None):
+        self.total_cores = max(1, int(total_cores or os.cpu_count() or 1))
+        self._lock = threading.Lock()
+        self._jobs: dict[str, int | None] = {}
+        self._granted: dict[str, int] = {}
+
+    def register(self, job_id: str, max_threads: int | None = None) -> None:
+        with self._lock:
+            self._jobs[job_id] = max(1, max_threads) if max_threads else None
+
+    def release(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            self._granted.pop(job_id, None)
+
+    def _allocate(self) -> dict[str, int]:
+        # Water-filling: settle capped jobs below the fair share first, then split the rest.
+        allocation: dict[str, int] = {}
+        pending = list(self._jobs)
+        remaining = self.total_cores
+        while pending:
+            fair = max(remaining // len(pending), 1)
+            capped = [job for job in pending if self._jobs[job] is not None and self._jobs[job] <= fair]
+            if not capped:
+                base, extra = divmod(remaining, len(pending))
+                for index, job in enumerate(pending):
+                    allocation[job] = max(1, base + (1 if index < extra else 0))
+                break
+            for job in capped:
+                allocation[job] = self._jobs[job]
+                remaining -= self._jobs[job]
+                pending.remove(job)
+        return allocation
+
+    def share(self, job_id: str) -> int:
+        with self._lock:
+            if job_id not in self._jobs:
+                return self.total_cores
+            threads = self._allocate()[job_id]
+            self._granted[job_id] = threads
+            return threads
+
+    @contextmanager
+    def job(self, job_id: str, max_threads: int | None = None) -> Iterator[ThreadBudget]:
+        self.register(job_id, max_threads)
+        try:
+            yield lambda: self.share(job_id)
+        finally:
+            self.release(job_id)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "total_cores": self.total_cores,
+                "running_jobs": len(self._jobs),
+                "granted_threads": dict(self._granted),
+            }
+
+
+# Stage pools: tessellation is heavily multi-threaded, packaging is mostly one thread.
+STAGE_POOLS = {"ifc_to_glb": "tessellation", "ifc_to_usdz": "tessellation", "glb_to_usdz": "packaging"}
+
+
+class StageScheduler:
+    """Limits how many jobs run each stage pool at once, so one job's packaging can overlap
+    the next job's tessellation. Waiting jobs enter a pool in arrival order."""
+
+    def __init__(self, slots: dict[str, int]):
+        self.slots = {pool: max(1, count) for pool, count in slots.items()}
+        self._cond = threading.Condition()
+        self._running: dict[str, list[str]] = {pool: [] for pool in self.slots}
+        self._waiting: dict[str, list[str]] = {pool: [] for pool in self.slots}
+
+    @contextmanager
+    def stage(
+        self,
+        job_id: str,
+        stage: str,
+        cancel_check: Callable[[], bool] | None = None,
+        on_wait: Callable[[str], None] | None = None,
+    ) -> Iterator[None]:
+        pool = STAGE_POOLS.get(stage, stage)
+        if pool not in self.slots:
+            yield
+            return
+        with self._cond:
+            waiting, running = self._waiting[pool], self._running[pool]
+            waiting.append(job_id)
+            try:
+                waited = False
+                while waiting[0] != job_id or len(running) >= self.slots[pool]:
+                    if cancel_check and cancel_check():
+                        raise RuntimeError("Cancelled by user")
+                    if on_wait and not waited:
+                        on_wait(pool)
+                    waited = True
+                    self._cond.wait(_POLL_SECONDS)
+                running.append(job_id)
+            finally:
+                waiting.remove(job_id)
+                self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                running.remove(job_id)
+                self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                pool: {"slots": self.slots[pool], "running": list(self._running[pool]), "waiting": list(self._waiting[pool])}
+                for pool in self.slots
+            }
+
+
+class MemoryBudget:
+    """Admits jobs whose estimated peak memory fits what is left of the memory budget.
+
+    The budget is `limit_bytes` or, when unset, most of the RAM that was available the last
+    time no job was running. Jobs are admitted in arrival order, so a large job is not starved
+    by small ones. A job larger than the whole budget still runs, but only on its own.
+    """
+
+    def __init__(self, limit_bytes: int | None = None, available: Callable[[], int | None] = available_memory_bytes):
+        self.limit_bytes = limit_bytes or None
+        self._available = available
+        self._cond = threading.Condition()
+        self._reserved: dict[str, int] = {}
+        self._waiting: list[str] = []
+        self._idle_capacity: int | None = None
+
+    def _capacity(self) -> int | None:
+        if self.limit_bytes:
+            return self.limit_bytes
+        # Running jobs already use part of the free RAM, so it is only sampled while idle.
+        if not self._reserved or self._idle_capacity is None:
+            available = self._available()
+            if available:
+                self._idle_capacity = int(available * _MEMORY_HEADROOM)
+        return self._idle_capacity
+
+    def capacity(self) -> int | None:
+        with self._cond:
+            return self._capacity()
+
+    def _fits(self, estimate_bytes: int) -> bool:
+        capacity = self._capacity()
+        return not self._reserved or capacity is None or sum(self._reserved.values()) + estimate_bytes <= capacity
+
+    @contextmanager
+    def admit(
+        self,
+        job_id: str,
+        estimate_bytes: int,
+        cancel_check: Callable[[], bool] | None = None,
+        on_wait: Callable[[], None] | None = None,
+    ) -> Iterator[None]:
+        with self._cond:
+            self._waiting.append(job_id)
+            try:
+                waited = False
+                while self._waiting[0] != job_id or not self._fits(estimate_bytes):
+                    if cancel_check and cancel_check():
+                        raise RuntimeError("Cancelled by user")
+                    if on_wait and not waited:
+                        on_wait()
+                    waited = True
+                    self._cond.wait(_POLL_SECONDS)
+                self._reserved[job_id] = max(0, estimate_bytes)
+            finally:
+                self._waiting.remove(job_id)
+                self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._reserved.pop(job_id, None)
+                self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                "limit_bytes": self.limit_bytes,
+                "capacity_bytes": self._capacity(),
+                "available_bytes": self._available(),
+                "reserved_bytes": dict(self._reserved),
+                "waiting_jobs": list(self._waiting),
+            }
+
+
+class RssWatchdog:
+    """Polls a job's resident memory in the background and trips once it passes `limit_bytes`.
+
+    `rss` returns the memory attributed to the job, or None while unknown. `on_trip` is called
+    once, from the watchdog thread, and should cancel the job. Without a limit the watchdog
+    only records the peak.
+    """
+
+    def __init__(
+        self,
+        limit_bytes: int | None,
+        rss: Callable[[], int | None],
+        on_trip: Callable[[], None],
+        interval: float = _POLL_SECONDS,
+    ):
+        self.limit_bytes = limit_bytes or None
+        self.peak_bytes = 0
+        self.error: str | None = None
+        self._rss = rss
+        self._on_trip = on_trip
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _sample(self) -> int:
+        current = self._rss() or 0
+        self.peak_bytes = max(self.peak_bytes, current)
+        return current
+
+    def _watch(self) -> None:
+        while True:
+            current = self._sample()
+            if self.limit_bytes and current > self.limit_bytes:
+                mb = 1024 * 1024
+                self.error = (
+                    f"Memory limit exceeded: conversion used {current // mb} MB, "
+                    f"limit is {self.limit_bytes // mb} MB"
+                )
+                self._on_trip()
+                return
+            if self._stop.wait(self._interval):
+                return
+
+    def __enter__(self) -> RssWatchdog:
+        self._thread = threading.Thread(target=self._watch, name="rss-watchdog", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            # Short jobs may finish between two polls.
+            self._sample()
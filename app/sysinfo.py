@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+
+def _windows_process_memory(pid: int | None = None):
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    kernel32 = ctypes.windll.kernel32
+    if pid is None:
+        handle, owned = kernel32.GetCurrentProcess(), False
+    else:
+        # PROCESS_QUERY_LIMITED_INFORMATION | PROCESS_VM_READ
+        handle, owned = kernel32.OpenProcess(0x1000 | 0x0010, False, pid), True
+        if not handle:
+            return None
+    try:
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return None
+    finally:
+        if owned:
+            kernel32.CloseHandle(handle)
+    return counters
+
+
+def peak_rss_bytes() -> int | None:
+    """Peak resident set size of the current process since it started."""
+    try:
+        if os.name == "nt":
+            counters = _windows_process_memory()
+            return int(counters.PeakWorkingSetSize) if counters else None
+
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS reports bytes.
+        return int(peak) if sys.platform == "darwin" else int(peak) * 1024
+    except Exception:
+        return None
+
+
+def process_rss_bytes(pid: int | None = None) -> int | None:
+    """Current resident set size of `pid` (default: this process)."""
+    try:
+        if os.name == "nt":
+            counters = _windows_process_memory(pid)
+            return int(counters.WorkingSetSize) if counters else None
+        if sys.platform.startswith("linux"):
+            with open(f"/proc/{pid or 'self'}/statm", encoding="ascii") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        output = subprocess.run(
+            ["ps", "-o", "rss=", "-p", str(pid or os.getpid())], capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+        return int(output) * 1024 if output else None
+    except Exception:
+        return None
+
+
+def available_memory_bytes() -> int | None:
+    """Physical memory the OS can hand out without swapping."""
+    try:
+        if os.name == "nt":
+            import ctypes
+
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [
+                    ("dwLength", ctypes.c_ulong),
+                    ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong),
+                    ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong),
+                    ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong),
+                    ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+                ]
+
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(status)
+            if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return None
+            return int(status.ullAvailPhys)
+        if sys.platform.startswith("linux"):
+            with open("/proc/meminfo", encoding="ascii") as meminfo:
+                for line in meminfo:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) * 1024
+            return None
+        # macOS: free plus inactive pages, which the kernel reclaims without swapping.
+        output = subprocess.run(["vm_stat"], capture_output=True, text=True, timeout=5).stdout
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        pages = {}
+        for line in output.splitlines()[1:]:
+            name, _, value = line.partition(":")
+            pages[name.strip()] = int(value.strip().rstrip(".") or 0)
+        return (pages.get("Pages free", 0) + pages.get("Pages inactive", 0)) * page_size
+    except Exception:
+        return None
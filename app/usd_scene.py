@@ -0,0 +1,443 @@
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from pxr import Gf, Sdf, Usd, UsdGeom, UsdShade, Vt
+
+from .decimate import simplify_mesh
+from .usdz_writer import write_usdz
+
+ELEMENT_SUBSET_FAMILY = "ifcElement"
+LOD_VARIANT_SET = "lod"
+
+
+def _sanitize_name(name: str) -> str:
+    sanitized = re.sub(r"[^a-zA-Z0-9_]", "_", name)
+    if sanitized and sanitized[0].isdigit():
+        sanitized = "_" + sanitized
+    return sanitized or "_unnamed"
+
+
+def _vec3f_array(values: np.ndarray) -> Vt.Vec3fArray:
+    return Vt.Vec3fArray.FromNumpy(np.ascontiguousarray(values, dtype=np.float32).reshape(-1, 3))
+
+
+def _int_array(values: np.ndarray) -> Vt.IntArray:
+    return Vt.IntArray.FromNumpy(np.ascontiguousarray(values, dtype=np.int32).reshape(-1))
+
+
+@dataclass
+class MeshGeometry:
+    vertices: np.ndarray
+    faces: np.ndarray
+    normals: np.ndarray | None = None
+    # vertex: one normal per point; uniform: one per face; faceVarying: one per face corner.
+    normals_interpolation: str = UsdGeom.Tokens.vertex
+
+
+def _author_mesh_geometry(mesh_prim: UsdGeom.Mesh, geometry: MeshGeometry) -> None:
+    mesh_prim.GetPointsAttr().Set(_vec3f_array(geometry.vertices))
+    mesh_prim.GetFaceVertexCountsAttr().Set(_int_array(np.full(len(geometry.faces), 3, dtype=np.int32)))
+    mesh_prim.GetFaceVertexIndicesAttr().Set(_int_array(geometry.faces))
+    mesh_prim.GetSubdivisionSchemeAttr().Set(UsdGeom.Tokens.none)
+    mesh_prim.GetOrientationAttr().Set(UsdGeom.Tokens.rightHanded)
+
+    if geometry.normals is not None and len(geometry.normals) > 0:
+        mesh_prim.GetNormalsAttr().Set(_vec3f_array(geometry.normals))
+        mesh_prim.SetNormalsInterpolation(geometry.normals_interpolation)
+
+
+def normalized(vectors: np.ndarray) -> np.ndarray:
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, lengths, out=vectors, where=lengths > 0)
+    return vectors
+
+
+def face_normals(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    tris = np.asarray(vertices, dtype=np.float64)[faces]
+    return normalized(np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0]))
+
+
+def _face_varying_normals(geometry: MeshGeometry) -> np.ndarray:
+    if geometry.normals_interpolation == UsdGeom.Tokens.vertex:
+        return geometry.normals[geometry.faces.reshape(-1)]
+    if geometry.normals_interpolation == UsdGeom.Tokens.uniform:
+        return np.repeat(geometry.normals, 3, axis=0)
+    return geometry.normals
+
+
+def _concatenate_geometry(parts: list[MeshGeometry]) -> MeshGeometry:
+    offsets = np.cumsum([0] + [len(part.vertices) for part in parts[:-1]])
+    merged = MeshGeometry(
+        vertices=np.concatenate([part.vertices for part in parts]),
+        faces=np.concatenate([part.faces + np.int32(offset) for part, offset in zip(parts, offsets)]),
+    )
+    if parts[0].normals is None:
+        return merged
+
+    interpolations = {part.normals_interpolation for part in parts}
+    if len(interpolations) == 1:
+        merged.normals = np.concatenate([part.normals for part in parts])
+        merged.normals_interpolation = interpolations.pop()
+    else:
+        # Mixed sources (e.g. exported vertex normals next to flat fallbacks) only share faceVarying.
+        merged.normals = np.concatenate([_face_varying_normals(part) for part in parts])
+        merged.normals_interpolation = UsdGeom.Tokens.faceVarying
+    return merged
+
+
+def material_color_key(color) -> tuple[float, float, float]:
+    return (round(color[0], 3), round(color[1], 3), round(color[2], 3))
+
+
+def _to_gf_matrix(transform: np.ndarray) -> Gf.Matrix4d:
+    # glTF/NumPy matrices use column vectors (translation in the last column), USD uses row vectors.
+    return Gf.Matrix4d(np.asarray(transform, dtype=np.float64).T.tolist())
+
+
+def _unique_prim_path(used_paths: set[str], base_path: str) -> str:
+    path = base_path
+    counter = 1
+    while path in used_paths:
+        path = f"{base_path}_{counter}"
+        counter += 1
+    used_paths.add(path)
+    return path
+
+
+def _get_or_create_material(stage: Usd.Stage, materials_cache: dict, color, stats: dict) -> UsdShade.Material:
+    color_key = material_color_key(color)
+    if color_key not in materials_cache:
+        mat_idx = len(materials_cache)
+        mat_path = f"/Root/Materials/Mat_{mat_idx}"
+
+        material = UsdShade.Material.Define(stage, mat_path)
+        shader = UsdShade.Shader.Define(stage, f"{mat_path}/PBRShader")
+        shader.CreateIdAttr("UsdPreviewSurface")
+        shader.CreateInput("diffuseColor", Sdf.ValueTypeNames.Color3f).Set(Gf.Vec3f(*color))
+        shader.CreateInput("metallic", Sdf.ValueTypeNames.Float).Set(0.0)
+        shader.CreateInput("roughness", Sdf.ValueTypeNames.Float).Set(0.5)
+        material.CreateSurfaceOutput().ConnectToSource(shader.ConnectableAPI(), "surface")
+
+        materials_cache[color_key] = material
+        stats["material_count"] += 1
+    return materials_cache[color_key]
+
+
+def _author_lod_variants(prim: Usd.Prim, level_count: int, author_level: Callable[[int], None]) -> None:
+    variant_set = prim.GetVariantSets().AddVariantSet(LOD_VARIANT_SET)
+    for level in range(level_count):
+        variant_set.AddVariant(f"lod{level}")
+        variant_set.SetVariantSelection(f"lod{level}")
+        with variant_set.GetVariantEditContext():
+            author_level(level)
+    variant_set.SetVariantSelection("lod0")
+
+
+def _author_mesh(
+    stage: Usd.Stage,
+    mesh_prim: UsdGeom.Mesh,
+    payload: MeshPayload,
+    materials_cache: dict,
+    stats: dict,
+) -> None:
+    levels = _geometry_levels(payload)
+    if len(levels) > 1:
+        _author_lod_variants(mesh_prim.GetPrim(), len(levels), lambda level: _author_mesh_geometry(mesh_prim, levels[level]))
+        stats["lod_mesh_count"] += 1
+    else:
+        _author_mesh_geometry(mesh_prim, levels[0])
+    mesh_prim.GetDoubleSidedAttr().Set(True)
+    UsdShade.MaterialBindingAPI(mesh_prim).Bind(_get_or_create_material(stage, materials_cache, payload.color, stats))
+
+
+@dataclass
+class MeshPayload:
+    guid: str
+    transform: np.ndarray
+    geometry_key: str
+    instanced: bool
+    vertex_count: int
+    face_count: int
+    color: tuple[float, float, float]
+    geometry: MeshGeometry | None = None
+    # Decimated levels below the full-detail geometry, if any.
+    lods: list[MeshGeometry] = field(default_factory=list)
+    prep_seconds: float = 0.0
+    normals_seconds: float = 0.0
+
+
+def _geometry_levels(payload: MeshPayload) -> list[MeshGeometry]:
+    return [payload.geometry, *payload.lods]
+
+
+def _level_face_counts(payload: MeshPayload, level_count: int) -> list[int]:
+    levels = _geometry_levels(payload)
+    return [len(levels[min(level, len(levels) - 1)].faces) for level in range(level_count)]
+
+
+def decimated_level(vertices: np.ndarray, faces: np.ndarray, ratio: float, faceted: bool) -> MeshGeometry:
+    lod_vertices, lod_faces = simplify_mesh(vertices, faces, max(int(len(faces) * ratio), 1))
+    geometry = MeshGeometry(
+        vertices=np.ascontiguousarray(lod_vertices, dtype=np.float32),
+        faces=np.ascontiguousarray(lod_faces, dtype=np.int32),
+    )
+    if not faceted:
+        # Decimated surfaces no longer match the exported normals; flat normals stay honest.
+        geometry.normals = face_normals(lod_vertices, lod_faces).astype(np.float32)
+        geometry.normals_interpolation = UsdGeom.Tokens.uniform
+    return geometry
+
+
+class _ChunkedLayers:
+    """Routes baked meshes into sublayer files that are saved and dropped every
+    `batch_size` meshes, so authored geometry does not pile up in memory."""
+
+    def __init__(self, stage: Usd.Stage, directory: Path, batch_size: int, on_flush=None):
+        self.stage = stage
+        self.directory = directory
+        self.batch_size = max(0, int(batch_size))
+        self.layer_names: list[str] = []
+        self._on_flush = on_flush
+        self._chunk: Usd.Stage | None = None
+        self._count = 0
+
+    def target(self) -> Usd.Stage:
+        if self.batch_size <= 0:
+            return self.stage
+        if self._chunk is None:
+            name = f"chunk_{len(self.layer_names):04d}.usdc"
+            self._chunk = Usd.Stage.CreateNew(str(self.directory / name))
+            self._chunk.OverridePrim("/Root")
+            self.layer_names.append(name)
+        return self._chunk
+
+    def mesh_done(self) -> None:
+        if self._chunk is None:
+            return
+        self._count += 1
+        if self._count >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._chunk is None:
+            return
+        self._chunk.Save()
+        self._chunk = None
+        self._count = 0
+        if self._on_flush:
+            self._on_flush()
+
+
+class _MaterialBatch:
+    """World-space meshes sharing one material, concatenated into a single mesh
+    (per LOD level) with the original elements kept as face ranges."""
+
+    def __init__(self, color: tuple[float, float, float], level_count: int = 1):
+        self.color = color
+        self.level_count = level_count
+        self.guids: list[str] = []
+        self.parts: list[list[MeshGeometry]] = [[] for _ in range(level_count)]
+        self.face_ranges: list[list[tuple[int, int]]] = [[] for _ in range(level_count)]
+        self.face_totals = [0] * level_count
+        self.decimated = False
+
+    def add(self, payload: MeshPayload) -> None:
+        levels = _geometry_levels(payload)
+        self.decimated = self.decimated or bool(payload.lods)
+        self.guids.append(payload.guid)
+        for level in range(self.level_count):
+            # Elements too small to decimate contribute their full geometry to every level.
+            geometry = levels[min(level, len(levels) - 1)]
+            self.parts[level].append(geometry)
+            self.face_ranges[level].append((self.face_totals[level], len(geometry.faces)))
+            self.face_totals[level] += len(geometry.faces)
+
+    def to_payload(self, guid: str) -> MeshPayload:
+        levels = [_concatenate_geometry(self.parts[level]) for level in range(self.level_count if self.decimated else 1)]
+        return MeshPayload(
+            guid=guid,
+            transform=np.eye(4),
+            geometry_key="",
+            instanced=False,
+            vertex_count=len(levels[0].vertices),
+            face_count=len(levels[0].faces),
+            color=self.color,
+            geometry=levels[0],
+            lods=levels[1:],
+        )
+
+
+def _author_element_subsets(
+    target: Usd.Stage,
+    mesh_prim: UsdGeom.Mesh,
+    batch: _MaterialBatch,
+    used_paths: set[str],
+) -> int:
+    mesh_path = str(mesh_prim.GetPath())
+    subset_paths = [_unique_prim_path(used_paths, f"{mesh_path}/{_sanitize_name(str(guid))}") for guid in batch.guids]
+
+    def author_level(level: int) -> None:
+        for subset_path, guid, (face_start, face_count) in zip(subset_paths, batch.guids, batch.face_ranges[level]):
+            subset = UsdGeom.Subset.Define(target, subset_path)
+            subset.CreateElementTypeAttr(UsdGeom.Tokens.face)
+            subset.CreateIndicesAttr(_int_array(np.arange(face_start, face_start + face_count, dtype=np.int32)))
+            subset.CreateFamilyNameAttr(ELEMENT_SUBSET_FAMILY)
+            subset.GetPrim().SetCustomDataByKey("ifcGuid", str(guid))
+
+    if batch.decimated and batch.level_count > 1:
+        _author_lod_variants(mesh_prim.GetPrim(), batch.level_count, author_level)
+    else:
+        author_level(0)
+    UsdGeom.Subset.SetFamilyType(mesh_prim, ELEMENT_SUBSET_FAMILY, UsdGeom.Tokens.partition)
+    return len(batch.guids)
+
+
+class UsdzSceneBuilder:
+    """Authors prepared mesh payloads into a USD scene and packages it as USDZ.
+
+    Payloads must be added from a single thread. Baked meshes go straight to the
+    stage (or to streamed chunk sublayers), repeated geometry becomes instanceable
+    placements of a shared prototype, and in merge mode meshes are collected per
+    material and authored on `finish`.
+    """
+
+    def __init__(
+        self,
+        work_dir: Path,
+        stats: dict,
+        stage_seconds: dict,
+        stream_batch_size: int = 0,
+        merge_by_material: bool = False,
+        level_count: int = 1,
+        on_flush=None,
+    ):
+        self.work_dir = work_dir
+        self.stats = stats
+        self.stage_seconds = stage_seconds
+        self.merge_by_material = merge_by_material
+        self.level_count = level_count
+        for key in ("vertex_count", "face_count", "mesh_count", "material_count", "prototype_count", "instance_count"):
+            stats.setdefault(key, 0)
+        stats.setdefault("lod_mesh_count", 0)
+        if level_count > 1:
+            stats.setdefault("lod_face_counts", [0] * level_count)
+        stage_seconds.setdefault("author", 0.0)
+        stage_seconds.setdefault("package", 0.0)
+
+        # The root layer stays in memory and is serialized once, right before packaging;
+        # only streamed chunks (if any) are written out while authoring. It is held here so
+        # it outlives the stage, which `finish` releases before attaching the chunks.
+        self.root_layer = Sdf.Layer.CreateAnonymous("model.usdc")
+        self.stage = Usd.Stage.Open(self.root_layer)
+        self.stage.SetMetadata("metersPerUnit", 1.0)
+        self.stage.SetMetadata("upAxis", "Y")
+        self.root = UsdGeom.Xform.Define(self.stage, "/Root")
+        self.materials_cache: dict = {}
+        self.prototypes: dict[str, str] = {}
+        self.used_paths = {"/Root"}
+        self.chunks = _ChunkedLayers(self.stage, work_dir, stream_batch_size, on_flush=on_flush)
+        self.batches: dict[tuple[float, float, float], _MaterialBatch] = {}
+        self.prototype_lod_faces: dict[str, list[int]] = {}
+
+    def add(self, payload: MeshPayload) -> None:
+        started = time.perf_counter()
+        stats = self.stats
+        stats["vertex_count"] += payload.vertex_count
+        stats["face_count"] += payload.face_count
+        stats["mesh_count"] += 1
+        if self.level_count > 1:
+            if payload.geometry is not None:
+                self.prototype_lod_faces[payload.geometry_key] = _level_face_counts(payload, self.level_count)
+            for level, count in enumerate(self.prototype_lod_faces[payload.geometry_key]):
+                stats["lod_face_counts"][level] += count
+
+        if self.merge_by_material:
+            color_key = material_color_key(payload.color)
+            if color_key not in self.batches:
+                self.batches[color_key] = _MaterialBatch(payload.color, self.level_count)
+            self.batches[color_key].add(payload)
+        elif payload.instanced:
+            if payload.geometry_key not in self.prototypes:
+                proto_path = f"/Root/Prototypes/Proto_{len(self.prototypes)}"
+                if not self.prototypes:
+                    self.stage.CreateClassPrim("/Root/Prototypes")
+                # Placements are Xforms, so the prototype must be one too: a referenced Mesh
+                # would be overridden by the placement's type and compose as an empty Xform.
+                UsdGeom.Xform.Define(self.stage, proto_path)
+                proto_mesh = UsdGeom.Mesh.Define(self.stage, f"{proto_path}/geom")
+                _author_mesh(self.stage, proto_mesh, payload, self.materials_cache, stats)
+                self.prototypes[payload.geometry_key] = proto_path
+                stats["prototype_count"] += 1
+
+            prim_path = _unique_prim_path(self.used_paths, f"/Root/{_sanitize_name(str(payload.guid))}")
+            placement = UsdGeom.Xform.Define(self.stage, prim_path)
+            placement.AddTransformOp().Set(_to_gf_matrix(payload.transform))
+            placement.GetPrim().GetReferences().AddInternalReference(self.prototypes[payload.geometry_key])
+            placement.GetPrim().SetInstanceable(True)
+            placement.GetPrim().SetCustomDataByKey("ifcGuid", str(payload.guid))
+            stats["instance_count"] += 1
+        else:
+            prim_path = _unique_prim_path(self.used_paths, f"/Root/{_sanitize_name(str(payload.guid))}")
+            mesh_prim = UsdGeom.Mesh.Define(self.chunks.target(), prim_path)
+            _author_mesh(self.stage, mesh_prim, payload, self.materials_cache, stats)
+            mesh_prim.GetPrim().SetCustomDataByKey("ifcGuid", str(payload.guid))
+            self.chunks.mesh_done()
+        self.stage_seconds["author"] += time.perf_counter() - started
+
+    def _author_batches(self) -> None:
+        stats = self.stats
+        stats["subset_count"] = 0
+        for batch_idx, batch in enumerate(self.batches.values()):
+            target = self.chunks.target()
+            prim_path = _unique_prim_path(self.used_paths, f"/Root/MaterialBatch_{batch_idx}")
+            mesh_prim = UsdGeom.Mesh.Define(target, prim_path)
+            _author_mesh(self.stage, mesh_prim, batch.to_payload(prim_path), self.materials_cache, stats)
+            stats["subset_count"] += _author_element_subsets(target, mesh_prim, batch, self.used_paths)
+            self.chunks.mesh_done()
+        stats["prim_count_after"] = len(self.batches)
+        self.batches.clear()
+
+    def finish(self, usdz_path: str | Path) -> int:
+        """Author pending batches, serialize the layers and write the USDZ; returns its size."""
+        stats = self.stats
+        started = time.perf_counter()
+        stats["prim_count_before"] = stats["mesh_count"]
+        stats["prim_count_after"] = stats["mesh_count"] + stats["prototype_count"]
+        if self.merge_by_material:
+            self._author_batches()
+        self.chunks.flush()
+        self.stage_seconds["author"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        self.stage.SetDefaultPrim(self.root.GetPrim())
+        root_layer, self.root_layer = self.root_layer, None
+        # The chunk router holds the stage too; it must go before the layer is edited.
+        self.stage = self.root = self.materials_cache = self.chunks.stage = None
+
+        # Attach the chunks at the Sdf level, with no stage open, so they never have to
+        # be recomposed (and loaded) all at once.
+        root_layer.subLayerPaths = [f"./{name}" for name in self.chunks.layer_names]
+        stats["stream_layer_count"] = len(self.chunks.layer_names)
+        # Crate layers can only be written to a file path: SdfLayer.ExportToString always emits
+        # usda text, and Python cannot register an Ar resolver that writes to memory. So each
+        # layer is serialized once into the scratch dir (system temp, not the output drive) and
+        # copied into the archive, which is the only write to the destination.
+        usdc_path = self.work_dir / "model.usdc"
+        if not root_layer.Export(str(usdc_path)):
+            raise RuntimeError("Failed to write USD layer")
+        del root_layer
+
+        package_files = [("model.usdc", usdc_path)] + [(name, self.work_dir / name) for name in self.chunks.layer_names]
+        layer_bytes = sum(path.stat().st_size for _, path in package_files)
+        usdz_size = write_usdz(usdz_path, package_files)
+        self.stage_seconds["package"] += time.perf_counter() - started
+
+        stats["usdz_size_bytes"] = usdz_size
+        stats["bytes_written"] = layer_bytes + usdz_size
+        return usdz_size
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import os
+import shutil
+import struct
+import zipfile
+from pathlib import Path
+
+# USDZ requires every file's data to start on a 64-byte boundary inside an uncompressed zip.
+USDZ_ALIGNMENT = 64
+_PADDING_HEADER_ID = 0x1986
+_LOCAL_HEADER_SIZE = 30
+_COPY_CHUNK = 1024 * 1024
+
+
+def _padding_extra(data_start: int) -> bytes:
+    # The padding is a zip extra field (id + length + filler bytes), the same trick USD's
+    # own writer uses; it needs at least 4 bytes, so small gaps wrap to the next boundary.
+    pad = -(data_start + 4) % USDZ_ALIGNMENT
+    return struct.pack("<HH", _PADDING_HEADER_ID, pad) + b"\x00" * pad
+
+
+def write_usdz(usdz_path: str | Path, files: list[tuple[str, Path]]) -> int:
+    """Package `files` (archive name, source path) into `usdz_path`; the first one is the
+    root layer. The archive is written under a temporary name next to the destination and
+    renamed into place, so readers never see a partial file. Returns the archive size."""
+    usdz_path = Path(usdz_path)
+    usdz_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = usdz_path.with_name(f".{usdz_path.name}.{os.getpid()}.tmp")
+
+    try:
+        with tmp_path.open("wb") as raw, zipfile.ZipFile(raw, "w", compression=zipfile.ZIP_STORED) as archive:
+            for arcname, source in files:
+                info = zipfile.ZipInfo(arcname, date_time=(1980, 1, 1, 0, 0, 0))
+                info.compress_type = zipfile.ZIP_STORED
+                info.file_size = source.stat().st_size
+                data_start = raw.tell() + _LOCAL_HEADER_SIZE + len(arcname.encode("utf-8"))
+                if info.file_size * 1.05 > zipfile.ZIP64_LIMIT:
+                    # zipfile appends its 20-byte zip64 extra after ours for large entries.
+                    data_start += 20
+                info.extra = _padding_extra(data_start)
+                with source.open("rb") as src, archive.open(info, "w") as dst:
+                    shutil.copyfileobj(src, dst, _COPY_CHUNK)
+            archive.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, usdz_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return usdz_path.stat().st_size
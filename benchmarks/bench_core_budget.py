@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+FIXTURE_IFC = ROOT_DIR / "tests" / "fixtures" / "sample.ifc"
+
+
+def _run_batch(ifc_path: Path, jobs: int, workers: int, engine: str, budgeted: bool) -> float:
+    import app.converter as converter
+    from app.scheduler import CoreBudget
+
+    # Conversions must really run every time for the numbers to mean anything.
+    converter.GEOMETRY_CACHE_MB = 0
+    budget = CoreBudget()
+
+    def convert(idx: int, tmp_dir: Path) -> None:
+        job_id = f"job-{idx}"
+        with budget.job(job_id) as threads:
+            converter.run_fast_pipeline(
+                ifc_path,
+                tmp_dir / f"{job_id}.glb",
+                tmp_dir / f"{job_id}.usdz",
+                options={"engine": engine},
+                # Unbudgeted jobs reproduce the old behaviour: every stage takes every core.
+                threads=threads if budgeted else None,
+            )
+
+    with tempfile.TemporaryDirectory() as tmp_dir, ThreadPoolExecutor(max_workers=workers) as pool:
+        started = time.perf_counter()
+        for future in [pool.submit(convert, idx, Path(tmp_dir)) for idx in range(jobs)]:
+            future.result()
+        return time.perf_counter() - started
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Aggregate conversion throughput with and without the core budget")
+    parser.add_argument("--ifc", type=Path, default=FIXTURE_IFC, help="IFC model to convert (default: test fixture)")
+    parser.add_argument("--jobs", type=int, default=8, help="Conversions per measurement (default: %(default)s)")
+    parser.add_argument("--engine", choices=("glb", "direct"), default="glb", help="Conversion engine (default: %(default)s)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4],
+        help="OFFLINE_CONVERTER_MAX_WORKERS values to compare (default: %(default)s)",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    print(f"IFC: {args.ifc}, {args.jobs} jobs, engine={args.engine}, cores={os.cpu_count()}")
+    for workers in args.workers:
+        for budgeted in (False, True):
+            seconds = _run_batch(args.ifc, args.jobs, workers, args.engine, budgeted)
+            mode = "budget" if budgeted else "all-cores"
+            print(f"workers={workers}  {mode:>9}: {seconds:>8.3f} s  {args.jobs / seconds * 60:>8.1f} jobs/min")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+FIXTURE_IFC = ROOT_DIR / "tests" / "fixtures" / "sample.ifc"
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+VARIANTS = ("glb", "direct", "direct-cached")
+
+
+def _run_variant(variant: str, ifc_path: Path, repeats: int) -> dict:
+    import app.converter as converter
+
+    engine = variant.split("-")[0]
+    best = None
+    stats: dict = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Only "direct-cached" uses a geometry cache, a private one warmed by an untimed run.
+        converter.GEOMETRY_CACHE_MB = 1024 if variant == "direct-cached" else 0
+        converter.GEOMETRY_CACHE_PATH = Path(tmp_dir) / "geometry_cache.sqlite"
+        if variant == "direct-cached":
+            converter.run_fast_pipeline(ifc_path, Path(tmp_dir) / "warm.glb", Path(tmp_dir) / "warm.usdz", options={"engine": engine})
+        for idx in range(repeats):
+            output_usdz = Path(tmp_dir) / f"{engine}_{idx}.usdz"
+            started = time.perf_counter()
+            stats = converter.run_fast_pipeline(
+                input_ifc=ifc_path,
+                output_glb=Path(tmp_dir) / f"{engine}_{idx}.glb",
+                output_usdz=output_usdz,
+                options={"engine": engine},
+            )
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+    return {
+        "variant": variant,
+        "seconds": round(best or 0.0, 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "usdz_bytes": stats.get("usdz_size_bytes", 0),
+        "mesh_count": stats.get("mesh_count", 0),
+        "stage_seconds": stats.get("stage_seconds", {}),
+    }
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="IFC->USDZ wall time and peak RSS: two-stage GLB pipeline vs direct engine")
+    parser.add_argument("--ifc", type=Path, default=FIXTURE_IFC, help="IFC model to convert (default: test fixture)")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per engine, best time is reported (default: %(default)s)")
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    repeats = max(1, args.repeats)
+    if args.variant:
+        print(json.dumps(_run_variant(args.variant, args.ifc, repeats)))
+        return 0
+
+    print(f"IFC: {args.ifc} ({args.ifc.stat().st_size / (1024 * 1024):.1f} MB), best of {repeats}")
+    # Each variant runs in a fresh interpreter so peak RSS is not shared.
+    for variant in VARIANTS:
+        output = subprocess.run(
+            [sys.executable, __file__, "--variant", variant, "--ifc", str(args.ifc), "--repeats", str(repeats)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        stages = "  ".join(f"{name}={seconds:.3f}" for name, seconds in result["stage_seconds"].items())
+        print(
+            f"{result['variant']:>13}: {result['seconds']:>8.3f} s  peak_rss={result['peak_rss_mb']:>8.1f} MB  "
+            f"usdz={result['usdz_bytes'] / 1024:>9.1f} KB  meshes={result['mesh_count']}"
+        )
+        print(f"{'':>15}{stages}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _touch_legacy(glb_path: Path) -> int:
+    import trimesh
+    from pygltflib import GLTF2
+
+    gltf = GLTF2().load(str(glb_path))
+    scene = trimesh.load(str(glb_path), process=False)
+    total = len(gltf.nodes)
+    for geom in scene.geometry.values():
+        total += int(geom.vertices.shape[0])
+    return total
+
+
+def _touch_reader(glb_path: Path) -> int:
+    from app.glb_reader import GlbReader
+
+    total = 0
+    with GlbReader(glb_path) as reader:
+        for node in reader.mesh_nodes():
+            total += 1
+            for primitive in reader.primitives(node.mesh):
+                total += int(primitive.positions.shape[0])
+                # Touch the buffers so both variants page in the geometry.
+                primitive.positions.sum()
+    return total
+
+
+def _generate_glb(path: Path, elements: int) -> None:
+    import numpy as np
+    import trimesh
+
+    rng = np.random.default_rng(7)
+    scene = trimesh.Scene()
+    sphere = trimesh.creation.icosphere(subdivisions=3)
+    for idx in range(elements):
+        # Jitter every element so the exporter cannot share buffers between them.
+        element = trimesh.Trimesh(sphere.vertices + rng.normal(0.0, 0.01, sphere.vertices.shape), sphere.faces, process=False)
+        transform = np.eye(4)
+        transform[:3, 3] = (idx % 100, idx // 100, 0.0)
+        scene.add_geometry(element, node_name=f"element_{idx}", geom_name=f"element_{idx}", transform=transform)
+    path.write_bytes(scene.export(file_type="glb"))
+
+
+def _run_variant(variant: str, glb_path: Path) -> dict:
+    started = time.perf_counter()
+    touched = _touch_legacy(glb_path) if variant == "legacy" else _touch_reader(glb_path)
+    return {
+        "variant": variant,
+        "seconds": round(time.perf_counter() - started, 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "touched": touched,
+    }
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="GLB parse time and peak RSS: pygltflib+trimesh vs GlbReader")
+    parser.add_argument("--glb", type=Path, help="Existing GLB to parse (e.g. an IfcConvert output)")
+    parser.add_argument(
+        "--elements",
+        type=int,
+        default=2000,
+        help="Elements in the generated GLB when --glb is not given (default: %(default)s)",
+    )
+    parser.add_argument("--variant", choices=("legacy", "reader"), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    if args.variant:
+        print(json.dumps(_run_variant(args.variant, args.glb)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        glb_path = args.glb
+        if glb_path is None:
+            glb_path = Path(tmp_dir) / "generated.glb"
+            _generate_glb(glb_path, args.elements)
+
+        print(f"GLB: {glb_path} ({glb_path.stat().st_size / (1024 * 1024):.1f} MB)")
+        # Each variant runs in a fresh interpreter so peak RSS is not shared.
+        for variant in ("legacy", "reader"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--variant", variant, "--glb", str(glb_path)],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{result['variant']:>8}: {result['seconds']:>8.3f} s  peak_rss={result['peak_rss_mb']:>8.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
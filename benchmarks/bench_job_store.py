@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+# Roughly what a finished conversion leaves in its record.
+_METADATA = {"face_count": 120000, "vertex_count": 90000, "stages": {"ifc_to_glb": 12.5, "glb_to_usdz": 3.1}}
+
+
+def _populate(workspace: Path, jobs: int) -> None:
+    from app.job_manager import JobManager
+
+    manager = JobManager(base_dir=workspace)
+    for idx in range(jobs):
+        record = manager.create_job()
+        manager.set_done(record.id, output_name=f"{record.id}_model.usdz", metadata={**_METADATA, "idx": idx})
+    manager.close()
+
+
+def _measure(workspace: Path, store: str, pages: int) -> tuple[float, float, float]:
+    from app.job_manager import JobManager
+
+    started = time.perf_counter()
+    manager = JobManager(base_dir=workspace, store=store)
+    manager.load_existing()
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(pages):
+        manager.list_jobs(limit=20)
+    list_seconds = (time.perf_counter() - started) / pages
+
+    started = time.perf_counter()
+    for _ in range(pages):
+        manager.list_jobs(limit=20, statuses=("failed",))
+    filtered_seconds = (time.perf_counter() - started) / pages
+    manager.close()
+    return load_seconds, list_seconds, filtered_seconds
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Job store start-up and listing cost with many finished jobs")
+    parser.add_argument("--jobs", type=int, default=3000, help="Finished jobs in the workspace (default: %(default)s)")
+    parser.add_argument("--pages", type=int, default=50, help="Listings per measurement (default: %(default)s)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    # Write every record straight away so populating measures nothing but the disk.
+    os.environ["OFFLINE_JOB_META_FLUSH_MS"] = "0"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        workspace = Path(tmp_dir) / "workspace"
+        _populate(workspace, args.jobs)
+        print(f"{args.jobs} finished jobs")
+        # The first sqlite run includes the one-off import of the job.json folders.
+        for label, store in (("json", "json"), ("sqlite+import", "sqlite"), ("sqlite", "sqlite")):
+            load, listing, filtered = _measure(workspace, store, args.pages)
+            print(
+                f"{label:>14}: load {load * 1000:>8.1f} ms  list {listing * 1000:>7.2f} ms  "
+                f"filtered list {filtered * 1000:>7.2f} ms"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from pxr import Gf, Usd, UsdGeom, Vt
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from app.glb_to_usdz_fast import _author_mesh_geometry  # noqa: E402
+
+
+def _make_mesh(vertex_count: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(42)
+    vertices = rng.random((vertex_count, 3))
+    faces = rng.integers(0, vertex_count, size=(vertex_count * 2, 3), dtype=np.int64)
+    normals = rng.random((vertex_count, 3))
+    return vertices, faces, normals
+
+
+def _author_legacy(mesh_prim: UsdGeom.Mesh, vertices: np.ndarray, faces: np.ndarray, normals: np.ndarray) -> None:
+    vertices = vertices.astype(np.float64)
+    faces = faces.astype(np.int32)
+    points = Vt.Vec3fArray([Gf.Vec3f(float(v[0]), float(v[1]), float(v[2])) for v in vertices])
+    mesh_prim.GetPointsAttr().Set(points)
+    mesh_prim.GetFaceVertexCountsAttr().Set(Vt.IntArray([3] * len(faces)))
+    mesh_prim.GetFaceVertexIndicesAttr().Set(Vt.IntArray(faces.flatten().tolist()))
+    normals = normals.astype(np.float64)
+    mesh_prim.GetNormalsAttr().Set(Vt.Vec3fArray([Gf.Vec3f(float(n[0]), float(n[1]), float(n[2])) for n in normals]))
+    mesh_prim.SetNormalsInterpolation(UsdGeom.Tokens.vertex)
+
+
+def _measure(author, vertex_count: int, repeats: int) -> float:
+    vertices, faces, normals = _make_mesh(vertex_count)
+    best = float("inf")
+    for _ in range(repeats):
+        stage = Usd.Stage.CreateInMemory()
+        mesh_prim = UsdGeom.Mesh.Define(stage, "/Mesh")
+        started = time.perf_counter()
+        author(mesh_prim, vertices, faces, normals)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Per-mesh USD authoring cost: Python loops vs NumPy -> Vt")
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,100000,1000000",
+        help="Comma-separated vertex counts (default: %(default)s)",
+    )
+    parser.add_argument("--repeats", type=int, default=3, help="Best-of repeats per size (default: %(default)s)")
+    parser.add_argument(
+        "--skip-legacy-above",
+        type=int,
+        default=1_000_000,
+        help="Skip the legacy path for meshes larger than this (default: %(default)s)",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    sizes = [int(item) for item in args.sizes.split(",") if item.strip()]
+
+    print(f"{'vertices':>10} {'legacy_ms':>12} {'vectorized_ms':>14} {'speedup':>9}")
+    for size in sizes:
+        vectorized = _measure(_author_mesh_geometry, size, args.repeats)
+        if size <= args.skip_legacy_above:
+            legacy = _measure(_author_legacy, size, args.repeats)
+            print(f"{size:>10} {legacy * 1000:>12.2f} {vectorized * 1000:>14.2f} {legacy / vectorized:>8.1f}x")
+        else:
+            print(f"{size:>10} {'-':>12} {vectorized * 1000:>14.2f} {'-':>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
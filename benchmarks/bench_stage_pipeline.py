@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+FIXTURE_IFC = ROOT_DIR / "tests" / "fixtures" / "sample.ifc"
+
+
+def _run_batch(ifc_path: Path, jobs: int, pipelined: bool) -> float:
+    import app.converter as converter
+    from app.scheduler import CoreBudget, StageScheduler
+
+    # Conversions must really run every time for the numbers to mean anything.
+    converter.GEOMETRY_CACHE_MB = 0
+    cores = CoreBudget()
+    stages = StageScheduler({"tessellation": 1, "packaging": 1})
+
+    def convert(idx: int, tmp_dir: Path) -> None:
+        job_id = f"job-{idx}"
+
+        @contextmanager
+        def gate(stage: str) -> Iterator[None]:
+            with stages.stage(job_id, stage), cores.job(job_id):
+                yield
+
+        converter.run_fast_pipeline(
+            ifc_path,
+            tmp_dir / f"{job_id}.glb",
+            tmp_dir / f"{job_id}.usdz",
+            options={"engine": "glb"},
+            threads=lambda: cores.share(job_id),
+            stage_gate=gate,
+        )
+
+    # Sequential mode is the old behaviour: one job thread runs each job end to end.
+    workers = 2 if pipelined else 1
+    with tempfile.TemporaryDirectory() as tmp_dir, ThreadPoolExecutor(max_workers=workers) as pool:
+        started = time.perf_counter()
+        for future in [pool.submit(convert, idx, Path(tmp_dir)) for idx in range(jobs)]:
+            future.result()
+        return time.perf_counter() - started
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Job throughput with and without stage pipelining (GLB engine)")
+    parser.add_argument("--ifc", type=Path, default=FIXTURE_IFC, help="IFC model to convert (default: test fixture)")
+    parser.add_argument("--jobs", type=int, default=8, help="Conversions per measurement (default: %(default)s)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    print(f"IFC: {args.ifc}, {args.jobs} jobs, cores={os.cpu_count()}")
+    for pipelined in (False, True):
+        seconds = _run_batch(args.ifc, args.jobs, pipelined)
+        mode = "pipelined" if pipelined else "sequential"
+        print(f"{mode:>10}: {seconds:>8.3f} s  {args.jobs / seconds * 60:>8.1f} jobs/min")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(url: str) -> bytes | None:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.read()
+    except OSError:
+        return None
+
+
+def _time_to_health(timeout: float) -> tuple[float, dict]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.time()
+    env = {**os.environ, "OFFLINE_STARTED_AT": str(started)}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.offline_runner", "--port", str(port), "--log-level", "warning"],
+        cwd=str(ROOT_DIR),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.time() - started < timeout:
+            if _get(f"{base}/health") is not None:
+                seconds = time.time() - started
+                break
+            time.sleep(0.02)
+        else:
+            raise RuntimeError(f"server did not answer /health within {timeout} s")
+
+        # Let the background prewarm finish so its per-module timings are complete.
+        startup: dict = {}
+        while time.time() - started < timeout:
+            startup = json.loads(_get(f"{base}/api/diagnostics") or b"{}").get("startup", {})
+            if startup.get("conversion_stack", {}).get("state") == "ready":
+                break
+            time.sleep(0.2)
+        return seconds, startup
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def _import_times(module: str, top: int) -> list[tuple[float, str]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(ROOT_DIR),
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]) / 1e6, parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Server start-up time to the first /health response")
+    parser.add_argument("--runs", type=int, default=3, help="Server starts to measure (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait per start (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports of app.main to list (default: %(default)s)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    timings = []
+    startup: dict = {}
+    for run in range(args.runs):
+        seconds, startup = _time_to_health(args.timeout)
+        timings.append(seconds)
+        print(f"run {run + 1}: first /health after {seconds:.3f} s")
+    print(f"best {min(timings):.3f} s, worst {max(timings):.3f} s")
+    print("background prewarm (seconds per module):")
+    for name, seconds in startup.get("conversion_stack", {}).get("import_seconds", {}).items():
+        print(f"  {seconds:>7.3f}  {name}")
+    print("slowest imports of app.main (cumulative seconds):")
+    for seconds, name in _import_times("app.main", args.top):
+        print(f"  {seconds:>7.3f}  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
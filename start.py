@@ -66,6 +66,7 @@ def _resolve_python() -> Path:
 def _runtime_env() -> dict[str, str]:
     env = os.environ.copy()
     env["OFFLINE_BLOCK_NET"] = "1"
+    env["OFFLINE_STARTED_AT"] = str(time.time())
     env["PIP_NO_INDEX"] = "1"
     env["PIP_DISABLE_PIP_VERSION_CHECK"] = "1"
     env["HTTP_PROXY"] = "http://127.0.0.1:9"
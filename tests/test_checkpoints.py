@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from contextlib import contextmanager
+from pathlib import Path
+
+import app.converter as converter
+from app.checkpoints import make_checkpoint, stage_inputs, verify_checkpoint
+from app.job_manager import JobManager
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+FIXTURE_IFC = ROOT_DIR / "tests" / "fixtures" / "sample.ifc"
+
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.base = Path(tmp.name)
+
+    def test_verification_rejects_changed_inputs_or_output(self) -> None:
+        output = self.base / "model.glb"
+        output.write_bytes(b"glb-bytes")
+        inputs = stage_inputs("abc", {"engine": "glb", "lod_ratios": [0.5]}, "1.0+x")
+        checkpoint = make_checkpoint(inputs, output)
+
+        self.assertTrue(verify_checkpoint(checkpoint, inputs, output))
+        self.assertFalse(verify_checkpoint(checkpoint, stage_inputs("abc", {"engine": "direct"}, "1.0+x"), output))
+        self.assertFalse(verify_checkpoint(checkpoint, inputs, self.base / "other.glb"))
+        output.write_bytes(b"glb-byteZ")
+        self.assertFalse(verify_checkpoint(checkpoint, inputs, output))
+        output.unlink()
+        self.assertFalse(verify_checkpoint(checkpoint, inputs, output))
+
+    def test_checkpoints_survive_reload(self) -> None:
+        manager = JobManager(base_dir=self.base / "ws", input_dir=self.base / "ifc", output_dir=self.base / "usdz")
+        record = manager.create_job()
+        manager.set_checkpoint(record.id, "ifc_to_glb", {"format": 1, "sha256": "x"})
+        manager.update(record.id, status="running")
+
+        reloaded = JobManager(base_dir=self.base / "ws", input_dir=self.base / "ifc", output_dir=self.base / "usdz")
+        reloaded.load_existing()
+        [pending] = reloaded.list_pending_for_resume()
+        self.assertEqual(pending.status, "queued")
+        self.assertEqual(pending.checkpoints, {"ifc_to_glb": {"format": 1, "sha256": "x"}})
+
+    def test_pipeline_skips_completed_glb_stage(self) -> None:
+        glb = self.base / "model.glb"
+        first = converter.run_fast_pipeline(FIXTURE_IFC, glb, self.base / "a.usdz", options={"engine": "glb"})
+        self.assertNotIn("resumed_stages", first)
+
+        entered = []
+
+        @contextmanager
+        def gate(stage: str):
+            entered.append(stage)
+            yield
+
+        resumed = converter.run_fast_pipeline(
+            FIXTURE_IFC,
+            glb,
+            self.base / "b.usdz",
+            options={"engine": "glb"},
+            stage_gate=gate,
+            completed_stages=["ifc_to_glb"],
+        )
+        self.assertEqual(resumed["resumed_stages"], ["ifc_to_glb"])
+        self.assertEqual(entered, ["glb_to_usdz"])
+        self.assertEqual(resumed["face_count"], first["face_count"])
+
+
+if __name__ == "__main__":
+    unittest.main()
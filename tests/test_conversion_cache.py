@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app import conversion_cache
+from app.conversion_cache import ConversionCache
+
+
+class ConversionCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self._tmp.name)
+        self.ifc = self.base / "model.ifc"
+        self.ifc.write_bytes(b"ISO-10303-21;\nDATA;\nENDSEC;\n")
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _usdz(self, name: str, size: int) -> Path:
+        path = self.base / name
+        path.write_bytes(b"x" * size)
+        return path
+
+    def test_key_depends_on_content_settings_and_version(self) -> None:
+        cache = ConversionCache(self.base / "cache", max_bytes=1024, version="1.0")
+        key = cache.make_key(self.ifc, "glb", options={"faceted": False})
+
+        self.assertEqual(key, cache.make_key(self.ifc, "glb", options={"faceted": False}))
+        self.assertNotEqual(key, cache.make_key(self.ifc, "direct", options={"faceted": False}))
+        self.assertNotEqual(key, cache.make_key(self.ifc, "glb", options={"faceted": True}))
+        self.assertNotEqual(key, cache.make_key(self.ifc, "glb", exclude_entities=["IfcSpace"], options={"faceted": False}))
+        self.assertNotEqual(key, ConversionCache(self.base / "cache", 1024, version="1.1").make_key(self.ifc, "glb", options={"faceted": False}))
+
+        self.ifc.write_bytes(b"ISO-10303-21;\nDATA;\n#1=IFCPROJECT();\nENDSEC;\n")
+        self.assertNotEqual(key, cache.make_key(self.ifc, "glb", options={"faceted": False}))
+
+    def test_hit_materializes_output_and_survives_restart(self) -> None:
+        cache = ConversionCache(self.base / "cache", max_bytes=1024)
+        key = cache.make_key(self.ifc, "glb")
+        self.assertIsNone(cache.lookup(key, self.base / "miss.usdz"))
+
+        self.assertTrue(cache.store(key, self._usdz("out.usdz", 100), {"mesh_count": 3}))
+        restarted = ConversionCache(self.base / "cache", max_bytes=1024)
+        destination = self.base / "usdz" / "hit.usdz"
+        stats = restarted.lookup(key, destination)
+
+        self.assertEqual(stats, {"mesh_count": 3})
+        self.assertEqual(destination.read_bytes(), b"x" * 100)
+        self.assertEqual(cache.stats()["misses"], 1)
+        self.assertEqual(restarted.stats()["hits"], 1)
+        self.assertEqual(restarted.stats()["entries"], 1)
+
+    def test_hit_is_a_private_copy_verified_by_hash(self) -> None:
+        cache = ConversionCache(self.base / "cache", max_bytes=1024)
+        cache.store("a", self._usdz("a.usdz", 100), {"mesh_count": 1})
+        destination = self.base / "usdz" / "hit.usdz"
+        self.assertIsNotNone(cache.lookup("a", destination))
+
+        # Editing the delivered file in place must not reach the cached copy.
+        with destination.open("r+b") as delivered:
+            delivered.write(b"edited")
+        self.assertNotEqual(os.stat(destination).st_ino, os.stat(self.base / "cache" / "a.usdz").st_ino)
+        self.assertEqual(cache.lookup("a", self.base / "again.usdz"), {"mesh_count": 1})
+        self.assertEqual((self.base / "again.usdz").read_bytes(), b"x" * 100)
+
+        # A corrupted entry is dropped instead of being served.
+        (self.base / "cache" / "a.usdz").write_bytes(b"y" * 100)
+        self.assertIsNone(cache.lookup("a", self.base / "corrupt.usdz"))
+        self.assertFalse((self.base / "corrupt.usdz").exists())
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_entry_dropped_during_a_copy_is_deleted_by_the_last_reader(self) -> None:
+        cache = ConversionCache(self.base / "cache", max_bytes=1024)
+        cache.store("a", self._usdz("a.usdz", 100), {})
+        copy = conversion_cache._copy_with_sha256
+        copying, release = threading.Event(), threading.Event()
+
+        def slow_copy(source: Path, destination: Path) -> str:
+            if "slow" in destination.name:
+                copying.set()
+                release.wait(5)
+            return copy(source, destination)
+
+        results = []
+        with mock.patch.object(conversion_cache, "_copy_with_sha256", slow_copy):
+            reader = threading.Thread(target=lambda: results.append(cache.lookup("a", self.base / "slow.usdz")))
+            reader.start()
+            self.assertTrue(copying.wait(5))
+            # This lookup cannot write its output, which drops the entry while "slow" still copies it.
+            (self.base / "taken" / "by_a_directory").mkdir(parents=True)
+            self.assertIsNone(cache.lookup("a", self.base / "taken"))
+            self.assertTrue((self.base / "cache" / "a.usdz").exists())
+            release.set()
+            reader.join(5)
+
+        self.assertEqual(results, [{}])
+        self.assertEqual((self.base / "slow.usdz").read_bytes(), b"x" * 100)
+        self.assertEqual(sorted(path.name for path in (self.base / "cache").iterdir()), [])
+
+    def test_evicts_least_recently_used_entries_over_the_limit(self) -> None:
+        cache = ConversionCache(self.base / "cache", max_bytes=250)
+        cache.store("a", self._usdz("a.usdz", 100), {})
+        cache.store("b", self._usdz("b.usdz", 100), {})
+        # Touch "a" so "b" becomes the oldest entry.
+        time.sleep(0.01)
+        self.assertIsNotNone(cache.lookup("a", self.base / "a_hit.usdz"))
+        cache.store("c", self._usdz("c.usdz", 100), {})
+
+        self.assertIsNotNone(cache.lookup("a", self.base / "a_again.usdz"))
+        self.assertIsNone(cache.lookup("b", self.base / "b_hit.usdz"))
+        self.assertIsNotNone(cache.lookup("c", self.base / "c_hit.usdz"))
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertLessEqual(stats["size_bytes"], 250)
+        self.assertFalse((self.base / "cache" / "b.usdz").exists())
+
+    def test_disabled_cache_never_stores(self) -> None:
+        cache = ConversionCache(self.base / "cache", max_bytes=0)
+        self.assertFalse(cache.store("a", self._usdz("a.usdz", 10), {}))
+        self.assertIsNone(cache.lookup("a", self.base / "a_hit.usdz"))
+        self.assertFalse(os.path.exists(self.base / "cache"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import unittest
+
+import numpy as np
+import trimesh
+
+from app.decimate import simplify_mesh
+
+
+class SimplifyMeshTest(unittest.TestCase):
+    def test_reduces_sphere_close_to_target_and_keeps_shape(self) -> None:
+        sphere = trimesh.creation.icosphere(subdivisions=4)
+        target = len(sphere.faces) // 4
+        vertices, faces = simplify_mesh(sphere.vertices, sphere.faces, target)
+
+        self.assertLessEqual(len(faces), target)
+        self.assertGreaterEqual(len(faces), target // 2)
+        self.assertLess(int(faces.max()), len(vertices))
+        radii = np.linalg.norm(vertices, axis=1)
+        np.testing.assert_allclose(radii, 1.0, atol=0.02)
+
+    def test_small_meshes_are_returned_unchanged(self) -> None:
+        box = trimesh.creation.box()
+        vertices, faces = simplify_mesh(box.vertices, box.faces, 6)
+        self.assertEqual(len(faces), len(box.faces))
+        np.testing.assert_array_equal(vertices, box.vertices)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import app.converter as converter
+
+
+@unittest.skipIf(os.name == "nt", "uses a shell script as a stand-in IfcConvert")
+class DiagnosticsCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.calls = Path(tmp.name) / "calls.log"
+        self.tool = Path(tmp.name) / "IfcConvert"
+        self._write_tool("0.8.0")
+        env = mock.patch.dict(os.environ, {"IFC_CONVERT_PATH": str(self.tool)})
+        env.start()
+        self.addCleanup(env.stop)
+        converter._toolchain_cached = None
+        self.addCleanup(setattr, converter, "GEOMETRY_CACHE_MB", converter.GEOMETRY_CACHE_MB)
+        converter.GEOMETRY_CACHE_MB = 0
+        self.addCleanup(setattr, converter, "_toolchain_cached", None)
+
+    def _write_tool(self, version: str) -> None:
+        self.tool.write_text(f'#!/bin/sh\necho run >> "{self.calls}"\necho "IfcConvert {version}"\n')
+        self.tool.chmod(0o755)
+
+    def _probes(self) -> int:
+        return len(self.calls.read_text().splitlines()) if self.calls.exists() else 0
+
+    def test_probe_is_cached_until_tool_changes(self) -> None:
+        converter.prewarm_diagnostics().join()
+        first = converter.get_diagnostics()
+        second = converter.get_diagnostics()
+        self.assertEqual(self._probes(), 1)
+        self.assertEqual(first["ifcconvert"]["version"], "IfcConvert 0.8.0")
+        self.assertFalse(second["probe"]["stale"])
+
+        self._write_tool("0.8.1-longer")
+        stale = converter.get_diagnostics()
+        self.assertTrue(stale["probe"]["stale"])
+        self.assertEqual(stale["ifcconvert"]["version"], "IfcConvert 0.8.0")
+
+        converter.prewarm_diagnostics().join()
+        fresh = converter.get_diagnostics()
+        self.assertFalse(fresh["probe"]["stale"])
+        self.assertEqual(fresh["ifcconvert"]["version"], "IfcConvert 0.8.1-longer")
+
+    def test_refresh_forces_probe(self) -> None:
+        converter.get_diagnostics()
+        converter.get_diagnostics(refresh=True)
+        self.assertEqual(self._probes(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
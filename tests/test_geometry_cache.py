@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import ifcopenshell
+import numpy as np
+
+from app.geometry_cache import GeometryCache, TessellatedShape, hash_elements
+from app.ifc_to_usdz_direct import ifc_to_usdz_direct
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+FIXTURE_IFC = ROOT_DIR / "tests" / "fixtures" / "sample.ifc"
+
+
+def _products(model) -> list:
+    return [product for product in model.by_type("IfcProduct") if product.Representation]
+
+
+class ElementHashTest(unittest.TestCase):
+    def test_hash_tracks_placement_but_not_owner_history(self) -> None:
+        model = ifcopenshell.open(str(FIXTURE_IFC))
+        products = _products(model)
+        _, before = hash_elements(model, products)
+
+        moved, renamed = products[0], products[1]
+        moved.ObjectPlacement = model.createIfcLocalPlacement(
+            moved.ObjectPlacement,
+            model.createIfcAxis2Placement3D(model.createIfcCartesianPoint((1.0, 0.0, 0.0)), None, None),
+        )
+        renamed.Name = "Renamed in the next revision"
+        _, after = hash_elements(model, products)
+
+        self.assertNotEqual(before[moved.GlobalId], after[moved.GlobalId])
+        unchanged = [guid for guid in before if guid != moved.GlobalId]
+        self.assertEqual({guid: before[guid] for guid in unchanged}, {guid: after[guid] for guid in unchanged})
+
+    def test_deep_placement_chain_does_not_recurse(self) -> None:
+        model = ifcopenshell.open(str(FIXTURE_IFC))
+        product = _products(model)[0]
+        placement = product.ObjectPlacement
+        # Far deeper than the interpreter's recursion limit.
+        for step in range(5000):
+            point = model.createIfcCartesianPoint((float(step), 0.0, 0.0))
+            placement = model.createIfcLocalPlacement(placement, model.createIfcAxis2Placement3D(point, None, None))
+        product.ObjectPlacement = placement
+
+        _, hashes = hash_elements(model, [product])
+        self.assertEqual(len(hashes[product.GlobalId]), 32)
+
+
+class GeometryCacheTest(unittest.TestCase):
+    def test_second_revision_only_tessellates_changed_elements(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            base = Path(tmp)
+            cache = GeometryCache(base / "geometry.sqlite", max_bytes=64 * 1024 * 1024)
+            first = ifc_to_usdz_direct(str(FIXTURE_IFC), str(base / "first.usdz"), geometry_cache=cache)
+            self.assertTrue(first["success"], first.get("error"))
+            self.assertEqual(first["stats"]["geometry_cache"]["hits"], 0)
+
+            model = ifcopenshell.open(str(FIXTURE_IFC))
+            moved = _products(model)[0]
+            moved.ObjectPlacement = model.createIfcLocalPlacement(
+                moved.ObjectPlacement,
+                model.createIfcAxis2Placement3D(model.createIfcCartesianPoint((1.0, 0.0, 0.0)), None, None),
+            )
+            revision = base / "revision.ifc"
+            model.write(str(revision))
+
+            second = ifc_to_usdz_direct(str(revision), str(base / "second.usdz"), geometry_cache=cache)
+            self.assertTrue(second["success"], second.get("error"))
+            stats = second["stats"]
+            self.assertEqual(stats["geometry_cache"]["misses"], 1)
+            self.assertEqual(stats["geometry_cache"]["hits"], first["stats"]["geometry_cache"]["misses"] - 1)
+            self.assertEqual(stats["mesh_count"], first["stats"]["mesh_count"])
+            self.assertEqual(stats["face_count"], first["stats"]["face_count"])
+
+            faceted = ifc_to_usdz_direct(str(revision), str(base / "faceted.usdz"), geometry_cache=cache, faceted=True)
+            self.assertEqual(faceted["stats"]["geometry_cache"]["hits"], 0)
+            cache.close()
+
+    def test_evicts_least_recently_used_rows(self) -> None:
+        def shape(guid: str) -> TessellatedShape:
+            return TessellatedShape(
+                guid=guid,
+                vertices=np.zeros((10, 3)),
+                faces=np.zeros((4, 3), dtype=np.int32),
+                normals=np.zeros((0, 3)),
+                material_ids=np.zeros(4, dtype=np.int32),
+                colors=[(1.0, 0.0, 0.0)],
+            )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            size = shape("a").size_bytes
+            cache = GeometryCache(Path(tmp) / "geometry.sqlite", max_bytes=2 * size)
+            hashes = {"a": "1", "b": "2", "c": "3"}
+            cache.put_many("s", hashes, [shape("a")])
+            cache.put_many("s", hashes, [shape("b")])
+            self.assertEqual(set(cache.get_many("s", {"a": "1"})), {"a"})
+            cache.put_many("s", hashes, [shape("c")])
+
+            found = cache.get_many("s", hashes)
+            self.assertEqual(set(found), {"a", "c"})
+            self.assertEqual(found["a"].colors, [(1.0, 0.0, 0.0)])
+            self.assertEqual(cache.get_many("s", {"a": "stale"}), {})
+            self.assertEqual(cache.stats()["evictions"], 1)
+            cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
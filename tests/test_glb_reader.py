@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import json
+import struct
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from app.glb_reader import GlbReader
+
+
+def _write_glb(path: Path, gltf: dict, binary: bytes) -> None:
+    json_bytes = json.dumps(gltf).encode("utf-8")
+    json_bytes += b" " * (-len(json_bytes) % 4)
+    binary += b"\x00" * (-len(binary) % 4)
+    total = 12 + 8 + len(json_bytes) + 8 + len(binary)
+    with path.open("wb") as f:
+        f.write(struct.pack("<4sII", b"glTF", 2, total))
+        f.write(struct.pack("<II", len(json_bytes), 0x4E4F534A))
+        f.write(json_bytes)
+        f.write(struct.pack("<II", len(binary), 0x004E4942))
+        f.write(binary)
+
+
+class GlbReaderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.glb_path = Path(self.temp_dir.name) / "model.glb"
+
+        # One triangle with interleaved POSITION/NORMAL (stride 24) followed by uint16 indices.
+        interleaved = np.array(
+            [
+                [0.0, 0.0, 0.0, 0.0, 0.0, 1.0],
+                [1.0, 0.0, 0.0, 0.0, 0.0, 1.0],
+                [0.0, 1.0, 0.0, 0.0, 0.0, 1.0],
+            ],
+            dtype=np.float32,
+        )
+        indices = np.array([0, 1, 2], dtype=np.uint16)
+        binary = interleaved.tobytes() + indices.tobytes()
+        gltf = {
+            "asset": {"version": "2.0"},
+            "scene": 0,
+            "scenes": [{"nodes": [0]}],
+            "nodes": [
+                {"name": "parent", "translation": [10.0, 0.0, 0.0], "children": [1]},
+                {"name": "0ABCdefGHI$jkl_mnoPQRs", "mesh": 0, "scale": [2.0, 2.0, 2.0]},
+            ],
+            "meshes": [{"primitives": [{"attributes": {"POSITION": 0, "NORMAL": 1}, "indices": 2, "material": 0}]}],
+            "materials": [{"pbrMetallicRoughness": {"baseColorFactor": [0.2, 0.4, 0.6, 1.0]}}],
+            "buffers": [{"byteLength": len(binary)}],
+            "bufferViews": [
+                {"buffer": 0, "byteOffset": 0, "byteLength": interleaved.nbytes, "byteStride": 24},
+                {"buffer": 0, "byteOffset": interleaved.nbytes, "byteLength": indices.nbytes},
+            ],
+            "accessors": [
+                {"bufferView": 0, "byteOffset": 0, "componentType": 5126, "count": 3, "type": "VEC3"},
+                {"bufferView": 0, "byteOffset": 12, "componentType": 5126, "count": 3, "type": "VEC3"},
+                {"bufferView": 1, "componentType": 5123, "count": 3, "type": "SCALAR"},
+            ],
+        }
+        _write_glb(self.glb_path, gltf, binary)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_accessors_are_read_only_views(self) -> None:
+        with GlbReader(self.glb_path) as reader:
+            positions = reader.accessor(0)
+            normals = reader.accessor(1)
+            self.assertFalse(positions.flags.owndata)
+            self.assertFalse(positions.flags.writeable)
+            np.testing.assert_array_equal(positions[1], [1.0, 0.0, 0.0])
+            np.testing.assert_array_equal(normals, np.tile([0.0, 0.0, 1.0], (3, 1)))
+            np.testing.assert_array_equal(reader.accessor(2), [0, 1, 2])
+            del positions, normals
+
+    def test_mesh_nodes_compose_parent_transforms(self) -> None:
+        with GlbReader(self.glb_path) as reader:
+            nodes = list(reader.mesh_nodes())
+            self.assertEqual(len(nodes), 1)
+            node = nodes[0]
+            self.assertEqual(node.name, "0ABCdefGHI$jkl_mnoPQRs")
+            point = node.matrix @ np.array([1.0, 0.0, 0.0, 1.0])
+            np.testing.assert_allclose(point[:3], [12.0, 0.0, 0.0])
+
+            primitive = reader.primitives(node.mesh)[0]
+            self.assertEqual(reader.material_color(primitive.material), (0.2, 0.4, 0.6))
+            del primitive
+
+    def test_rejects_non_glb_files(self) -> None:
+        bad_path = Path(self.temp_dir.name) / "bad.glb"
+        bad_path.write_bytes(b"not a glb file at all")
+        with self.assertRaises(ValueError):
+            GlbReader(bad_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
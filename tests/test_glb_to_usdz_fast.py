@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import json
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import trimesh
+from pxr import Sdf, Usd, UsdGeom, UsdShade
+
+from app.glb_to_usdz_fast import glb_to_usdz_fast
+from app.usd_scene import _int_array, _vec3f_array
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+
+def _write_sample_glb(path: Path) -> None:
+    scene = trimesh.Scene()
+    box = trimesh.creation.box(extents=(1.0, 2.0, 3.0))
+    scene.add_geometry(box, node_name="2O8_hgdbj2Dxm$cv$92_kq", geom_name="box")
+    translated = trimesh.creation.box(extents=(0.5, 0.5, 0.5))
+    transform = np.eye(4)
+    transform[:3, 3] = (10.0, 0.0, 0.0)
+    scene.add_geometry(translated, node_name="2O8_hgdbj2Dxm$cv$92_kp", geom_name="cube", transform=transform)
+    path.write_bytes(scene.export(file_type="glb"))
+
+
+def _write_repeated_glb(path: Path, copies: int) -> None:
+    scene = trimesh.Scene()
+    for idx in range(copies):
+        transform = np.eye(4)
+        transform[:3, 3] = (float(idx) * 2.0, 0.0, 0.0)
+        door = trimesh.creation.box(extents=(0.9, 2.1, 0.05))
+        scene.add_geometry(door, node_name=f"door_guid_{idx}", geom_name=f"door_{idx}", transform=transform)
+    path.write_bytes(scene.export(file_type="glb"))
+
+
+def _write_raw_glb(path: Path, primitives: list[dict], indices: list[list[int]]) -> None:
+    """One node whose mesh has `primitives`; primitive i uses `indices[i]` over a shared triangle."""
+    positions = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], dtype=np.float32)
+    binary = positions.tobytes()
+    views = [{"buffer": 0, "byteOffset": 0, "byteLength": positions.nbytes}]
+    accessors = [{"bufferView": 0, "componentType": 5126, "count": 3, "type": "VEC3"}]
+    for idx, values in enumerate(indices):
+        data = np.array(values, dtype=np.uint32).tobytes()
+        views.append({"buffer": 0, "byteOffset": len(binary), "byteLength": len(data)})
+        accessors.append({"bufferView": idx + 1, "componentType": 5125, "count": len(values), "type": "SCALAR"})
+        binary += data
+    mesh = [{"attributes": {"POSITION": 0}, "indices": idx + 1, **extra} for idx, extra in enumerate(primitives)]
+    gltf = {
+        "asset": {"version": "2.0"},
+        "nodes": [{"name": "element", "mesh": 0}],
+        "meshes": [{"primitives": mesh}],
+        "buffers": [{"byteLength": len(binary)}],
+        "bufferViews": views,
+        "accessors": accessors,
+    }
+    json_bytes = json.dumps(gltf).encode("utf-8")
+    json_bytes += b" " * (-len(json_bytes) % 4)
+    with path.open("wb") as f:
+        f.write(struct.pack("<4sII", b"glTF", 2, 12 + 8 + len(json_bytes) + 8 + len(binary)))
+        f.write(struct.pack("<II", len(json_bytes), 0x4E4F534A))
+        f.write(json_bytes)
+        f.write(struct.pack("<II", len(binary), 0x004E4942))
+        f.write(binary)
+
+
+class VtArrayConversionTest(unittest.TestCase):
+    def test_vec3f_array_matches_numpy_values(self) -> None:
+        values = np.array([[0.0, 1.5, -2.0], [3.25, 4.0, 5.0]], dtype=np.float64)
+        array = _vec3f_array(values)
+        self.assertEqual(len(array), 2)
+        self.assertEqual(tuple(array[1]), (3.25, 4.0, 5.0))
+
+    def test_int_array_flattens_faces(self) -> None:
+        faces = np.array([[0, 1, 2], [2, 3, 0]], dtype=np.int64)
+        self.assertEqual(list(_int_array(faces)), [0, 1, 2, 2, 3, 0])
+
+
+class GlbToUsdzFastTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.glb_path = self.root / "model.glb"
+        self.usdz_path = self.root / "out" / "model.usdz"
+        _write_sample_glb(self.glb_path)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def _mesh_prims(stage: Usd.Stage) -> list[UsdGeom.Mesh]:
+        return [UsdGeom.Mesh(prim) for prim in stage.Traverse() if prim.IsA(UsdGeom.Mesh)]
+
+    def test_converts_all_meshes(self) -> None:
+        result = glb_to_usdz_fast(str(self.glb_path), str(self.usdz_path))
+        self.assertTrue(result["success"], result.get("error"))
+        self.assertEqual(result["stats"]["mesh_count"], 2)
+        self.assertEqual(result["stats"]["face_count"], 24)
+        self.assertTrue(self.usdz_path.exists())
+
+        stage = Usd.Stage.Open(str(self.usdz_path))
+        meshes = self._mesh_prims(stage)
+        self.assertEqual(len(meshes), 2)
+        for mesh in meshes:
+            counts = mesh.GetFaceVertexCountsAttr().Get()
+            indices = mesh.GetFaceVertexIndicesAttr().Get()
+            self.assertEqual(set(counts), {3})
+            self.assertEqual(len(indices), 3 * len(counts))
+            self.assertTrue(mesh.GetPrim().GetCustomDataByKey("ifcGuid"))
+
+    def test_repeated_geometry_is_instanced(self) -> None:
+        _write_repeated_glb(self.glb_path, copies=3)
+        result = glb_to_usdz_fast(str(self.glb_path), str(self.usdz_path))
+        self.assertTrue(result["success"], result.get("error"))
+        self.assertEqual(result["stats"]["prototype_count"], 1)
+        self.assertEqual(result["stats"]["instance_count"], 3)
+
+        stage = Usd.Stage.Open(str(self.usdz_path))
+        placements = [prim for prim in stage.GetPrimAtPath("/Root").GetChildren() if prim.IsInstance()]
+        self.assertEqual(len(placements), 3)
+        guids = sorted(prim.GetCustomDataByKey("ifcGuid") for prim in placements)
+        self.assertEqual(guids, ["door_guid_0", "door_guid_1", "door_guid_2"])
+
+        offsets = sorted(
+            UsdGeom.Xformable(prim).ComputeLocalToWorldTransform(Usd.TimeCode.Default()).ExtractTranslation()[0]
+            for prim in placements
+        )
+        self.assertEqual(offsets, [0.0, 2.0, 4.0])
+
+        # Each instance must actually carry the shared mesh, or it renders as an empty Xform.
+        for prim in placements:
+            proxies = Usd.PrimRange(prim, Usd.TraverseInstanceProxies())
+            self.assertTrue(any(proxy.IsA(UsdGeom.Mesh) for proxy in proxies))
+        bbox_cache = UsdGeom.BBoxCache(Usd.TimeCode.Default(), [UsdGeom.Tokens.default_])
+        bounds = bbox_cache.ComputeWorldBound(stage.GetPrimAtPath("/Root")).ComputeAlignedRange()
+        self.assertFalse(bounds.IsEmpty())
+        self.assertGreaterEqual(bounds.GetSize()[0], 4.0)
+
+    def test_instancing_can_be_disabled(self) -> None:
+        _write_repeated_glb(self.glb_path, copies=3)
+        result = glb_to_usdz_fast(str(self.glb_path), str(self.usdz_path), instancing=False)
+        self.assertTrue(result["success"], result.get("error"))
+        self.assertEqual(result["stats"]["instance_count"], 0)
+
+        stage = Usd.Stage.Open(str(self.usdz_path))
+        self.assertEqual(len(self._mesh_prims(stage)), 3)
+
+    def test_streaming_splits_meshes_into_sublayers(self) -> None:
+        result = glb_to_usdz_fast(str(self.glb_path), str(self.usdz_path), stream_batch_size=1)
+        self.assertTrue(result["success"], result.get("error"))
+        self.assertEqual(result["stats"]["stream_layer_count"], 2)
+        self.assertIsNotNone(result["stats"]["peak_rss_bytes"])
+
+        with zipfile.ZipFile(self.usdz_path) as archive:
+            self.assertEqual(archive.namelist(), ["model.usdc", "chunk_0000.usdc", "chunk_0001.usdc"])
+
+        stage = Usd.Stage.Open(str(self.usdz_path))
+        meshes = self._mesh_prims(stage)
+        self.assertEqual(len(meshes), 2)
+        for mesh in meshes:
+            binding = UsdShade.MaterialBindingAPI(mesh.GetPrim()).GetDirectBindingRel().GetTargets()
+            self.assertEqual([str(path) for path in binding], ["/Root/Materials/Mat_0"])
+
+    def test_streamed_chunks_are_attached_without_composing_them(self) -> None:
+        # pxr reports sublayers it fails to compose on stderr only, so the conversion runs in a child.
+        probe = (
+            "import sys\n"
+            "from app.glb_to_usdz_fast import glb_to_usdz_fast\n"
+            "result = glb_to_usdz_fast(sys.argv[1], sys.argv[2], stream_batch_size=1)\n"
+            "assert result['success'], result.get('error')\n"
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", probe, str(self.glb_path), str(self.usdz_path)],
+            cwd=str(ROOT_DIR),
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertNotIn("Could not load sublayer", completed.stderr)
+
+    def test_package_is_aligned_and_written_in_place(self) -> None:
+        result = glb_to_usdz_fast(str(self.glb_path), str(self.usdz_path), stream_batch_size=1)
+        self.assertTrue(result["success"], result.get("error"))
+        self.assertGreater(result["stats"]["bytes_written"], result["stats"]["usdz_size_bytes"])
+
+        package = Sdf.ZipFile.Open(str(self.usdz_path))
+        for name in package.GetFileNames():
+            info = package.GetFileInfo(name)
+            self.assertEqual(info.dataOffset % 64, 0, name)
+            self.assertEqual(info.compressionMethod, 0, name)
+        self.assertEqual(sorted(path.name for path in self.usdz_path.parent.iterdir()), ["model.usdz"])
+
+    def test_parallel_preparation_matches_serial_output(self) -> None:
+        _write_repeated_glb(self.glb_path, copies=3)
+        exported = []
+        for workers in (1, 4):
+            result = glb_to_usdz_fast(str(self.glb_path), str(self.usdz_path), workers=workers)
+            self.assertTrue(result["success"], result.get("error"))
+            stage = Usd.Stage.Open(str(self.usdz_path))
+            exported.append(stage.GetRootLayer().ExportToString())
+        self.assertEqual(exported[0], exported[1])
+
+    def test_merge_by_material_keeps_elements_as_subsets(self) -> None:
+        result = glb_to_usdz_fast(str(self.glb_path), str(self.usdz_path), merge_by_material=True)
+        self.assertTrue(result["success"], result.get("error"))
+        stats = result["stats"]
+        self.assertEqual(stats["prim_count_before"], 2)
+        self.assertEqual(stats["prim_count_after"], 1)
+        self.assertEqual(stats["subset_count"], 2)
+
+        stage = Usd.Stage.Open(str(self.usdz_path))
+        meshes = self._mesh_prims(stage)
+        self.assertEqual(len(meshes), 1)
+        self.assertEqual(len(meshes[0].GetFaceVertexCountsAttr().Get()), 24)
+
+        subsets = UsdGeom.Subset.GetGeomSubsets(meshes[0], UsdGeom.Tokens.face, "ifcElement")
+        guids = {subset.GetPrim().GetCustomDataByKey("ifcGuid") for subset in subsets}
+        self.assertEqual(guids, {"2O8_hgdbj2Dxm$cv$92_kq", "2O8_hgdbj2Dxm$cv$92_kp"})
+        self.assertTrue(UsdGeom.Subset.ValidateSubsets(subsets, 24, UsdGeom.Tokens.partition)[0])
+
+        # The second element was baked into world space at its original offset.
+        points = np.asarray(meshes[0].GetPointsAttr().Get())
+        self.assertAlmostEqual(float(points[:, 0].max()), 10.25, places=5)
+
+    def test_glb_normals_are_reused_and_rotated(self) -> None:
+        box = trimesh.creation.box()
+        hard_edged = trimesh.Trimesh(
+            vertices=box.vertices[box.faces].reshape(-1, 3),
+            faces=np.arange(3 * len(box.faces)).reshape(-1, 3),
+            vertex_normals=np.repeat(box.face_normals, 3, axis=0),
+            process=False,
+        )
+        rotation = trimesh.transformations.rotation_matrix(np.pi / 2, (0.0, 0.0, 1.0))
+        scene = trimesh.Scene()
+        scene.add_geometry(hard_edged, node_name="with_normals", geom_name="with_normals", transform=rotation)
+        self.glb_path.write_bytes(scene.export(file_type="glb", include_normals=True))
+
+        result = glb_to_usdz_fast(str(self.glb_path), str(self.usdz_path))
+        self.assertTrue(result["success"], result.get("error"))
+        self.assertEqual(result["stats"]["normals_from_glb"], 1)
+        self.assertIn("normals", result["stats"]["stage_seconds"])
+
+        stage = Usd.Stage.Open(str(self.usdz_path))
+        mesh = UsdGeom.Mesh(stage.GetPrimAtPath("/Root/with_normals"))
+        self.assertEqual(mesh.GetNormalsInterpolation(), UsdGeom.Tokens.vertex)
+        expected = np.repeat(box.face_normals, 3, axis=0) @ rotation[:3, :3].T
+        np.testing.assert_allclose(np.asarray(mesh.GetNormalsAttr().Get()), expected, atol=1e-6)
+
+    def test_missing_normals_fall_back_to_flat_and_faceted_skips_them(self) -> None:
+        result = glb_to_usdz_fast(str(self.glb_path), str(self.usdz_path))
+        self.assertTrue(result["success"], result.get("error"))
+        self.assertEqual(result["stats"]["normals_flat"], 2)
+        stage = Usd.Stage.Open(str(self.usdz_path))
+        for mesh in self._mesh_prims(stage):
+            self.assertEqual(mesh.GetNormalsInterpolation(), UsdGeom.Tokens.uniform)
+            self.assertEqual(len(mesh.GetNormalsAttr().Get()), 12)
+
+        faceted_path = self.root / "out" / "faceted.usdz"
+        result = glb_to_usdz_fast(str(self.glb_path), str(faceted_path), faceted=True)
+        self.assertTrue(result["success"], result.get("error"))
+        stage = Usd.Stage.Open(str(faceted_path))
+        for mesh in self._mesh_prims(stage):
+            self.assertFalse(mesh.GetNormalsAttr().HasAuthoredValue())
+
+    def test_primitives_that_are_not_triangle_lists_are_skipped(self) -> None:
+        _write_raw_glb(
+            self.glb_path,
+            primitives=[{}, {"mode": 1}, {}, {}],
+            # A triangle, a line, a truncated index list and an index past the last vertex.
+            indices=[[0, 1, 2], [0, 1], [0, 1, 2, 0], [0, 1, 3]],
+        )
+        result = glb_to_usdz_fast(str(self.glb_path), str(self.usdz_path))
+        self.assertTrue(result["success"], result.get("error"))
+        self.assertEqual(result["stats"]["skipped_primitives"], 3)
+        self.assertEqual(result["stats"]["face_count"], 1)
+
+    def test_lod_levels_are_authored_as_variants(self) -> None:
+        scene = trimesh.Scene()
+        scene.add_geometry(trimesh.creation.icosphere(subdivisions=3), node_name="sphere_guid", geom_name="sphere")
+        scene.add_geometry(trimesh.creation.box(), node_name="box_guid", geom_name="box")
+        self.glb_path.write_bytes(scene.export(file_type="glb"))
+
+        result = glb_to_usdz_fast(str(self.glb_path), str(self.usdz_path), lod_ratios=[0.25, 0.5], lod_min_triangles=100)
+        self.assertTrue(result["success"], result.get("error"))
+        lod_faces = result["stats"]["lod_face_counts"]
+        self.assertEqual(lod_faces[0], 1280 + 12)
+        self.assertGreater(lod_faces[0], lod_faces[1])
+        self.assertGreater(lod_faces[1], lod_faces[2])
+        self.assertEqual(result["stats"]["lod_mesh_count"], 1)
+
+        stage = Usd.Stage.Open(str(self.usdz_path))
+        sphere = UsdGeom.Mesh(stage.GetPrimAtPath("/Root/sphere_guid"))
+        variant_set = sphere.GetPrim().GetVariantSets().GetVariantSet("lod")
+        self.assertEqual(variant_set.GetVariantNames(), ["lod0", "lod1", "lod2"])
+        self.assertEqual(variant_set.GetVariantSelection(), "lod0")
+        face_counts = []
+        for name in ("lod0", "lod1", "lod2"):
+            variant_set.SetVariantSelection(name)
+            face_counts.append(len(sphere.GetFaceVertexCountsAttr().Get()))
+        self.assertEqual(face_counts, [1280, lod_faces[1] - 12, lod_faces[2] - 12])
+        # Meshes below the triangle threshold stay a plain mesh.
+        self.assertFalse(stage.GetPrimAtPath("/Root/box_guid").GetVariantSets().HasVariantSet("lod"))
+
+
+
+if __name__ == "__main__":
+    unittest.main()
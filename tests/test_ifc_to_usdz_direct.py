@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import ifcopenshell
+from pxr import Usd, UsdGeom, UsdShade
+
+from app.ifc_to_usdz_direct import ifc_to_usdz_direct
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+FIXTURE_IFC = ROOT_DIR / "tests" / "fixtures" / "sample.ifc"
+
+
+def _meshes(stage: Usd.Stage) -> list[UsdGeom.Mesh]:
+    return [UsdGeom.Mesh(prim) for prim in stage.Traverse() if prim.IsA(UsdGeom.Mesh)]
+
+
+class IfcToUsdzDirectTest(unittest.TestCase):
+    def test_authors_meshes_with_ifc_guids_and_materials(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / "direct.usdz"
+            result = ifc_to_usdz_direct(str(FIXTURE_IFC), str(output))
+
+            self.assertTrue(result["success"], result.get("error"))
+            stats = result["stats"]
+            self.assertEqual(stats["engine"], "direct")
+            self.assertIn("tessellate", stats["stage_seconds"])
+
+            stage = Usd.Stage.Open(str(output))
+            meshes = _meshes(stage)
+            self.assertEqual(len(meshes), stats["mesh_count"])
+            self.assertGreater(len(meshes), 0)
+
+            products = {product.GlobalId for product in ifcopenshell.open(str(FIXTURE_IFC)).by_type("IfcProduct")}
+            for mesh in meshes:
+                prim = mesh.GetPrim()
+                self.assertIn(prim.GetCustomDataByKey("ifcGuid"), products)
+                self.assertEqual(len(mesh.GetNormalsAttr().Get()), len(mesh.GetPointsAttr().Get()))
+                material, _ = UsdShade.MaterialBindingAPI(prim).ComputeBoundMaterial()
+                self.assertTrue(material)
+
+    def test_faceted_and_entity_filter(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            full = Path(tmp) / "full.usdz"
+            filtered = Path(tmp) / "filtered.usdz"
+            full_result = ifc_to_usdz_direct(str(FIXTURE_IFC), str(full), faceted=True)
+            filtered_result = ifc_to_usdz_direct(
+                str(FIXTURE_IFC), str(filtered), exclude_entities=["IfcReinforcingMesh"], faceted=True
+            )
+
+            self.assertTrue(full_result["success"], full_result.get("error"))
+            self.assertTrue(filtered_result["success"], filtered_result.get("error"))
+            self.assertLess(filtered_result["stats"]["mesh_count"], full_result["stats"]["mesh_count"])
+            stage = Usd.Stage.Open(str(full))
+            for mesh in _meshes(stage):
+                self.assertFalse(mesh.GetNormalsAttr().HasAuthoredValue())
+
+    def test_cancel_check_stops_conversion(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / "cancelled.usdz"
+            result = ifc_to_usdz_direct(str(FIXTURE_IFC), str(output), cancel_check=lambda: True)
+
+            self.assertFalse(result["success"])
+            self.assertIn("Cancelled", result["error"])
+            self.assertFalse(output.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import json
+import os
 import tempfile
+import threading
 import unittest
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from unittest import mock
 
-from app.job_manager import JobManager
+from app.job_manager import JobManager, job_cursor
+from app.job_persistence import MetaPersister
 
 
 class JobManagerStorageTest(unittest.TestCase):
@@ -56,6 +61,168 @@ class JobManagerStorageTest(unittest.TestCase):
         self.assertTrue(input_path.exists())
         self.assertTrue(output_path.exists())
 
+    def test_progress_is_coalesced_and_terminal_state_written_at_once(self) -> None:
+        with mock.patch.dict(os.environ, {"OFFLINE_JOB_META_FLUSH_MS": "60000"}):
+            manager = JobManager(base_dir=self.workspace, input_dir=self.ifc_dir, output_dir=self.usdz_dir)
+        record = manager.create_job()
+        meta = record.work_dir / "job.json"
+        for progress in range(10, 60, 10):
+            manager.set_running(record.id, stage="ifc_to_glb", progress=progress)
+        self.assertEqual(json.loads(meta.read_text(encoding="utf-8"))["status"], "queued")
+
+        manager.set_failed(record.id, "boom")
+        self.assertEqual(json.loads(meta.read_text(encoding="utf-8"))["status"], "failed")
+        stats = manager.persister.snapshot()
+        self.assertEqual((stats["written"], stats["writes_saved"], stats["pending"]), (2, 5, 0))
+        self.assertFalse(meta.with_name("job.json.tmp").exists())
+        manager.close()
+
+    def test_new_job_is_written_with_its_options(self) -> None:
+        with mock.patch.dict(os.environ, {"OFFLINE_JOB_META_FLUSH_MS": "60000"}):
+            manager = JobManager(base_dir=self.workspace, input_dir=self.ifc_dir, output_dir=self.usdz_dir)
+        record = manager.create_job(input_name="demo.ifc", options={"engine": "glb", "faceted": True})
+        payload = json.loads((record.work_dir / "job.json").read_text(encoding="utf-8"))
+        self.assertEqual(payload["input_name"], "demo.ifc")
+        self.assertEqual(payload["options"], {"engine": "glb", "faceted": True})
+        self.assertEqual(manager.persister.snapshot()["pending"], 0)
+        manager.close()
+
+    def test_keyset_pagination_and_status_filter(self) -> None:
+        for store in ("json", "sqlite"):
+            with self.subTest(store=store):
+                # Progress stays pending while listing, so the listing must not lag it.
+                with mock.patch.dict(os.environ, {"OFFLINE_JOB_META_FLUSH_MS": "60000"}):
+                    manager = JobManager(
+                        base_dir=self.workspace / store, input_dir=self.ifc_dir, output_dir=self.usdz_dir, store=store
+                    )
+                ids = [manager.create_job().id for _ in range(5)]
+                for job_id in ids[:2]:
+                    manager.set_failed(job_id, "boom")
+                running = list(reversed(ids[2:]))
+                for job_id in running:
+                    manager.set_running(job_id, stage="ifc_to_glb", progress=10)
+
+                newest_first = list(reversed(running)) + list(reversed(ids[:2]))
+                first = manager.list_jobs(limit=2)
+                second = manager.list_jobs(limit=2, before=job_cursor(first[-1]))
+                rest = manager.list_jobs(limit=2, before=job_cursor(second[-1]))
+                self.assertEqual([r.id for r in first + second + rest], newest_first)
+                self.assertEqual([r.status for r in first + second + rest], ["running"] * 3 + ["failed"] * 2)
+                failed = manager.list_jobs(statuses=("failed",))
+                self.assertEqual([r.id for r in failed], newest_first[3:])
+                in_progress = manager.list_jobs(statuses=("running",))
+                self.assertEqual([r.id for r in in_progress], newest_first[:3])
+                manager.close()
+
+    def test_changes_since_reports_changed_and_departed_jobs(self) -> None:
+        first = self.manager.create_job()
+        second = self.manager.create_job()
+        cursor = self.manager.change_cursor()
+        self.assertEqual(self.manager.changes_since(cursor), ([], []))
+
+        self.manager.set_running(second.id, stage="ifc_to_glb", progress=20)
+        self.manager.set_running(first.id, stage="ifc_to_glb", progress=10)
+        changed, gone = self.manager.changes_since(cursor, statuses=("running",))
+        self.assertEqual(([r.id for r in changed], gone), ([first.id, second.id], []))
+
+        cursor = self.manager.change_cursor()
+        self.manager.set_done(first.id, output_name="a.usdz", metadata={})
+        changed, gone = self.manager.changes_since(cursor, statuses=("running",))
+        self.assertEqual((changed, gone), ([], [first.id]))
+        self.assertNotEqual(self.manager.change_cursor(), cursor)
+        # Sequences restart with the process, so another run's cursor needs a full listing.
+        self.assertIsNone(self.manager.changes_since("0000.1"))
+
+    def test_change_feed_is_bounded_and_old_cursors_resync(self) -> None:
+        self.manager.change_feed_size = 2
+        jobs = [self.manager.create_job() for _ in range(3)]
+        self.assertEqual(len(self.manager._changes), 2)
+        # The first job's creation left the feed, so a cursor from before it cannot get a delta.
+        self.assertIsNone(self.manager.changes_since(f"{self.manager._epoch}.0"))
+
+        cursor = self.manager.change_cursor()
+        self.manager.set_done(jobs[0].id, output_name="a.usdz", metadata={})
+        self.manager._remove_job_files(jobs[1])
+        self.manager._mark_changed(jobs[1].id, removed=True)
+        changed, gone = self.manager.changes_since(cursor)
+        self.assertEqual(([r.id for r in changed], gone), ([jobs[0].id], [jobs[1].id]))
+
+        for _ in range(2):
+            self.manager.create_job()
+        self.assertEqual(len(self.manager._changes), 2)
+        self.assertEqual(self.manager._removed, set())
+        self.assertIsNone(self.manager.changes_since(cursor))
+
+    def test_sqlite_store_migrates_job_folders_once(self) -> None:
+        done = self.manager.create_job()
+        self.manager.set_done(done.id, output_name="a.usdz", metadata={"faces": 3})
+        queued = self.manager.create_job()
+
+        manager = JobManager(
+            base_dir=self.workspace, input_dir=self.ifc_dir, output_dir=self.usdz_dir, store="sqlite"
+        )
+        self.assertEqual(manager.load_existing(), 2)
+        # Only unfinished jobs are loaded up front; finished ones come from the database on demand.
+        self.assertEqual(set(manager._jobs), {queued.id})
+        self.assertEqual(manager.get(done.id).metadata, {"faces": 3})
+        # Finished jobs are read from the database each time instead of piling up in memory.
+        self.assertEqual(set(manager._jobs), {queued.id})
+        manager.set_running(queued.id, stage="ifc_to_glb", progress=40)
+        manager.close()
+
+        (queued.work_dir / "job.json").unlink()
+        reopened = JobManager(
+            base_dir=self.workspace, input_dir=self.ifc_dir, output_dir=self.usdz_dir, store="sqlite"
+        )
+        self.assertEqual(reopened.load_existing(), 2)
+        self.assertEqual(reopened.get(queued.id).progress, 40)
+        self.assertEqual([r.id for r in reopened.list_pending_for_resume()], [queued.id])
+        reopened.set_failed(queued.id, "boom")
+        self.assertEqual(reopened._jobs, {})
+        self.assertEqual(reopened.get(queued.id).status, "failed")
+        reopened.close()
+
+
+class MetaPersisterTest(unittest.TestCase):
+    def test_flushes_latest_payload_and_never_overwrites_newer(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "job.json"
+            persister = MetaPersister(flush_interval=0.05)
+            for progress in range(5):
+                persister.submit(path, {"progress": progress})
+            persister.close()
+            self.assertEqual(json.loads(path.read_text(encoding="utf-8")), {"progress": 4})
+            self.assertEqual(persister.snapshot()["writes_saved"], 4)
+
+            persister = MetaPersister(flush_interval=60)
+            persister.submit(path, {"status": "running"})
+            persister.submit(path, {"status": "done"}, immediate=True)
+            persister.close()
+            self.assertEqual(json.loads(path.read_text(encoding="utf-8")), {"status": "done"})
+
+    def test_flush_waits_for_writes_already_taken_by_the_writer(self) -> None:
+        started, release = threading.Event(), threading.Event()
+        written: list[dict] = []
+
+        def slow_write(key, payload) -> None:
+            started.set()
+            release.wait(5)
+            written.append(payload)
+
+        persister = MetaPersister(flush_interval=0.01, write=slow_write)
+        persister.submit("job", {"progress": 10})
+        self.assertTrue(started.wait(5))
+        # The writer thread has taken the payload, so nothing is pending any more.
+        self.assertEqual(persister.snapshot()["pending"], 0)
+        flusher = threading.Thread(target=persister.flush)
+        flusher.start()
+        flusher.join(0.2)
+        self.assertTrue(flusher.is_alive())
+        release.set()
+        flusher.join(5)
+        self.assertEqual(written, [{"progress": 10}])
+        persister.close()
+
 
 if __name__ == "__main__":
     unittest.main()
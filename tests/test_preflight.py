@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import unittest
+from pathlib import Path
+
+import ifcopenshell
+
+from app.preflight import choose_engine, estimate_cost, preflight_ifc, scan_ifc, suggest_max_threads
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+FIXTURE_IFC = ROOT_DIR / "tests" / "fixtures" / "sample.ifc"
+
+
+def _scan(**counts: int) -> dict:
+    scan = {
+        "file_size_bytes": 1024 * 1024,
+        "products": 1000,
+        "mapped_items": 0,
+        "representation_maps": 0,
+        "boolean_operations": 0,
+        "openings": 0,
+        "faces": 0,
+        "face_sets": 0,
+    }
+    scan.update(counts)
+    return scan
+
+
+class PreflightTest(unittest.TestCase):
+    def test_scan_matches_parsed_model(self) -> None:
+        model = ifcopenshell.open(str(FIXTURE_IFC))
+        scan = scan_ifc(FIXTURE_IFC)
+
+        self.assertEqual(scan["schema"], model.schema)
+        self.assertEqual(scan["entity_count"], len(list(model)))
+        self.assertEqual(scan["mapped_items"], len(model.by_type("IfcMappedItem")))
+        self.assertEqual(scan["representation_maps"], len(model.by_type("IfcRepresentationMap")))
+        tessellated = [
+            product
+            for product in model.by_type("IfcProduct")
+            if not product.is_a("IfcSpatialStructureElement") and not product.is_a("IfcOpeningElement")
+        ]
+        self.assertEqual(scan["products"], len(tessellated))
+
+    def test_engine_and_thread_choice(self) -> None:
+        self.assertEqual(choose_engine(_scan(mapped_items=800, representation_maps=50)), "glb")
+        # One mapped item per product with its own map is a Revit-style export, not reuse.
+        self.assertEqual(choose_engine(_scan(products=5000, mapped_items=5000, representation_maps=5000)), "direct")
+        self.assertEqual(choose_engine(_scan(products=5000)), "direct")
+        self.assertEqual(choose_engine(_scan(products=5000, mapped_items=4000, representation_maps=100)), "glb")
+        # Small and medium models keep the proven GLB path.
+        self.assertEqual(choose_engine(_scan()), "glb")
+        self.assertEqual(suggest_max_threads(_scan(products=20)), 1)
+        self.assertIsNone(suggest_max_threads(_scan()))
+
+    def test_estimate_grows_with_booleans_and_shrinks_with_threads(self) -> None:
+        plain = estimate_cost(_scan(), threads=1)
+        boolean_heavy = estimate_cost(_scan(boolean_operations=500), threads=1)
+        self.assertGreater(boolean_heavy["estimated_seconds"], plain["estimated_seconds"])
+        parallel = estimate_cost(_scan(boolean_operations=500), threads=4)
+        self.assertLess(parallel["estimated_seconds"], boolean_heavy["estimated_seconds"])
+
+        report = preflight_ifc(FIXTURE_IFC, threads=4)
+        self.assertIn(report["suggested_engine"], ("glb", "direct"))
+        self.assertGreater(report["estimated_peak_rss_bytes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import os
+import signal
+import tempfile
+import unittest
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.process_executor import ConversionWorkerPool
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+FIXTURE_IFC = ROOT_DIR / "tests" / "fixtures" / "sample.ifc"
+
+
+class ConversionWorkerPoolTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.base = Path(tmp.name)
+        self.pool = ConversionWorkerPool(workers=1, max_jobs=2)
+        self.addCleanup(self.pool.shutdown)
+        # Each conversion would otherwise fill the shared workspace geometry cache.
+        self.options = {"engine": "direct"}
+        os.environ["OFFLINE_GEOMETRY_CACHE_MB"] = "0"
+        self.addCleanup(os.environ.pop, "OFFLINE_GEOMETRY_CACHE_MB")
+
+    def _run(self, name: str, **kwargs) -> dict:
+        return self.pool.run_pipeline(
+            FIXTURE_IFC, self.base / f"{name}.glb", self.base / f"{name}.usdz", options=self.options, **kwargs
+        )
+
+    def test_runs_in_worker_and_recycles_after_max_jobs(self) -> None:
+        stages = []
+        first = self._run("a", progress_cb=lambda stage, progress: stages.append(stage), threads=lambda: 1)
+        second = self._run("b")
+        third = self._run("c")
+
+        self.assertTrue((self.base / "a.usdz").stat().st_size > 0)
+        self.assertIn("completed", stages)
+        self.assertEqual(first["stage_threads"], {"ifc_to_usdz": 1})
+        self.assertNotEqual(first["worker"]["pid"], os.getpid())
+        self.assertEqual(first["worker"]["pid"], second["worker"]["pid"])
+        self.assertTrue(second["worker"]["recycled"])
+        self.assertNotEqual(third["worker"]["pid"], second["worker"]["pid"])
+        self.assertEqual(self.pool.snapshot()["recycled"], 1)
+
+    def test_stage_gate_is_entered_in_the_parent(self) -> None:
+        events = []
+
+        @contextmanager
+        def gate(stage: str):
+            events.append(("enter", stage, os.getpid()))
+            yield
+            events.append(("exit", stage, os.getpid()))
+
+        self._run("gated", stage_gate=gate)
+        self.assertEqual(events, [("enter", "ifc_to_usdz", os.getpid()), ("exit", "ifc_to_usdz", os.getpid())])
+
+        @contextmanager
+        def refuse(stage: str):
+            raise RuntimeError("Cancelled by user")
+            yield
+
+        with self.assertRaisesRegex(RuntimeError, "Cancelled by user"):
+            self._run("refused", stage_gate=refuse)
+
+    def test_cancel_reaches_worker(self) -> None:
+        with self.assertRaisesRegex(RuntimeError, "Cancelled by user"):
+            self._run("cancelled", cancel_check=lambda: True)
+        self.assertGreater(self._run("after")["face_count"], 0)
+
+    @unittest.skipIf(os.name == "nt", "uses SIGKILL")
+    def test_worker_crash_fails_job_not_caller(self) -> None:
+        def kill_worker(stage: str, progress: int) -> None:
+            os.kill(self._run_pid, signal.SIGKILL)
+
+        self._run_pid = self._run("warm")["worker"]["pid"]
+        with self.assertRaisesRegex(RuntimeError, "exited unexpectedly"):
+            self._run("crash", progress_cb=kill_worker)
+        self.assertEqual(self.pool.snapshot()["crashed"], 1)
+        self.assertGreater(self._run("after")["face_count"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import unittest
+
+from app.job_manager import CancelToken
+from app.process_supervisor import ProcessCancelled, ProcessTimeout, parse_progress, run_supervised
+
+PROGRESS_SCRIPT = r"""
+import sys
+print("Scanning file...", flush=True)
+for pct in (0, 10, 10, 45, 100):
+    sys.stdout.write("\r[" + "#" * (pct // 10) + " " * (10 - pct // 10) + "] " + str(pct) + "%")
+    sys.stdout.flush()
+print("\nConversion took 1 seconds")
+"""
+
+NOISY_FAILURE_SCRIPT = r"""
+import sys
+for idx in range(50000):
+    sys.stderr.write(f"warning {idx}: skipped representation\n")
+sys.stderr.write("fatal: out of memory\n")
+sys.exit(3)
+"""
+
+SLEEP_SCRIPT = "import time; print('started', flush=True); time.sleep(30)"
+
+CHATTY_SCRIPT = r"""
+import sys, time
+for idx in range(3000):
+    sys.stdout.write(f"\r{idx % 100}%")
+    sys.stdout.flush()
+    time.sleep(0.01)
+"""
+
+CLOSED_PIPES_SCRIPT = "import os, time; os.close(1); os.close(2); time.sleep(30)"
+
+
+class ParseProgressTest(unittest.TestCase):
+    def test_reads_last_percentage(self) -> None:
+        self.assertEqual(parse_progress("[#####     ] 50%"), 50)
+        self.assertEqual(parse_progress("12% ... 34 %"), 34)
+        self.assertIsNone(parse_progress("Creating geometry..."))
+
+
+class RunSupervisedTest(unittest.TestCase):
+    def test_forwards_changed_progress_and_keeps_other_output(self) -> None:
+        seen: list[int] = []
+        result = run_supervised([sys.executable, "-c", PROGRESS_SCRIPT], progress_cb=seen.append)
+
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(seen, [0, 10, 45, 100])
+        self.assertIn("Scanning file...", result.stdout_tail)
+        self.assertIn("Conversion took 1 seconds", result.stdout_tail)
+
+    def test_drains_large_stderr_and_keeps_bounded_tail(self) -> None:
+        result = run_supervised([sys.executable, "-c", NOISY_FAILURE_SCRIPT], tail_lines=20, timeout=60)
+
+        self.assertEqual(result.returncode, 3)
+        self.assertEqual(len(result.stderr_tail), 20)
+        self.assertTrue(result.error_detail().endswith("fatal: out of memory"))
+
+    def test_cancel_token_stops_process_immediately(self) -> None:
+        token = CancelToken()
+        timer = threading.Timer(0.3, token.cancel)
+        started = time.monotonic()
+        timer.start()
+        try:
+            with self.assertRaises(ProcessCancelled):
+                run_supervised([sys.executable, "-c", SLEEP_SCRIPT], cancel_check=token)
+        finally:
+            timer.cancel()
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertFalse(token._callbacks)
+
+    def test_timeout_stops_process(self) -> None:
+        with self.assertRaises(ProcessTimeout):
+            run_supervised([sys.executable, "-c", SLEEP_SCRIPT], timeout=0.5)
+
+    def test_timeout_stops_process_that_keeps_reporting_progress(self) -> None:
+        started = time.monotonic()
+        with self.assertRaises(ProcessTimeout):
+            # A callback slower than the output keeps events queued, so the queue is never empty.
+            run_supervised([sys.executable, "-c", CHATTY_SCRIPT], progress_cb=lambda _: time.sleep(0.02), timeout=0.5)
+        self.assertLess(time.monotonic() - started, 10)
+
+    def test_timeout_and_cancel_apply_after_pipes_close(self) -> None:
+        started = time.monotonic()
+        with self.assertRaises(ProcessTimeout):
+            run_supervised([sys.executable, "-c", CLOSED_PIPES_SCRIPT], timeout=0.5)
+        cancelled = threading.Event()
+        timer = threading.Timer(0.3, cancelled.set)
+        timer.start()
+        try:
+            with self.assertRaises(ProcessCancelled):
+                run_supervised([sys.executable, "-c", CLOSED_PIPES_SCRIPT], cancel_check=cancelled.is_set)
+        finally:
+            timer.cancel()
+        self.assertLess(time.monotonic() - started, 10)
+
+
+class CancelTokenTest(unittest.TestCase):
+    def test_callbacks_run_once_and_late_callbacks_run_immediately(self) -> None:
+        token = CancelToken()
+        calls: list[str] = []
+        unregister = token.add_callback(lambda: calls.append("removed"))
+        token.add_callback(lambda: calls.append("early"))
+        unregister()
+
+        token.cancel()
+        token.cancel()
+        token.add_callback(lambda: calls.append("late"))
+
+        self.assertTrue(token())
+        self.assertEqual(calls, ["early", "late"])
+
+
+if __name__ == "__main__":
+    unittest.main()
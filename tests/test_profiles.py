@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import app.converter as converter
+from app.profiles import DEFAULT_PROFILE, PROFILES, get_profile
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+FIXTURE_IFC = ROOT_DIR / "tests" / "fixtures" / "sample.ifc"
+
+
+class ProfileTest(unittest.TestCase):
+    def test_lookup_and_defaults(self) -> None:
+        self.assertEqual(get_profile(None).name, DEFAULT_PROFILE)
+        self.assertEqual(get_profile(" Preview ").name, "preview")
+        with self.assertRaises(ValueError):
+            get_profile("ultra")
+
+    def test_every_profile_keeps_default_exclusions(self) -> None:
+        for profile in PROFILES.values():
+            self.assertIn("IfcSpace", profile.exclude_entities)
+            self.assertIn("IfcOpeningElement", profile.exclude_entities)
+        self.assertEqual(get_profile("full").mesher_settings(), {})
+        self.assertEqual(
+            get_profile("preview").mesher_settings(),
+            {"mesher-linear-deflection": 0.02, "mesher-angular-deflection": 1.0},
+        )
+
+    def test_pipeline_applies_profile_and_records_it(self) -> None:
+        previous = converter.GEOMETRY_CACHE_MB
+        converter.GEOMETRY_CACHE_MB = 0
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                base = Path(tmp)
+                stats = {
+                    name: converter.run_fast_pipeline(
+                        FIXTURE_IFC,
+                        base / f"{name}.glb",
+                        base / f"{name}.usdz",
+                        options={"engine": "direct", "profile": name},
+                    )
+                    for name in ("full", "preview")
+                }
+        finally:
+            converter.GEOMETRY_CACHE_MB = previous
+
+        self.assertEqual(stats["full"]["profile"], "full")
+        self.assertEqual(stats["preview"]["profile"], "preview")
+        self.assertLess(stats["preview"]["face_count"], stats["full"]["face_count"])
+
+
+if __name__ == "__main__":
+    unittest.main()
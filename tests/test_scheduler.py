@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+
+from app.scheduler import CoreBudget, MemoryBudget, RssWatchdog, StageScheduler
+
+
+class CoreBudgetTest(unittest.TestCase):
+    def test_splits_cores_between_running_jobs(self) -> None:
+        budget = CoreBudget(total_cores=7)
+        budget.register("a")
+        budget.register("b")
+        budget.register("c")
+
+        self.assertEqual([budget.share(job) for job in ("a", "b", "c")], [3, 2, 2])
+        self.assertEqual(budget.snapshot()["running_jobs"], 3)
+
+    def test_released_cores_go_to_remaining_jobs_at_next_stage(self) -> None:
+        budget = CoreBudget(total_cores=8)
+        with budget.job("a") as threads_a:
+            with budget.job("b") as threads_b:
+                self.assertEqual(threads_a(), 4)
+                self.assertEqual(threads_b(), 4)
+            self.assertEqual(threads_a(), 8)
+        self.assertEqual(budget.snapshot()["running_jobs"], 0)
+
+    def test_capped_jobs_leave_spare_cores_to_others(self) -> None:
+        budget = CoreBudget(total_cores=8)
+        budget.register("small", max_threads=1)
+        budget.register("a")
+        budget.register("b")
+
+        self.assertEqual([budget.share(job) for job in ("small", "a", "b")], [1, 4, 3])
+
+        budget.register("roomy", max_threads=16)
+        self.assertEqual(budget.share("roomy"), 2)
+
+    def test_every_job_gets_at_least_one_thread(self) -> None:
+        budget = CoreBudget(total_cores=2)
+        for job in ("a", "b", "c", "d"):
+            budget.register(job)
+        self.assertEqual([budget.share(job) for job in ("a", "b", "c", "d")], [1, 1, 1, 1])
+
+
+class StageSchedulerTest(unittest.TestCase):
+    def test_packaging_overlaps_next_tessellation(self) -> None:
+        scheduler = StageScheduler({"tessellation": 1, "packaging": 1})
+        waits = []
+        with scheduler.stage("a", "glb_to_usdz"):
+            with scheduler.stage("b", "ifc_to_glb", on_wait=waits.append):
+                self.assertEqual(scheduler.snapshot()["tessellation"]["running"], ["b"])
+                self.assertEqual(scheduler.snapshot()["packaging"]["running"], ["a"])
+        self.assertEqual(waits, [])
+
+    def test_full_pool_queues_until_cancelled(self) -> None:
+        scheduler = StageScheduler({"tessellation": 1, "packaging": 1})
+        waits = []
+        with scheduler.stage("a", "ifc_to_usdz"):
+            with self.assertRaisesRegex(RuntimeError, "Cancelled by user"):
+                with scheduler.stage("b", "ifc_to_glb", cancel_check=lambda: bool(waits), on_wait=waits.append):
+                    pass
+        self.assertEqual(waits, ["tessellation"])
+        self.assertEqual(scheduler.snapshot()["tessellation"], {"slots": 1, "running": [], "waiting": []})
+
+
+class MemoryBudgetTest(unittest.TestCase):
+    def test_admits_jobs_that_fit_and_queues_the_rest(self) -> None:
+        budget = MemoryBudget(limit_bytes=100)
+        started = []
+
+        def run(job: str, estimate: int, hold: threading.Event) -> None:
+            with budget.admit(job, estimate):
+                started.append(job)
+                hold.wait(5)
+
+        first_done, second_done = threading.Event(), threading.Event()
+        first = threading.Thread(target=run, args=("a", 60, first_done))
+        first.start()
+        while "a" not in started:
+            time.sleep(0.01)
+        second = threading.Thread(target=run, args=("b", 60, second_done))
+        second.start()
+        time.sleep(0.2)
+        self.assertEqual(started, ["a"])
+        self.assertEqual(budget.snapshot()["waiting_jobs"], ["b"])
+
+        first_done.set()
+        first.join()
+        second_done.set()
+        second.join()
+        self.assertEqual(started, ["a", "b"])
+        self.assertEqual(budget.snapshot()["reserved_bytes"], {})
+
+    def test_oversized_job_runs_alone_and_waiting_can_be_cancelled(self) -> None:
+        budget = MemoryBudget(limit_bytes=100)
+        with budget.admit("huge", 500):
+            with self.assertRaisesRegex(RuntimeError, "Cancelled by user"):
+                with budget.admit("small", 10, cancel_check=lambda: True):
+                    pass
+        with budget.admit("small", 10):
+            self.assertEqual(budget.snapshot()["reserved_bytes"], {"small": 10})
+
+    def test_capacity_follows_free_memory_while_idle(self) -> None:
+        free = [1000]
+        budget = MemoryBudget(available=lambda: free[0])
+        self.assertEqual(budget.capacity(), 850)
+        with budget.admit("a", 100):
+            free[0] = 200
+            self.assertEqual(budget.capacity(), 850)
+        self.assertEqual(budget.capacity(), 170)
+
+
+class RssWatchdogTest(unittest.TestCase):
+    def test_trips_once_above_limit(self) -> None:
+        readings = iter([10, 50, 120, 130])
+        trips = []
+        with RssWatchdog(100, lambda: next(readings, 0), lambda: trips.append(1), interval=0.01) as watchdog:
+            deadline = time.time() + 2
+            while not trips and time.time() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(trips, [1])
+        self.assertGreaterEqual(watchdog.peak_bytes, 120)
+        self.assertIn("Memory limit exceeded", watchdog.error)
+
+    def test_without_limit_only_records_peak(self) -> None:
+        readings = iter([10, 500, 20])
+        trips = []
+        with RssWatchdog(None, lambda: next(readings, 0), lambda: trips.append(1), interval=0.01) as watchdog:
+            time.sleep(0.1)
+        self.assertEqual(trips, [])
+        self.assertEqual(watchdog.peak_bytes, 500)
+        self.assertIsNone(watchdog.error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+
+class LazyImportTest(unittest.TestCase):
+    def test_app_import_leaves_conversion_stack_unloaded(self) -> None:
+        probe = (
+            "import json, sys\n"
+            "import app.main\n"
+            "heavy = ('numpy', 'pxr', 'ifcopenshell', 'trimesh', 'app.glb_to_usdz_fast', 'app.ifc_to_usdz_direct')\n"
+            "print(json.dumps([name for name in heavy if name in sys.modules]))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", probe], cwd=str(ROOT_DIR), capture_output=True, text=True, check=True
+        )
+        self.assertEqual(json.loads(result.stdout.strip().splitlines()[-1]), [])
+
+    def test_prewarm_imports_stack_once(self) -> None:
+        import app.converter as converter
+
+        thread = converter.prewarm_conversion_stack()
+        thread.join()
+        self.assertIs(converter.prewarm_conversion_stack(), thread)
+        status = converter.conversion_stack_status()
+        self.assertEqual(status["state"], "ready")
+        self.assertIn("app.glb_to_usdz_fast", status["import_seconds"])
+
+
+if __name__ == "__main__":
+    unittest.main()